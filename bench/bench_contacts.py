@@ -0,0 +1,91 @@
+"""Micro-benchmark of the single-pass contact extractor against the previous per-page functions.
+
+Run from the repository root:
+
+    python bench/bench_contacts.py [--corpus DIR] [--repeat N]
+
+The pages in bench/corpus are synthetic. The "emails + phones" total is the figure to quote:
+the emails-only path skips the text between '@' signs, so its speedup mostly reflects how
+few '@' a page has (spa.html has none) and should be measured on saved real pages with --corpus.
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from contacts import extract_contacts  # noqa: E402
+
+DEFAULT_CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+def legacy_extract_emails(content):
+    """Email extraction as extract_emails did it: decode the whole page, then findall."""
+    page_content = content.decode('utf-8', 'replace')
+    emails = re.findall(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", page_content)
+    return list(set(emails))
+
+def legacy_extract_phone_numbers(text):
+    """Phone extraction as extract_phone_numbers did it: findall plus a second regex per match."""
+    phone_pattern = r"(\+?\(?\d{1,3}\)?[\d\s\-\.\(\)]{7,15})"
+    matches = re.findall(phone_pattern, text)
+    cleaned_numbers = [''.join(re.findall(r'[\d\(\)\+]', match)) for match in matches]
+    return ";".join(cleaned_numbers)
+
+def legacy_extract_contacts(content):
+    """Emails and phones the old way: one decode and two full scans of the page."""
+    emails = legacy_extract_emails(content)
+    phones = legacy_extract_phone_numbers(content.decode('utf-8', 'replace'))
+    return emails, phones
+
+def load_corpus(corpus_dir):
+    """Load the saved HTML pages of the corpus as bytes."""
+    pages = {}
+    for name in sorted(os.listdir(corpus_dir)):
+        if name.endswith((".html", ".htm")):
+            with open(os.path.join(corpus_dir, name), 'rb') as page_file:
+                pages[name] = page_file.read()
+    return pages
+
+def time_per_call(function, content, repeat):
+    """Return the best time in microseconds of one call over several rounds."""
+    rounds = timeit.repeat(lambda: function(content), number=repeat, repeat=5)
+    return min(rounds) / repeat * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_DIR, help="directory of saved HTML pages")
+    parser.add_argument("--repeat", type=int, default=200, help="calls per timing round")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        print(f"No HTML pages found in {args.corpus}")
+        return 1
+
+    comparisons = [
+        ("emails + phones", legacy_extract_contacts, extract_contacts),
+        ("emails only", legacy_extract_emails, lambda content: extract_contacts(content, phones=False)),
+    ]
+    for title, legacy_function, single_function in comparisons:
+        print(f"\n{title}")
+        print(f"{'page':<20} {'KiB':>6} {'legacy us':>10} {'single us':>10} {'speedup':>8}")
+        total_legacy = total_single = 0.0
+        for name, content in pages.items():
+            legacy = time_per_call(legacy_function, content, args.repeat)
+            single = time_per_call(single_function, content, args.repeat)
+            total_legacy += legacy
+            total_single += single
+            print(f"{name:<20} {len(content) / 1024:>6.1f} {legacy:>10.1f} {single:>10.1f} {legacy / single:>7.2f}x")
+        print(f"{'total':<20} {'':>6} {total_legacy:>10.1f} {total_single:>10.1f} "
+              f"{total_legacy / total_single:>7.2f}x")
+    print("\nThe emails-only speedup depends on the '@' signs of each page; quote the emails + phones total.")
+
+    for name, content in pages.items():
+        if set(legacy_extract_emails(content)) != extract_contacts(content)['emails']:
+            print(f"{name}: email results differ from the legacy extractor")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""End-to-end enrichment benchmark against synthetic local websites and a stub search backend.
+
+Needs no network: company sites are served by a local HTTP proxy (bench/fakeweb.py) and searches
+are answered by searchbackends.MockBackend. Run from the repository root:
+
+    python bench/bench_enrich.py [--companies N] [--latency MS] [--sequential] [--json FILE]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+import biz2mail  # noqa: E402
+import ratelimit  # noqa: E402
+import searchbackends  # noqa: E402
+from fakeweb import FakeWeb, generate_sites  # noqa: E402
+
+def write_input_csv(csv_file, sites, missing_rate, duplicate_rate, seed=0):
+    """Write the CSV of the companies to enrich, with some unknown companies and duplicate rows."""
+    rows = []
+    for site in sites:
+        rows.append({biz2mail.DEFAULT_COLUMN_VAT: site.vat_code, biz2mail.DEFAULT_COLUMN_COMPANY: site.company})
+    rows += rows[:int(len(rows) * duplicate_rate)]  # Several local units of the same company
+    missing = int(len(sites) * missing_rate)
+    for number in range(missing):
+        rows.append({biz2mail.DEFAULT_COLUMN_VAT: f"{number:011}", biz2mail.DEFAULT_COLUMN_COMPANY: f"Sconosciuta {number} Sas"})
+    df = pd.DataFrame(rows).sample(frac=1, random_state=seed).reset_index(drop=True)
+    df['website'] = ''
+    df['email'] = ''
+    df['error'] = ''
+    df.to_csv(csv_file, sep=biz2mail.DEFAULT_FIELD_SEPARATOR, index=False)
+    return len(df)
+
+def run_benchmark(companies=200, latency=0.02, search_latency=0.05, page_size=20 * 1024, hang=5.0,
+                  error_rate=0.02, timeout_rate=0.01, missing_rate=0.05, duplicate_rate=0.05,
+                  concurrent=True, search_concurrency=biz2mail.DEFAULT_SEARCH_CONCURRENCY,
+                  fetch_concurrency=biz2mail.DEFAULT_FETCH_CONCURRENCY, chunk_size=None,
+                  retry_delay=1.0, use_caches=False, verbose=False, seed=0):
+    """Enrich a synthetic CSV file end to end and return the throughput, stage latencies and results."""
+    sites = generate_sites(companies, seed=seed, error_rate=error_rate, timeout_rate=timeout_rate)
+    web = FakeWeb(sites, latency=latency, page_size=page_size, hang=hang, seed=seed)
+    backend = searchbackends.MockBackend({site.company: [site.url] for site in sites}, name="stub",
+                                         delay=search_latency)
+    saved_settings = biz2mail.current_settings()
+    saved_globals = (biz2mail.http_session, biz2mail.rate_limiter, biz2mail.search_router, biz2mail.fetch_timeouts,
+                     biz2mail.USE_METRICS_LOG, biz2mail.TIMEOUT_RETRY_DELAY)
+    proxy_url = web.start()
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            csv_file = os.path.join(tmpdir, "bench.csv")
+            records = write_input_csv(csv_file, sites, missing_rate, duplicate_rate, seed)
+            biz2mail.apply_settings({'USE_SEARCH_CACHE': use_caches, 'USE_PAGE_CACHE': use_caches,
+                                     'USE_RESULTS_STORE': use_caches, 'USE_RENDER_POOL': False})
+            biz2mail.USE_METRICS_LOG = False
+            biz2mail.TIMEOUT_RETRY_DELAY = retry_delay
+            biz2mail.http_session = None
+            biz2mail.fetch_timeouts = None
+            session = biz2mail.get_http_session()
+            session.trust_env = False  # Ignore proxy settings of the environment
+            session.proxies = {'http': proxy_url}
+            biz2mail.rate_limiter = ratelimit.RateLimiter(search_rate=1000, domain_rate=1000, domain_burst=10)
+            biz2mail.search_router = searchbackends.SearchRouter([backend], biz2mail.rate_limiter)
+
+            output = io.StringIO()
+            started = time.monotonic()
+            with contextlib.redirect_stdout(sys.stdout if verbose else output):
+                ok = biz2mail.enrich_csv_file(csv_file, concurrent=concurrent, search_concurrency=search_concurrency,
+                                              fetch_concurrency=fetch_concurrency, chunk_size=chunk_size)
+            elapsed = time.monotonic() - started
+            df = pd.read_csv(csv_file, sep=biz2mail.DEFAULT_FIELD_SEPARATOR, dtype=str).fillna('')
+    finally:
+        web.stop()
+        biz2mail.apply_settings(saved_settings)
+        (biz2mail.http_session, biz2mail.rate_limiter, biz2mail.search_router, biz2mail.fetch_timeouts,
+         biz2mail.USE_METRICS_LOG, biz2mail.TIMEOUT_RETRY_DELAY) = saved_globals
+
+    summary = biz2mail.run_metrics.summary()
+    expected = {site.company: site.email for site in sites if site.kind in ("home", "contatti")}
+    found = sum(1 for company, email in zip(df[biz2mail.DEFAULT_COLUMN_COMPANY], df['email'])
+                if company in expected and email == expected[company])
+    return {
+        'ok': ok,
+        'records': records,
+        'seconds': round(elapsed, 3),
+        'records_per_second': round(records / elapsed, 2) if elapsed else 0.0,
+        'emails_found': found,
+        'emails_expected': int(df[biz2mail.DEFAULT_COLUMN_COMPANY].isin(expected).sum()),
+        'outcomes': df['error'].value_counts().to_dict(),
+        'searches': len(backend.searches),
+        'http_requests': web.requests,
+        'http_statuses': web.statuses,
+        'megabytes_served': round(web.bytes_sent / 1024 / 1024, 2),
+        'stages': {stage: {key: stats[key] for key in ('count', 'mean', 'p50', 'p90', 'p99', 'max')}
+                   for stage, stats in summary['stages'].items()},
+    }
+
+def print_report(result):
+    """Print a benchmark result as a table."""
+    print(f"{result['records']} records in {result['seconds']:.2f}s: {result['records_per_second']:.1f} records/s")
+    print(f"Emails found: {result['emails_found']}/{result['emails_expected']}, searches: {result['searches']}, "
+          f"HTTP requests: {result['http_requests']} ({result['megabytes_served']} MB), statuses: {result['http_statuses']}")
+    print(f"Outcomes: {result['outcomes']}")
+    print(f"\n{'stage':<12} {'calls':>7} {'mean ms':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for stage, stats in sorted(result['stages'].items()):
+        print(f"{stage:<12} {stats['count']:>7} {stats['mean'] * 1000:>9.1f} {stats['p50'] * 1000:>8.0f} "
+              f"{stats['p90'] * 1000:>8.0f} {stats['p99'] * 1000:>8.0f} {stats['max'] * 1000:>8.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--companies", type=int, default=200, help="synthetic companies (default: %(default)s)")
+    parser.add_argument("--latency", type=float, default=20, help="mean page latency in ms (default: %(default)s)")
+    parser.add_argument("--search-latency", type=float, default=50, help="search latency in ms (default: %(default)s)")
+    parser.add_argument("--page-kb", type=int, default=20, help="page size in KiB (default: %(default)s)")
+    parser.add_argument("--hang", type=float, default=5.0, help="seconds a timing out site hangs (default: %(default)s)")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="share of sites answering 500")
+    parser.add_argument("--timeout-rate", type=float, default=0.01, help="share of sites that hang")
+    parser.add_argument("--missing-rate", type=float, default=0.05, help="share of extra companies without a site")
+    parser.add_argument("--duplicate-rate", type=float, default=0.05, help="share of repeated VAT codes")
+    parser.add_argument("--sequential", action="store_true", help="enrich one record at a time")
+    parser.add_argument("--search-concurrency", type=int, default=biz2mail.DEFAULT_SEARCH_CONCURRENCY)
+    parser.add_argument("--fetch-concurrency", type=int, default=biz2mail.DEFAULT_FETCH_CONCURRENCY)
+    parser.add_argument("--chunk-size", type=int, help="stream the CSV in chunks of this many records")
+    parser.add_argument("--retry-delay", type=float, default=1.0,
+                        help="seconds before retrying timed-out sites (default: %(default)s)")
+    parser.add_argument("--with-caches", action="store_true", help="use the search and page caches and the results store")
+    parser.add_argument("--verbose", action="store_true", help="show the output of the enrichment")
+    parser.add_argument("--json", help="also write the result to this JSON file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    result = run_benchmark(
+        companies=args.companies, latency=args.latency / 1000, search_latency=args.search_latency / 1000,
+        page_size=args.page_kb * 1024, hang=args.hang, error_rate=args.error_rate, timeout_rate=args.timeout_rate,
+        missing_rate=args.missing_rate, duplicate_rate=args.duplicate_rate, concurrent=not args.sequential,
+        search_concurrency=args.search_concurrency, fetch_concurrency=args.fetch_concurrency,
+        chunk_size=args.chunk_size, retry_delay=args.retry_delay, use_caches=args.with_caches, verbose=args.verbose, seed=args.seed,
+    )
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as json_file:
+            json.dump(result, json_file, indent=2)
+    return 0 if result['ok'] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""Synthetic company websites served from a local HTTP proxy, for benchmarks that need no network.
+
+Every company gets its own domain (azienda00042.example). The server acts as an HTTP proxy, so
+clients keep real, distinct host names without any DNS setup: point the session proxies at it.
+"""
+import http.server
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+FILLER = (b"<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt "
+          b"ut labore et dolore magna aliqua. Produzione e distribuzione dal 1985.</p>\n")
+
+def partita_iva(number):
+    """Return a valid 11-digit partita IVA built from a number."""
+    digits = f"{number % 10 ** 10:010}"
+    total = 0
+    for position, digit in enumerate(digits):
+        value = int(digit)
+        if position % 2:
+            value = value * 2 - 9 if value > 4 else value * 2
+        total += value
+    return digits + str((10 - total % 10) % 10)
+
+class Site:
+    """A synthetic company website: where its email is, and whether it fails or hangs."""
+
+    def __init__(self, number, kind):
+        self.number = number
+        self.kind = kind  # "home", "contatti", "none", "error" or "timeout"
+        self.company = f"Azienda {number:05} Srl"
+        self.vat_code = partita_iva(number + 1000)
+        self.domain = f"azienda{number:05}.example"
+        self.email = f"info@{self.domain}"
+
+    @property
+    def url(self):
+        return f"http://www.{self.domain}/"
+
+def generate_sites(companies, seed=0, contatti_rate=0.4, no_email_rate=0.15, error_rate=0.02, timeout_rate=0.01):
+    """Generate the sites of a number of companies; the rest of the rates have the email on the home page."""
+    rng = random.Random(seed)
+    sites = []
+    for number in range(companies):
+        draw = rng.random()
+        if draw < timeout_rate:
+            kind = "timeout"
+        elif draw < timeout_rate + error_rate:
+            kind = "error"
+        elif draw < timeout_rate + error_rate + no_email_rate:
+            kind = "none"
+        elif draw < timeout_rate + error_rate + no_email_rate + contatti_rate:
+            kind = "contatti"
+        else:
+            kind = "home"
+        sites.append(Site(number, kind))
+    return sites
+
+class FakeWeb:
+    """Local HTTP proxy serving the synthetic sites with configurable latency, size and hang time."""
+
+    def __init__(self, sites, latency=0.02, page_size=20 * 1024, hang=5.0, seed=0):
+        self.sites = {site.domain: site for site in sites}
+        self.latency = latency
+        self.page_size = page_size
+        self.hang = hang
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.bytes_sent = 0
+        self.statuses = {}
+        self.lock = threading.Lock()
+        self.server = None
+
+    def page(self, site, path):
+        """Return the status and body of a page of a site."""
+        if site is None or site.kind == "error":
+            return 500, b"<html><body>Internal Server Error</body></html>"
+        if path in ("", "/"):
+            body = (f"<html><head><title>{site.company}</title></head><body><h1>{site.company}</h1>"
+                    f'<a href="/chi-siamo">Chi siamo</a> <a href="/contatti">Contatti</a> '
+                    f'<a href="/prodotti">Prodotti</a>').encode()
+            if site.kind == "home":
+                body += f'<footer>P.IVA {site.vat_code} - <a href="mailto:{site.email}">{site.email}</a></footer>'.encode()
+        elif path in ("/contatti", "/chi-siamo", "/prodotti"):
+            body = f"<html><body><h1>{path.strip('/').title()}</h1>".encode()
+            if path == "/contatti" and site.kind == "contatti":
+                body += f"<p>Scriveteci: {site.email}</p>".encode()
+        else:
+            return 404, b"<html><body>Not Found</body></html>"
+        body += FILLER * max(0, (self.page_size - len(body)) // len(FILLER))
+        return 200, body + b"</body></html>"
+
+    def handler_class(self):
+        web = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parsed_url = urlparse(self.path)
+                host = (parsed_url.hostname or self.headers.get('Host', '')).split(':')[0].lower()
+                site = web.sites.get(host[4:] if host.startswith("www.") else host)
+                with web.lock:
+                    delay = web.latency * web.rng.uniform(0.5, 1.5)
+                if site is not None and site.kind == "timeout":
+                    delay = web.hang
+                time.sleep(delay)
+                status, body = web.page(site, parsed_url.path)
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    return  # The client gave up on a hanging page
+                with web.lock:
+                    web.requests += 1
+                    web.bytes_sent += len(body)
+                    web.statuses[status] = web.statuses.get(status, 0) + 1
+
+            def handle(self):
+                try:
+                    super().handle()
+                except ConnectionResetError:
+                    pass  # The client stopped reading a page once it had the email
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """Start serving on a free local port and return the proxy URL."""
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), self.handler_class())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
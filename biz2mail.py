@@ -1,20 +1,101 @@
 import pandas as pd
+import argparse
+import asyncio
+import csv
+import glob
 import os
 import sys
+import threading
 import time
 import re
 import requests
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from urllib.parse import urlparse
-from duckduckgo_search import DDGS
+import contacts
+import crawl
+import httpsession
+import journal
+import metrics
+import pagecache
+import ranking
+import ratelimit
+import render
+import resultstore
+import searchbackends
+import searchcache
+import timeouts
+import siteindex
+import vatcode
+import writer
 
 # Define default values
 DEFAULT_COLUMN_VAT = "Codice Fiscale"
 DEFAULT_COLUMN_COMPANY = "Denominazione Azienda"
 DEFAULT_FIELD_SEPARATOR = "|"
 DEFAULT_URL_SEPARATOR = ";"
+PARQUET_EXTENSION = ".parquet"  # Files with this extension are read and written as Parquet instead of pipe CSV
+PARQUET_COMPRESSION = "zstd"
+SOURCE_URL_FIELD = "source_url"  # Page the emails were found on, kept in the results store but not in the CSV
 SCRIPT_NAME = os.path.splitext(os.path.basename(sys.argv[0]))[0]
-LOG_FILE_NAME = f"{SCRIPT_NAME}.log"
+LOG_FILE_NAME = f"{SCRIPT_NAME}.log"  # JSON-lines metrics log, written next to the CSV file
+USE_METRICS_LOG = True  # Set to False to only print the progress and the summary
+PROGRESS_INTERVAL = metrics.DEFAULT_PROGRESS_INTERVAL  # Seconds between progress lines
 DEBUG_MODE = False  # Set to True to skip actual searches
+DEFAULT_SEARCH_CONCURRENCY = 4
+DEFAULT_FETCH_CONCURRENCY = 8
+SEARCH_RATE = ratelimit.DEFAULT_SEARCH_RATE  # Searches per second to each search backend
+SEARCH_BACKENDS = ("duckduckgo",)  # In order of preference; "bing" needs BING_API_KEY, "google" GOOGLE_API_KEY and CSE_ID
+SEARCH_STRATEGY = searchbackends.FALLBACK  # Or searchbackends.FIRST_SUCCESS, searchbackends.RACE
+DOMAIN_RATE = ratelimit.DEFAULT_DOMAIN_RATE  # Page fetches per second to each domain
+SEARCH_RESULTS = ranking.DEFAULT_SEARCH_RESULTS  # Search results ranked for each company
+WEBSITES_TO_FETCH = ranking.DEFAULT_WEBSITES_TO_FETCH  # Best ranked results whose sites are crawled
+EXCEL_PROGRESS_INTERVAL = 50000  # Rows between progress lines when converting an Excel file
+FETCH_TIMEOUT = timeouts.DEFAULT_TIMEOUT  # Seconds to wait for a host until its latency is known
+MIN_FETCH_TIMEOUT = timeouts.MIN_TIMEOUT
+MAX_FETCH_TIMEOUT = timeouts.MAX_TIMEOUT
+TIMEOUT_RETRIES = 2  # Extra attempts at the end of a run for records whose website timed out
+TIMEOUT_RETRY_DELAY = 10  # Seconds before the first retry, doubled for each further attempt
+SNAPSHOT_INTERVAL = writer.DEFAULT_SNAPSHOT_INTERVAL  # Seconds between atomic rewrites of the CSV files of a run
+WRITER_QUEUE_SIZE = writer.DEFAULT_QUEUE_SIZE  # Completed records the writer thread may fall behind by
+READ_CHUNK_SIZE = 16 * 1024  # Bytes of a page body read and scanned at a time
+MAX_PAGE_BYTES = 2 * 1024 * 1024  # Bytes of a page body read at most
+EARLY_STOP_EMAILS = 1  # Qualifying emails after which the rest of a page is not read; 0 reads pages whole
+FETCH_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")  # Add "application/pdf" to scan PDFs too
+CRAWL_PAGE_BUDGET = crawl.DEFAULT_PAGE_BUDGET  # Pages fetched per website while looking for emails
+CRAWL_CONCURRENCY = crawl.DEFAULT_CRAWL_CONCURRENCY  # Pages of one website fetched at the same time
+MAX_RECORDS = 0  # Default records per shard when splitting large files, 0 keeps a single file
+STREAM_CHUNK_SIZE = 10000  # Records per chunk when streaming a CSV file
+STREAMING_MIN_FILE_SIZE = 50 * 1024 * 1024  # CSV files this large are streamed instead of loaded whole
+CACHE_DIR = None  # Directory of the search and page caches; None keeps them next to the CSV file
+USE_SEARCH_CACHE = True  # Set to False to always query the search engine
+USE_PAGE_CACHE = True  # Set to False to always download pages in full
+USE_RENDER_POOL = True  # Set to False to never render pages with a headless browser
+RENDER_POOL_SIZE = render.DEFAULT_RENDER_POOL_SIZE  # Headless browsers open at the same time
+USE_VAT_INDEX = True  # Set to False to enrich every record even if another one has the same VAT code
+USE_SITE_INDEX = True  # Set to False to crawl a site again for every record pointing at it
+USE_RESULTS_STORE = True  # Set to False to enrich every record of a file regardless of earlier runs
+RESULTS_MAX_AGE = resultstore.DEFAULT_MAX_AGE  # Seconds before a company with emails is enriched again
+RESULTS_FAILURE_MAX_AGE = resultstore.DEFAULT_FAILURE_MAX_AGE  # Same for companies without website or emails
+PAGE_CACHE_MAX_BYTES = pagecache.DEFAULT_PAGE_CACHE_MAX_BYTES
+HTTP_POOL_CONNECTIONS = httpsession.DEFAULT_POOL_CONNECTIONS
+HTTP_POOL_MAXSIZE = max(httpsession.DEFAULT_POOL_MAXSIZE, DEFAULT_FETCH_CONCURRENCY)
+HTTP_RETRIES = httpsession.DEFAULT_RETRIES
+HTTP_BACKOFF_FACTOR = httpsession.DEFAULT_BACKOFF_FACTOR
+
+http_session = None  # Shared pooled session, see get_http_session()
+rate_limiter = None  # Shared rate limiter, see get_rate_limiter()
+fetch_timeouts = None  # Shared per-host timeouts, see get_fetch_timeouts()
+search_router = None  # Shared search backends, see get_search_router()
+render_pool = None  # Shared headless browsers, see get_render_pool()
+fetch_slots = None  # Page fetches in flight across all crawls of a concurrent run, see fetch_page_in_slot()
+run_metrics = metrics.Metrics()  # Stage timings of the current run, replaced by enrich_csv_file()
+http_session_lock = threading.Lock()
+
+# Caches of the current run, see open_caches()
+search_cache = None
+page_cache = None
+site_index = None
+results_store = None
 
 def get_user_input(prompt, default_value):
     """Get user input with a default value."""
@@ -25,55 +106,179 @@ def list_files(extension):
     """List all files in the current directory with the given extension, excluding resolved files."""
     return [f for f in os.listdir() if f.endswith(extension) and "-resolved" not in f]
 
-def duckduckgo_search(search_term):
-    """Search for a term using DuckDuckGo and return the first URL."""
-    try:
-        results = DDGS().text(search_term, max_results=1)
-        urls = [result['href'] for result in results if 'href' in result]
-        return urls
-    except Exception as err:
-        print(f"An error occurred: {err}")
-        return []
+def web_search(search_term):
+    """Search for a term with the configured backends and return the URLs, or None if the search failed."""
+    return get_search_router().search(search_term)
 
-def extract_emails(url):
-    """Extract emails from a given URL."""
+def get_http_session():
+    """Get the pooled keep-alive session shared by all page fetches, creating it on first use."""
+    global http_session
+    with http_session_lock:
+        if http_session is None:
+            http_session = httpsession.create_session(
+                pool_connections=HTTP_POOL_CONNECTIONS,
+                pool_maxsize=HTTP_POOL_MAXSIZE,
+                retries=HTTP_RETRIES,
+                backoff_factor=HTTP_BACKOFF_FACTOR,
+            )
+        return http_session
+
+def get_rate_limiter():
+    """Get the rate limiter shared by all searches and page fetches, creating it on first use."""
+    global rate_limiter
+    with http_session_lock:
+        if rate_limiter is None:
+            rate_limiter = ratelimit.RateLimiter(search_rate=SEARCH_RATE, domain_rate=DOMAIN_RATE)
+        return rate_limiter
+
+def get_fetch_timeouts():
+    """Get the per-host adaptive fetch timeouts, creating them on first use."""
+    global fetch_timeouts
+    with http_session_lock:
+        if fetch_timeouts is None:
+            fetch_timeouts = timeouts.AdaptiveTimeout(default=FETCH_TIMEOUT, minimum=MIN_FETCH_TIMEOUT,
+                                                      maximum=MAX_FETCH_TIMEOUT)
+        return fetch_timeouts
+
+def get_search_router():
+    """Get the router that sends searches to the configured backends, creating it on first use."""
+    global search_router
+    limiter = get_rate_limiter()
+    with http_session_lock:
+        if search_router is None:
+            search_router = searchbackends.SearchRouter(searchbackends.create_backends(SEARCH_BACKENDS),
+                                                        limiter, strategy=SEARCH_STRATEGY,
+                                                        max_results=SEARCH_RESULTS)
+        return search_router
+
+def get_render_pool():
+    """Get the pool of headless browsers for JavaScript pages, creating it on first use."""
+    global render_pool
+    with http_session_lock:
+        if render_pool is None:
+            render_pool = render.RenderPool(max_workers=RENDER_POOL_SIZE)
+        return render_pool
+
+def close_render_pool():
+    """Report the rendered pages and quit the headless browsers."""
+    global render_pool
+    if render_pool is not None:
+        if render_pool.rendered or render_pool.failed:
+            print(f"JavaScript rendering: {render_pool.rendered} pages rendered, {render_pool.failed} failed, "
+                  f"{render_pool.seconds:.1f}s in browsers")
+        render_pool.close()
+        render_pool = None
+
+def render_page(url):
+    """Render a page with a headless browser and return its HTML, or None if rendering is off or failed."""
+    if not USE_RENDER_POOL:
+        return None
+    get_rate_limiter().acquire_domain(url)
+    with run_metrics.timer("render"):
+        return get_render_pool().render(url)
+
+def print_http_stats():
+    """Print how many page fetches reused a pooled connection and how often we were throttled."""
+    if http_session is not None:
+        stats = httpsession.connection_stats(http_session)
+        print(f"HTTP connections: {stats['requests']} requests, {stats['connections']} opened, "
+              f"{stats['reused']} reused")
+    if rate_limiter is not None:
+        print(f"Rate limiter: {len(rate_limiter.domain_buckets)} domains, "
+              f"{rate_limiter.throttled} throttled responses")
+    if search_router is not None:
+        for backend in search_router.backends:
+            print(f"Search backend {backend.name}: {search_router.answered[backend.name]} answered, "
+                  f"{search_router.failed[backend.name]} failed")
+
+def read_page_body(response):
+    """Stream the body of a response, scanning it for emails as the chunks arrive.
+
+    Reading stops after MAX_PAGE_BYTES, or as soon as EARLY_STOP_EMAILS qualifying emails have
+    turned up. Returns the bytes read and the emails found.
+    """
+    scanner = contacts.EmailScanner()
+    chunks = []
+    size = 0
+    for chunk in response.iter_content(chunk_size=READ_CHUNK_SIZE):
+        chunks.append(chunk)
+        size += len(chunk)
+        with run_metrics.timer("extract"):
+            scanner.feed(chunk)
+        if size >= MAX_PAGE_BYTES:
+            run_metrics.count("fetch truncated: size")
+            return b"".join(chunks), scanner.emails
+        if EARLY_STOP_EMAILS and sum(map(crawl.is_qualifying_email, scanner.emails)) >= EARLY_STOP_EMAILS:
+            run_metrics.count("fetch truncated: emails found")
+            return b"".join(chunks), scanner.emails
+    scanner.close()
+    return b"".join(chunks), scanner.emails
+
+def fetch_page(url):
+    """Fetch a page and extract its emails, revalidating the cached copy of the page if there is one.
+
+    Bodies are streamed and scanned chunk by chunk, see read_page_body(); responses whose content
+    type is not in FETCH_CONTENT_TYPES are not read at all. Returns a dict with the unique 'emails',
+    the raw 'content' and an 'error' that is None, "timeout", "failed" or "skipped".
+    """
+    cached_page = page_cache.lookup(url) if page_cache is not None else None
+    headers = page_cache.conditional_headers(cached_page) if cached_page else {}
+    stage = "root_fetch" if urlparse(url).path in ("", "/") else "fetch"
     try:
-        response = requests.get(url, timeout=4)
+        get_rate_limiter().acquire_domain(url)
+        started = time.monotonic()
+        with run_metrics.timer(stage):
+            response = get_http_session().get(url, timeout=get_fetch_timeouts().timeout_for(url), headers=headers,
+                                              stream=True)
+            try:
+                content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+                skipped = bool(content_type) and content_type not in FETCH_CONTENT_TYPES
+                if response.status_code == 200 and not skipped:
+                    content, emails = read_page_body(response)
+            finally:
+                response.close()  # Drops the connection if the body was not read to the end
+        get_fetch_timeouts().observe(url, time.monotonic() - started)
+        get_rate_limiter().report_response(url, response.status_code, response.headers.get('Retry-After'))
+        if response.status_code == 200 and skipped:
+            run_metrics.count(f"fetch skipped: {content_type}")
+            return {'emails': [], 'content': None, 'error': "skipped"}
+        if response.status_code == 304 and cached_page:
+            page_cache.touch(url)
+            # Page not modified, reuse the previous extraction
+            return {'emails': list(cached_page['emails']), 'content': page_cache.read_body(url), 'error': None}
         if response.status_code == 200:
-            page_content = response.text
-            emails = re.findall(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", page_content)
-            return list(set(emails))  # Return unique emails
+            emails = list(emails)
+            if not emails and render.looks_js_rendered(content):
+                rendered = render_page(url)  # Only pages filled in by JavaScript need a browser
+                if rendered is not None:
+                    content = rendered
+                    emails = list(contacts.extract_contacts(content, phones=False)['emails'])
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            # Only pages that can be revalidated; a page cut short is kept as read, as a new fetch stops at the same point
+            if page_cache is not None and (etag or last_modified):
+                page_cache.store(url, content, etag, last_modified, emails)
+            return {'emails': emails, 'content': content, 'error': None}
         else:
             print(f"Failed to retrieve the page: {url}")
-            return []
+            run_metrics.count(f"fetch error: HTTP {response.status_code}")
+            return {'emails': [], 'content': None, 'error': "failed"}
     except requests.Timeout:
         print(f"Timeout occurred while fetching the URL {url}")
-        return "timeout"
+        get_fetch_timeouts().timed_out(url)
+        run_metrics.count("fetch error: timeout")
+        return {'emails': [], 'content': None, 'error': "timeout"}
     except (requests.RequestException, requests.Timeout) as e:
         print(f"An error occurred while fetching the URL {url}: {e}")
-        return []
-
-def extract_phone_numbers(text):
-    # Updated regular expression:
-    # \+? - optionally matches a leading "+"
-    # \(?\d{1,3}\)? - optionally matches area code in parentheses
-    # [\d\s\-\.\(\)]{6,15} - matches the remaining part of the number, allowing common delimiters
-    phone_pattern = r"(\+?\(?\d{1,3}\)?[\d\s\-\.\(\)]{7,15})"
-    
-    # Find all matches based on the pattern
-    matches = re.findall(phone_pattern, text)
-    
-    # Clean up each phone number to only include digits, brackets, and plus sign
-    cleaned_numbers = [''.join(re.findall(r'[\d\(\)\+]', match)) for match in matches]
-    
-    # Join the cleaned numbers with ";"
-    return ";".join(cleaned_numbers)
+        run_metrics.count(f"fetch error: {type(e).__name__}")
+        return {'emails': [], 'content': None, 'error': "failed"}
 
-def get_root_url(url):
-    """Get the root URL from a given URL."""
-    parsed_url = urlparse(url)
-    root_url = f"{parsed_url.scheme}://{parsed_url.netloc}/"
-    return root_url
+def extract_emails(url):
+    """Extract emails from a given URL; returns "timeout" if the page timed out."""
+    page = fetch_page(url)
+    if page['error'] == "timeout":
+        return "timeout"
+    return page['emails']  # Return unique emails
 
 def step_1_generate_csv():
     """Generate a CSV file from the given Excel file."""
@@ -99,9 +304,34 @@ def step_1_generate_csv():
     csv_file_name = f"{os.path.splitext(excel_file)[0]}.csv"
     column_vat = get_user_input("Enter the name of the VAT column", DEFAULT_COLUMN_VAT)
     column_company = get_user_input("Enter the name of the Company column", DEFAULT_COLUMN_COMPANY)
+    max_records = get_user_input("Enter the maximum number of records per CSV file (0 for a single file)",
+                                 MAX_RECORDS)
+    if not str(max_records).isdigit():
+        print("Invalid number of records.")
+        return False
+
+    return convert_excel_to_csv(excel_file, csv_file_name, column_vat, column_company, int(max_records))
+
+def convert_excel_to_csv(excel_file, csv_file_name, column_vat, column_company, max_records=0):
+    """Convert the VAT and company columns of an Excel file to a pipe-separated CSV file.
+
+    The columns are written as DEFAULT_COLUMN_VAT and DEFAULT_COLUMN_COMPANY, the names the
+    enrichment reads, whatever they are called in the Excel file. With max_records set, a file
+    with more records is split into numbered shards instead.
+    """
+    if excel_file.endswith('xlsx'):
+        converted = stream_xlsx_to_csv(excel_file, csv_file_name, column_vat, column_company)
+    else:
+        converted = read_xls_to_csv(excel_file, csv_file_name, column_vat, column_company)
+    if converted and max_records:
+        return shard_csv(csv_file_name, max_records)
+    return converted
+
+def read_xls_to_csv(excel_file, csv_file_name, column_vat, column_company):
+    """Convert a legacy .xls file through pandas."""
 
     try:
-        df = pd.read_excel(excel_file, engine='openpyxl' if excel_file.endswith('xlsx') else 'xlrd')
+        df = pd.read_excel(excel_file, engine='xlrd')
     except ImportError as e:
         print("Error: Missing a required library. Please install the following library:")
         print("pip install xlrd openpyxl")
@@ -118,6 +348,7 @@ def step_1_generate_csv():
         return False
 
     extracted_df = df[[column_vat, column_company]].copy()
+    extracted_df.columns = [DEFAULT_COLUMN_VAT, DEFAULT_COLUMN_COMPANY]
     extracted_df['website'] = ""
     extracted_df['email'] = ""
     extracted_df['error'] = ""
@@ -134,9 +365,788 @@ def step_1_generate_csv():
 
     return True
 
-def populate_website_email():
+def excel_cell_to_str(value):
+    """Convert an Excel cell value to its CSV text, writing whole numbers without a decimal part."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def stream_xlsx_to_csv(excel_file, csv_file_name, column_vat, column_company):
+    """Convert an .xlsx file row by row, reading only the VAT and company columns."""
+    try:
+        import openpyxl
+    except ImportError:
+        print("Error: Missing a required library. Please install the following library:")
+        print("pip install openpyxl")
+        return False
+
+    start_time = time.monotonic()
+    try:
+        workbook = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
+    except Exception as e:
+        print(f"Error reading the Excel file: {e}")
+        return False
+
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [excel_cell_to_str(cell) for cell in next(rows, ())]
+        if column_vat not in header:
+            print(f"Error: Column '{column_vat}' not found in the Excel file.")
+            return False
+        if column_company not in header:
+            print(f"Error: Column '{column_company}' not found in the Excel file.")
+            return False
+        vat_idx = header.index(column_vat)
+        company_idx = header.index(column_company)
+        last_idx = max(vat_idx, company_idx)
+
+        row_count = 0
+        with open(csv_file_name, 'w', newline='', encoding='utf-8') as csv_file:
+            writer = csv.writer(csv_file, delimiter=DEFAULT_FIELD_SEPARATOR, lineterminator='\n')
+            writer.writerow([DEFAULT_COLUMN_VAT, DEFAULT_COLUMN_COMPANY, 'website', 'email', 'error'])
+            for row in rows:
+                if not any(cell is not None for cell in row):
+                    continue  # Skip the empty rows read-only worksheets report past the data
+                row = tuple(row) + (None,) * (last_idx + 1 - len(row))
+                writer.writerow([excel_cell_to_str(row[vat_idx]), excel_cell_to_str(row[company_idx]), "", "", ""])
+                row_count += 1
+                if row_count % EXCEL_PROGRESS_INTERVAL == 0:
+                    elapsed = time.monotonic() - start_time
+                    print(f"Converted {row_count} rows ({row_count / elapsed:.0f} rows/s)")
+    except Exception as e:
+        print(f"Error saving the CSV file: {e}")
+        return False
+    finally:
+        workbook.close()
+
+    elapsed = time.monotonic() - start_time
+    print(f"CSV file created: {csv_file_name} ({row_count} rows in {elapsed:.1f}s, "
+          f"{row_count / elapsed if elapsed else 0:.0f} rows/s)")
+    return True
+
+def record_needs_enrichment(row):
+    """Check whether a record still needs its website or email populated."""
+    # Skip records with existing errors, except the transient ones
+    if row['error'].strip() and row['error'].strip() not in resultstore.RETRIABLE_ERRORS:
+        return False
+    return not row['website'].strip() or not row['email'].strip()
+
+def search_website(row):
+    """Search the website of the company in the given record and return the best ranked URLs found.
+
+    Returns None if the search itself failed, so the record is not mistaken for one without a website.
+
+    The search asks for SEARCH_RESULTS results; registries, directories and social networks are
+    dropped and the rest ranked by how well their domain matches the company name, so only the
+    WEBSITES_TO_FETCH most likely websites get crawled.
+    """
+    company_name = row[DEFAULT_COLUMN_COMPANY]
+    vat_code = row[DEFAULT_COLUMN_VAT]
+    if search_cache is not None:
+        urls = search_cache.get(company_name, vat_code)
+        if urls is not None:  # Cache hits need no query and no rate limiting
+            return ranking.rank_urls(urls, company_name, WEBSITES_TO_FETCH)
+
+    search_term = f"{company_name} {vat_code} -\"www.ufficiocamerale.it\""
+    with run_metrics.timer("search"):
+        urls = web_search(search_term)  # Rate limited per backend by the router
+    if urls is None:  # Do not cache failed searches
+        run_metrics.count("search error")
+        return None
+    if search_cache is not None:
+        search_cache.put(company_name, vat_code, urls)  # Unranked, so ranking changes apply to cached results
+    return ranking.rank_urls(urls, company_name, WEBSITES_TO_FETCH)
+
+def crawl_website(url):
+    """Crawl a website for emails within the configured page budget."""
+    return crawl.crawl_site(url, fetch_page_in_slot, page_budget=CRAWL_PAGE_BUDGET, max_workers=CRAWL_CONCURRENCY)
+
+def fetch_page_in_slot(url):
+    """Fetch a page holding one of the fetch slots shared by all crawls, so --fetch-concurrency bounds page fetches."""
+    if fetch_slots is None:
+        return fetch_page(url)
+    with fetch_slots:
+        return fetch_page(url)
+
+def lookup_emails(website):
+    """Look up emails on the website URLs and return the resulting email and error fields.
+
+    Each URL is crawled within CRAWL_PAGE_BUDGET pages: the page itself, then the site root and
+    its best ranked contact, imprint and privacy pages, stopping as soon as an email turns up.
+    """
+    urls = website.split(DEFAULT_URL_SEPARATOR)
+    all_emails = set()  # Use a set to avoid duplicates
+    errors = []
+    timed_out = False
+    source_url = None
+
+    for url in urls:
+        if site_index is not None:
+            result = site_index.get_or_crawl(url, crawl_website)  # Records of the same site share one crawl
+            if result['timeout']:
+                site_index.forget(url)  # Let a retry crawl the site again
+        else:
+            result = crawl_website(url)
+        if result['timeout']:
+            timed_out = True
+            break
+        if result['emails']:
+            all_emails.update(result['emails'])
+            source_url = result.get('source') or url
+            break  # Stop after finding emails at the first URL
+        errors.append("No emails found")
+
+    if all_emails:
+        error = "no"
+    elif timed_out:
+        error = "timeout"  # Retried at the end of the run and by later runs
+    else:
+        error = DEFAULT_URL_SEPARATOR.join(errors) if errors else "No emails found"
+    return {
+        'email': DEFAULT_URL_SEPARATOR.join(all_emails) if all_emails else '',
+        'error': error,
+        SOURCE_URL_FIELD: source_url,
+    }
+
+def enrich_record(index, row, total_records):
+    """Enrich a single record and return the fields to update."""
+    fields = {}
+    if not row['website'].strip():  # Search for website if not populated
+        print(f"Searching {index + 1}/{total_records}: {row[DEFAULT_COLUMN_COMPANY]}")
+        urls = search_website(row)
+        if urls is None:
+            return {'error': resultstore.SEARCH_FAILED}  # Retried by the next run
+        if not urls:
+            return {'error': "No website found"}
+        fields['website'] = DEFAULT_URL_SEPARATOR.join(urls)
+
+    # If website is populated, search for email
+    fields.update(lookup_emails(fields.get('website', row['website'])))
+    return fields
+
+async def enrich_record_async(loop, executor, index, row, total_records, search_limit, fetch_limit):
+    """Enrich a single record, holding a search and a fetch slot only while they are in use."""
+    fields = {}
+    if not row['website'].strip():
+        async with search_limit:
+            print(f"Searching {index + 1}/{total_records}: {row[DEFAULT_COLUMN_COMPANY]}")
+            urls = await loop.run_in_executor(executor, search_website, row)
+        if urls is None:
+            return index, {'error': resultstore.SEARCH_FAILED}
+        if not urls:
+            return index, {'error': "No website found"}
+        fields['website'] = DEFAULT_URL_SEPARATOR.join(urls)
+
+    async with fetch_limit:
+        website = fields.get('website', row['website'])
+        fields.update(await loop.run_in_executor(executor, lookup_emails, website))
+    return index, fields
+
+async def enrich_records_async(records, on_record, total_records, search_concurrency, fetch_concurrency):
+    """Enrich the indexed records with up to the given number of searches and page fetches in flight.
+
+    fetch_concurrency bounds both the records being crawled and, through the shared fetch slots,
+    the pages those crawls fetch at the same time.
+    """
+    global fetch_slots
+    loop = asyncio.get_running_loop()
+    search_limit = asyncio.Semaphore(search_concurrency)
+    fetch_limit = asyncio.Semaphore(fetch_concurrency)
+    records_by_index = {record[0]: record for record in records}
+
+    fetch_slots = threading.BoundedSemaphore(fetch_concurrency)
+    try:
+        with ThreadPoolExecutor(max_workers=search_concurrency + fetch_concurrency) as executor:
+            tasks = [
+                asyncio.create_task(enrich_record_async(loop, executor, index, row, total_records,
+                                                        search_limit, fetch_limit))
+                for index, row, indices in records
+            ]
+            for task in asyncio.as_completed(tasks):
+                index, fields = await task
+                on_record(records_by_index[index], fields)
+    finally:
+        fetch_slots = None
+
+def iter_records(df):
+    """Yield (index, record) pairs of a DataFrame with each record as a plain dict, much faster than iterrows()."""
+    return zip(df.index, df.to_dict('records'))
+
+def save_to_results_store(row, fields):
+    """Save the final result of a record to the results store and return its fields for the CSV."""
+    fields = dict(fields)
+    source_url = fields.pop(SOURCE_URL_FIELD, None)
+    if results_store is not None:
+        results_store.put(row[DEFAULT_COLUMN_VAT], row[DEFAULT_COLUMN_COMPANY],
+                          {'website': row['website'], **fields}, source_url)
+    return fields
+
+def reuse_stored_results(records, on_result):
+    """Report the records whose company has a valid result in the results store and return the others."""
+    pending = []
+    for index, row, indices in records:
+        stored = results_store.get(row[DEFAULT_COLUMN_VAT])
+        if stored is not None and row['website'].strip() in ('', stored['website']):
+            report_result(indices, stored, on_result)
+        else:
+            pending.append((index, row, indices))
+    if len(pending) < len(records):
+        print(f"Results store: {len(records) - len(pending)} records reused from earlier runs, "
+              f"{len(pending)} to enrich")
+    return pending
+
+def report_result(indices, fields, on_result):
+    """Pass the result of a record to on_result for the record and its duplicates, counting it."""
+    outcome = "resolved" if fields.get('error') == "no" else f"error: {fields.get('error')}"
+    for index in indices:
+        on_result(index, fields)
+        run_metrics.count(outcome)
+        run_metrics.record_done()
+
+def vat_index_key(row):
+    """Return the key grouping the records of one company, or None if its VAT code is not valid."""
+    vat = vatcode.normalize_vat(row[DEFAULT_COLUMN_VAT])
+    if not vatcode.is_valid_vat(vat):
+        return None
+    return vat, row['website'].strip()
+
+def index_records(df):
+    """Index the records needing enrichment by VAT code so every company is enriched once.
+
+    Returns (index, record, indices) tuples where indices lists the record itself and its duplicates,
+    which receive the same result. Records with an invalid VAT code are never merged.
+    """
+    records = []
+    groups = {}
+    invalid = 0
+    for index, row in iter_records(df):
+        if not record_needs_enrichment(row):
+            continue
+        key = vat_index_key(row) if USE_VAT_INDEX else None
+        if key is not None and key in groups:
+            groups[key].append(index)
+            continue
+        if key is None and USE_VAT_INDEX:
+            invalid += 1
+        indices = [index]
+        if key is not None:
+            groups[key] = indices
+        records.append((index, row, indices))
+    saved = sum(len(indices) - 1 for index, row, indices in records)
+    if saved or invalid:
+        print(f"VAT index: {len(records)} records to enrich, {saved} lookups saved on duplicates, "
+              f"{invalid} invalid VAT codes")
+    return records
+
+def enrich_records(df, on_result, total_records, concurrent=False,
+                   search_concurrency=DEFAULT_SEARCH_CONCURRENCY, fetch_concurrency=DEFAULT_FETCH_CONCURRENCY,
+                   timeout_retries=TIMEOUT_RETRIES):
+    """Enrich the pending records of a DataFrame, calling on_result(index, fields) for each completed record.
+
+    Records whose website timed out are set aside and retried after the other records, up to
+    timeout_retries times, so slow sites do not hold up the fast ones.
+    """
+    records = index_records(df)
+    run_metrics.expect(sum(len(indices) for index, row, indices in records))
+    if results_store is not None:
+        records = reuse_stored_results(records, on_result)
+    for attempt in range(timeout_retries + 1):
+        deferred = []
+        last_timeout = [0.0]
+
+        def on_record(record, fields):
+            index, row, indices = record
+            if attempt:
+                fields = {'website': row['website'], **fields}  # Found by an earlier attempt
+            if fields.get('error') == "timeout" and attempt < timeout_retries:
+                deferred.append((index, {**row, **fields, 'error': ''}, indices))
+                last_timeout[0] = time.monotonic()
+            else:
+                # Duplicates of the record share its result
+                report_result(indices, save_to_results_store({**row, **fields}, fields), on_result)
+
+        if concurrent:
+            asyncio.run(enrich_records_async(records, on_record, total_records, search_concurrency, fetch_concurrency))
+        else:
+            for record in records:
+                on_record(record, enrich_record(record[0], record[1], total_records))
+        if not deferred:
+            break
+
+        # Give the slow hosts a rest before trying them again, with longer timeouts
+        delay = max(TIMEOUT_RETRY_DELAY * 2 ** attempt - (time.monotonic() - last_timeout[0]), 0)
+        print(f"Retrying {len(deferred)} timed-out records in {delay:.0f}s")
+        run_metrics.count("timeout retries", len(deferred))
+        time.sleep(delay)
+        records = deferred
+
+def resolved_path(csv_file):
+    """Get the path of the resolved companion of a CSV or Parquet file, in the same format."""
+    base, extension = os.path.splitext(csv_file)
+    return f"{base}-resolved{PARQUET_EXTENSION if extension == PARQUET_EXTENSION else '.csv'}"
+
+def is_parquet(path):
+    """Check whether a data file is kept in the Parquet format."""
+    return path.endswith(PARQUET_EXTENSION)
+
+def parquet_available():
+    """Check that the optional pyarrow library needed for Parquet files is installed."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("Error: Missing a required library for Parquet files. Please install the following library:")
+        print("pip install pyarrow")
+        return False
+    return True
+
+def read_table(path, columns=None):
+    """Read a pipe-separated CSV or a Parquet file as strings, loading only the given columns if any."""
+    if is_parquet(path):
+        df = pd.read_parquet(path, columns=columns).fillna('')  # Before astype, which turns nulls into "nan"
+        return df.astype({column: str for column in df.columns if df[column].dtype != object})
+    return pd.read_csv(path, sep=DEFAULT_FIELD_SEPARATOR, dtype=str, usecols=columns).fillna('')
+
+def count_rows(path):
+    """Count the records of a CSV or Parquet file without loading its data."""
+    if is_parquet(path):
+        import pyarrow.parquet
+        return pyarrow.parquet.ParquetFile(path).metadata.num_rows
+    return count_csv_rows(path)
+
+def resolved_key(record):
+    """Get the key of a resolved record: its VAT code, or the company name when the VAT code is missing."""
+    return record[DEFAULT_COLUMN_VAT].strip() or record[DEFAULT_COLUMN_COMPANY].strip()
+
+def load_resolved(resolved_file):
+    """Load the resolved records keyed by VAT code."""
+    resolved = {}
+    if os.path.exists(resolved_file):
+        for record in read_table(resolved_file).to_dict('records'):
+            resolved[resolved_key(record)] = record
+    return resolved
+
+def is_resolved(df, index):
+    """Check whether both the website and the email of a record are populated."""
+    return bool(df.at[index, 'website'].strip() and df.at[index, 'email'].strip())
+
+def upsert_resolved(resolved, df, index):
+    """Add or replace a record in the resolved set if both its website and email are populated."""
+    if is_resolved(df, index):
+        record = df.loc[index].to_dict()
+        resolved[resolved_key(record)] = record
+
+def write_table_atomically(df, path):
+    """Write a DataFrame to a temporary file and rename it over a CSV or Parquet file, so a crash never leaves half a file."""
+    temp_file = f"{path}.tmp"
+    if is_parquet(path):
+        df.to_parquet(temp_file, compression=PARQUET_COMPRESSION, index=False)
+    else:
+        df.to_csv(temp_file, sep=DEFAULT_FIELD_SEPARATOR, index=False)
+    os.replace(temp_file, path)
+
+def save_outputs(df, resolved, csv_file, resolved_file):
+    """Write the CSV and materialize the resolved set to the resolved file."""
+    with run_metrics.timer("save"):
+        write_table_atomically(df, csv_file)
+        write_table_atomically(pd.DataFrame(list(resolved.values()), columns=df.columns), resolved_file)
+
+def fold_journal(csv_file):
+    """Fold the checkpoint journal of a CSV file back into the CSV and its resolved file."""
+    if not os.path.exists(journal.journal_path(csv_file)):
+        print(f"No checkpoint journal found for {csv_file}")
+        return False
+    df = read_table(csv_file)
+    resolved_file = resolved_path(csv_file)
+    replayed = journal.replay_journal(df, csv_file)
+    resolved = load_resolved(resolved_file)
+    for index in replayed:
+        upsert_resolved(resolved, df, index)
+    save_outputs(df, resolved, csv_file, resolved_file)
+    journal.remove_journal(csv_file)
+    print(f"Folded {len(replayed)} journal entries into {csv_file} and {resolved_file}")
+    return True
+
+def open_caches(csv_file):
+    """Open the persistent caches and results store kept in the directory of a CSV file, and the site index."""
+    global search_cache, page_cache, site_index, results_store
+    cache_dir = CACHE_DIR or os.path.dirname(os.path.abspath(csv_file))
+    if USE_SEARCH_CACHE:
+        search_cache = searchcache.SearchCache(os.path.join(cache_dir, searchcache.SEARCH_CACHE_FILE_NAME))
+    if USE_PAGE_CACHE:
+        page_cache = pagecache.PageCache(os.path.join(cache_dir, pagecache.PAGE_CACHE_DIR_NAME),
+                                         max_bytes=PAGE_CACHE_MAX_BYTES)
+    if USE_SITE_INDEX:
+        site_index = siteindex.SiteIndex()
+    if USE_RESULTS_STORE:
+        results_store = resultstore.ResultStore(os.path.join(cache_dir, resultstore.RESULTS_STORE_FILE_NAME),
+                                                max_age=RESULTS_MAX_AGE, failure_max_age=RESULTS_FAILURE_MAX_AGE)
+
+def close_caches():
+    """Report the cache counters and close the caches."""
+    global search_cache, page_cache, site_index, results_store
+    if search_cache is not None:
+        print(f"Search cache: {search_cache.hits} hits, {search_cache.misses} misses "
+              f"({search_cache.hit_rate():.0%} hit rate)")
+        run_metrics.log("search_cache", hits=search_cache.hits, misses=search_cache.misses,
+                        hit_rate=round(search_cache.hit_rate(), 3))
+        search_cache.close()
+        search_cache = None
+    if page_cache is not None:
+        print(f"Page cache: {page_cache.revalidated} pages not modified, {page_cache.stored} stored, "
+              f"{page_cache.evicted} evicted")
+        run_metrics.log("page_cache", not_modified=page_cache.revalidated, stored=page_cache.stored,
+                        evicted=page_cache.evicted)
+        page_cache.close()
+        page_cache = None
+    if site_index is not None:
+        print(f"Site index: {site_index.crawled} sites crawled, {site_index.shared} records reused a crawl")
+        run_metrics.log("site_index", crawled=site_index.crawled, shared=site_index.shared)
+        site_index = None
+    if results_store is not None:
+        print(f"Results store: {results_store.reused} companies reused, {results_store.stale} stale or retried, "
+              f"{results_store.stored} stored")
+        run_metrics.log("results_store", reused=results_store.reused, stale=results_store.stale,
+                        stored=results_store.stored)
+        results_store.close()
+        results_store = None
+
+def apply_entries(df, entries, journal_file, resolved=None):
+    """Apply completed records to a DataFrame and its resolved set, and append them to the journal.
+
+    Runs on the writer thread; each batch is timed as one call of the persist stage.
+    """
+    with run_metrics.timer("persist"):
+        for index, fields in entries:
+            for column, value in fields.items():
+                df.at[index, column] = value
+            if resolved is not None:
+                upsert_resolved(resolved, df, index)
+        journal.write_entries(journal_file, entries)
+
+def enrich_in_memory(csv_file, resolved_file, concurrent, search_concurrency, fetch_concurrency):
+    """Enrich a CSV file loaded whole into memory, checkpointing completed records to the journal.
+
+    A writer thread applies the completed records, appends them to the journal in batches and
+    every SNAPSHOT_INTERVAL seconds rewrites both CSV files atomically and empties the journal.
+    """
+    df = read_table(csv_file)
+    resolved = load_resolved(resolved_file)
+
+    # Resume from the records completed by an interrupted run
+    replayed = journal.replay_journal(df, csv_file)
+    for index in replayed:
+        upsert_resolved(resolved, df, index)
+    if replayed:
+        print(f"Resumed {len(replayed)} records from the checkpoint journal")
+
+    total_records = len(df)
+    with journal.open_journal(csv_file) as journal_file:
+
+        def snapshot():
+            save_outputs(df, resolved, csv_file, resolved_file)
+            journal.truncate_journal(journal_file)  # Its entries are in the CSV files now
+
+        # The DataFrame belongs to the writer thread until it is closed
+        with writer.BackgroundWriter(lambda entries: apply_entries(df, entries, journal_file, resolved), snapshot,
+                                     snapshot_interval=SNAPSHOT_INTERVAL, queue_size=WRITER_QUEUE_SIZE) as background:
+
+            def store_result(index, fields):
+                background.put((index, fields))
+                if 'email' in fields:
+                    print(f"Updated record {index + 1}/{total_records}")
+
+            enrich_records(df, store_result, total_records, concurrent, search_concurrency, fetch_concurrency)
+
+    # Fold the journal back into the CSV files and start the next run with a fresh one
+    save_outputs(df, resolved, csv_file, resolved_file)
+    journal.remove_journal(csv_file)
+
+def read_csv_chunks(csv_file, chunk_size, **kwargs):
+    """Read a pipe-separated CSV file as an iterator of string DataFrames of chunk_size rows."""
+    return pd.read_csv(csv_file, sep=DEFAULT_FIELD_SEPARATOR, dtype=str, keep_default_na=False,
+                       chunksize=chunk_size, **kwargs)
+
+def count_csv_rows(csv_file, chunk_size=STREAM_CHUNK_SIZE):
+    """Count the records of a CSV file without loading it into memory."""
+    if not os.path.exists(csv_file):
+        return 0
+    return sum(len(chunk) for chunk in read_csv_chunks(csv_file, chunk_size, usecols=[0]))
+
+def append_csv(df, csv_file):
+    """Append a DataFrame to a CSV file, writing the header only when the file is new."""
+    write_header = not os.path.exists(csv_file) or os.path.getsize(csv_file) == 0
+    with run_metrics.timer("save"):
+        df.to_csv(csv_file, sep=DEFAULT_FIELD_SEPARATOR, index=False, mode='a', header=write_header)
+
+def enrich_in_chunks(csv_file, resolved_file, chunk_size, concurrent, search_concurrency, fetch_concurrency):
+    """Enrich a CSV file chunk by chunk so memory use stays flat whatever the file size.
+
+    Each enriched chunk is appended to a partial copy of the CSV, and its resolved records
+    to a partial resolved file, so the journal only ever holds the chunk in progress.
+    An interrupted run resumes after the rows already in the partial copy. Records that timed
+    out are retried once all chunks are done, see retry_timed_out_rows().
+    """
+    output_file = f"{csv_file}.partial"
+    resolved_output_file = f"{resolved_file}.partial"
+
+    done_rows = count_csv_rows(output_file, chunk_size)
+    resolved_keys = set()  # Only the keys are kept, the records themselves go straight to disk
+    if os.path.exists(resolved_output_file):
+        for chunk in read_csv_chunks(resolved_output_file, chunk_size):
+            resolved_keys.update(resolved_key(record) for _, record in iter_records(chunk))
+    if done_rows:
+        print(f"Resuming after {done_rows} records already written to {output_file}")
+
+    total_records = count_csv_rows(csv_file, chunk_size)
+    last_timeout = 0.0
+    with journal.open_journal(csv_file) as journal_file:
+        for chunk in read_csv_chunks(csv_file, chunk_size, skiprows=range(1, done_rows + 1)):
+            chunk.index = chunk.index + done_rows
+            journal.replay_journal(chunk, csv_file)  # Records completed before an interruption
+
+            with writer.BackgroundWriter(lambda entries, chunk=chunk: apply_entries(chunk, entries, journal_file),
+                                         queue_size=WRITER_QUEUE_SIZE) as background:
+
+                def store_result(index, fields):
+                    background.put((index, fields))
+                    if 'email' in fields:
+                        print(f"Updated record {index + 1}/{total_records}")
+
+                # Timed-out records keep the "timeout" error until the retry after the last chunk
+                enrich_records(chunk, store_result, total_records, concurrent, search_concurrency, fetch_concurrency,
+                               timeout_retries=0)
+
+            if (chunk['error'] == "timeout").any():
+                last_timeout = time.monotonic()
+            new_resolved = []
+            for index, record in iter_records(chunk):
+                if is_resolved(chunk, index) and resolved_key(record) not in resolved_keys:
+                    resolved_keys.add(resolved_key(record))
+                    new_resolved.append(index)
+            append_csv(chunk, output_file)
+            append_csv(chunk.loc[new_resolved], resolved_output_file)
+            journal.truncate_journal(journal_file)
+            done_rows += len(chunk)
+
+        if os.path.exists(output_file):
+            retry_timed_out_rows(csv_file, output_file, resolved_output_file, resolved_keys, chunk_size, last_timeout,
+                                 journal_file, total_records, concurrent, search_concurrency, fetch_concurrency)
+
+    # Keep the previous resolved records that were not resolved again, then add the new ones
+    merged_file = f"{resolved_file}.tmp"
+    if os.path.exists(merged_file):
+        os.remove(merged_file)
+    if os.path.exists(resolved_file):
+        for chunk in read_csv_chunks(resolved_file, chunk_size):
+            keep = [index for index, record in iter_records(chunk) if resolved_key(record) not in resolved_keys]
+            append_csv(chunk.loc[keep], merged_file)
+    if os.path.exists(resolved_output_file):
+        for chunk in read_csv_chunks(resolved_output_file, chunk_size):
+            append_csv(chunk, merged_file)
+        os.remove(resolved_output_file)
+    if os.path.exists(merged_file):
+        os.replace(merged_file, resolved_file)
+    if os.path.exists(output_file):
+        os.replace(output_file, csv_file)
+    journal.remove_journal(csv_file)
+
+def retry_timed_out_rows(csv_file, output_file, resolved_output_file, resolved_keys, chunk_size, last_timeout,
+                         journal_file, total_records, concurrent, search_concurrency, fetch_concurrency):
+    """Retry the timed-out records of a streamed run once all its chunks are written to the partial copy.
+
+    The retries of the whole file share one pass and one wait, with the TIMEOUT_RETRIES - 1
+    retries left after the chunk attempt. Their results are journaled, then the partial copy
+    is rewritten with them and the newly resolved records are appended to the partial resolved file.
+    """
+    timed_out = [chunk[chunk['error'] == "timeout"] for chunk in read_csv_chunks(output_file, chunk_size)]
+    if not TIMEOUT_RETRIES or not any(len(chunk) for chunk in timed_out):
+        return
+    timed_out = pd.concat(timed_out)
+    journal.replay_journal(timed_out, csv_file)  # Retries completed before an interruption
+    pending = int((timed_out['error'] == "timeout").sum())
+    if pending:
+        delay = max(TIMEOUT_RETRY_DELAY - (time.monotonic() - last_timeout), 0)
+        print(f"Retrying {pending} timed-out records in {delay:.0f}s")
+        run_metrics.count("timeout retries", pending)
+        time.sleep(delay)
+        with writer.BackgroundWriter(lambda entries: apply_entries(timed_out, entries, journal_file),
+                                     queue_size=WRITER_QUEUE_SIZE) as background:
+
+            def store_result(index, fields):
+                background.put((index, fields))
+                if 'email' in fields:
+                    print(f"Updated record {index + 1}/{total_records}")
+
+            enrich_records(timed_out, store_result, total_records, concurrent, search_concurrency, fetch_concurrency,
+                           timeout_retries=TIMEOUT_RETRIES - 1)
+
+    retried_file = f"{output_file}.tmp"
+    if os.path.exists(retried_file):
+        os.remove(retried_file)
+    for chunk in read_csv_chunks(output_file, chunk_size):
+        retried = chunk.index.intersection(timed_out.index)
+        chunk.loc[retried] = timed_out.loc[retried, chunk.columns]
+        new_resolved = []
+        for index in retried:
+            key = resolved_key(chunk.loc[index])
+            if is_resolved(chunk, index) and key not in resolved_keys:
+                resolved_keys.add(key)
+                new_resolved.append(index)
+        append_csv(chunk, retried_file)
+        append_csv(chunk.loc[new_resolved], resolved_output_file)
+    os.replace(retried_file, output_file)
+    journal.truncate_journal(journal_file)
+
+def enrich_csv_file(csv_file, concurrent=False, search_concurrency=DEFAULT_SEARCH_CONCURRENCY,
+                    fetch_concurrency=DEFAULT_FETCH_CONCURRENCY, chunk_size=None):
+    """Populate the website and email columns of a CSV file and its resolved companion.
+
+    Files of STREAMING_MIN_FILE_SIZE bytes or more, or any file when chunk_size is given,
+    are streamed in chunks instead of being loaded whole. Parquet files, whose compressed
+    columns load much faster, are always loaded whole.
+    """
+    global run_metrics
+    resolved_file = resolved_path(csv_file)
+    log_file = os.path.join(os.path.dirname(os.path.abspath(csv_file)), LOG_FILE_NAME) if USE_METRICS_LOG else None
+    run_metrics = metrics.Metrics(log_file, progress_interval=PROGRESS_INTERVAL)
+    run_metrics.log("start", csv_file=csv_file, concurrent=concurrent, search_concurrency=search_concurrency,
+                    fetch_concurrency=fetch_concurrency, chunk_size=chunk_size)
+    
+    try:
+        if is_parquet(csv_file) and not parquet_available():
+            return False
+        open_caches(csv_file)
+        if chunk_size is None and os.path.getsize(csv_file) >= STREAMING_MIN_FILE_SIZE:
+            chunk_size = STREAM_CHUNK_SIZE
+        if chunk_size and not is_parquet(csv_file):
+            enrich_in_chunks(csv_file, resolved_file, chunk_size, concurrent, search_concurrency, fetch_concurrency)
+        else:
+            enrich_in_memory(csv_file, resolved_file, concurrent, search_concurrency, fetch_concurrency)
+        print(f"CSV files updated: {csv_file} and {resolved_file}")
+        return True
+    except KeyboardInterrupt:
+        print(f"Interrupted: the completed records are in {journal.journal_path(csv_file)} and resume on the next run")
+        run_metrics.count("run error: KeyboardInterrupt")
+        raise
+    except Exception as e:
+        print(f"An error occurred during website and email population: {e}")
+        run_metrics.count(f"run error: {type(e).__name__}")
+        return False
+    finally:
+        close_caches()
+        close_render_pool()
+        print_http_stats()
+        run_metrics.print_summary()
+        run_metrics.close(csv_file=csv_file)
+
+def shard_path(csv_file, shard_number):
+    """Get the path of a numbered shard of a CSV file."""
+    return f"{os.path.splitext(csv_file)[0]}-{shard_number:03}.csv"
+
+def shard_csv(csv_file, max_records):
+    """Split a CSV file into shards of at most max_records records next to the original file, which is kept."""
+    shard_files = []
+    try:
+        for shard_number, chunk in enumerate(read_csv_chunks(csv_file, max_records), 1):
+            if shard_number == 1 and len(chunk) < max_records:
+                return True  # Small enough to stay a single file
+            shard_file = shard_path(csv_file, shard_number)
+            chunk.to_csv(shard_file, sep=DEFAULT_FIELD_SEPARATOR, index=False)
+            shard_files.append(shard_file)
+            print(f"CSV file created: {shard_file}")
+    except Exception as e:
+        print(f"Error saving the CSV file: {e}")
+        return False
+
+    if len(shard_files) == 1:
+        os.remove(shard_files[0])  # Exactly max_records records, keep the single file
+    return True
+
+def find_shards(base_name):
+    """List the shards of a base CSV name in shard order."""
+    directory = os.path.dirname(base_name) or "."
+    pattern = re.compile(rf"^{re.escape(os.path.basename(base_name))}-(\d{{3}})\.csv$")
+    shards = [f for f in os.listdir(directory) if pattern.match(f)]
+    return [os.path.join(os.path.dirname(base_name), f) for f in sorted(shards)]
+
+def skip_sharded(files):
+    """Drop the CSV files that have shards, whose companies are enriched through the shards."""
+    kept = []
+    for file in files:
+        if file.endswith('.csv') and find_shards(os.path.splitext(file)[0]):
+            print(f"Skipping {file}: it has been split into shards, enrich those instead")
+        else:
+            kept.append(file)
+    return kept
+
+def list_shard_bases():
+    """List the base names in the current directory that have been split into shards."""
+    pattern = re.compile(r"^(.+)-\d{3}\.csv$")
+    return sorted({match.group(1) for match in map(pattern.match, list_files('.csv')) if match})
+
+def init_shard_worker(workers, settings=None):
+    """Apply the run settings in a shard worker and share the search rate between the workers."""
+    global SEARCH_RATE
+    if settings:
+        apply_settings(settings)  # Worker processes may not inherit the settings given on the command line
+    SEARCH_RATE = SEARCH_RATE / workers
+
+def enrich_shard(shard_file, concurrent, search_concurrency, fetch_concurrency):
+    """Enrich one shard in a worker process."""
+    return enrich_csv_file(shard_file, concurrent=concurrent, search_concurrency=search_concurrency,
+                           fetch_concurrency=fetch_concurrency)
+
+def merge_shard_results(base_name):
+    """Merge the resolved files of all shards, in shard order, into the resolved file of the base name.
+
+    Records already in that file are kept unless a shard resolved the same company again.
+    """
+    merged_file = f"{base_name}-resolved.csv"
+    resolved = {}
+    columns = None
+    for shard_file in find_shards(base_name):
+        shard_resolved_file = resolved_path(shard_file)
+        if not os.path.exists(shard_resolved_file):
+            continue
+        df_resolved = pd.read_csv(shard_resolved_file, sep=DEFAULT_FIELD_SEPARATOR, dtype=str).fillna('')
+        columns = columns if columns is not None else df_resolved.columns
+        for record in df_resolved.to_dict('records'):
+            resolved.setdefault(resolved_key(record), record)  # The first shard holding a company wins
+    if columns is None:
+        print(f"No resolved shard files found for {base_name}")
+        return False
+    merged = load_resolved(merged_file)
+    merged.update(resolved)
+    write_table_atomically(pd.DataFrame(list(merged.values()), columns=columns), merged_file)
+    print(f"Merged {len(resolved)} resolved shard records into {merged_file} ({len(merged)} records)")
+    return True
+
+def enrich_shards(base_name, workers=None, concurrent=False, search_concurrency=DEFAULT_SEARCH_CONCURRENCY,
+                  fetch_concurrency=DEFAULT_FETCH_CONCURRENCY):
+    """Enrich all shards of a base name in a process pool, then merge their resolved files."""
+    shard_files = find_shards(base_name)
+    if not shard_files:
+        print(f"No shards found for {base_name}")
+        return False
+    workers = min(workers or os.cpu_count() or 1, len(shard_files))
+    print(f"Enriching {len(shard_files)} shards with {workers} worker processes")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_shard_worker,
+                             initargs=(workers, current_settings())) as executor:
+        futures = {
+            executor.submit(enrich_shard, shard_file, concurrent, search_concurrency, fetch_concurrency): shard_file
+            for shard_file in shard_files
+        }
+        failed = [futures[future] for future in as_completed(futures) if not future.result()]
+    if failed:
+        print(f"Shards with errors, run them again to resume: {', '.join(sorted(failed))}")
+    return merge_shard_results(base_name) and not failed
+
+def populate_website_email(concurrent=False):
     """Populate the website and email columns in the CSV file."""
-    csv_files = list_files('.csv')
+    csv_files = skip_sharded(list_files('.csv'))
     if not csv_files:
         print("No CSV files found in the current directory.")
         return False
@@ -155,77 +1165,304 @@ def populate_website_email():
         return False
 
     csv_file = csv_files[int(file_choice) - 1]
-    resolved_file = f"{os.path.splitext(csv_file)[0]}-resolved.csv"
-    
-    try:
-        df = pd.read_csv(csv_file, sep=DEFAULT_FIELD_SEPARATOR, dtype=str).fillna('')
-        
-        if os.path.exists(resolved_file):
-            df_resolved = pd.read_csv(resolved_file, sep=DEFAULT_FIELD_SEPARATOR, dtype=str).fillna('')
-        else:
-            df_resolved = pd.DataFrame(columns=df.columns)  # Create an empty DataFrame for resolved records
-
-        total_records = len(df)
-        for index, row in df.iterrows():
-            if row['error'].strip():  # Skip records with existing errors
-                continue
-            if not row['website'].strip() or not row['email'].strip():  # Process only if website or email is not populated
-                if not row['website'].strip():  # Search for website if not populated
-                    company_name = row[DEFAULT_COLUMN_COMPANY]
-                    vat_code = row[DEFAULT_COLUMN_VAT]
-                    search_term = f"{company_name} {vat_code} -\"www.ufficiocamerale.it\""
-                    print(f"Searching {index + 1}/{total_records}: {company_name}")
-                    urls = duckduckgo_search(search_term)
-                    if urls:
-                        df.at[index, 'website'] = DEFAULT_URL_SEPARATOR.join(urls)
-                    else:
-                        df.at[index, 'error'] = "No website found"
-                        continue  # Skip to next record if no website found
-
-                # If website is populated, search for email
-                urls = df.at[index, 'website'].split(DEFAULT_URL_SEPARATOR)
-                all_emails = set()  # Use a set to avoid duplicates
-                errors = []
-
-                for url in urls:
-                    emails = extract_emails(url)
-                    if emails == "timeout":
-                        df.at[index, 'error'] = "timeout"
-                        break
-                    if emails:
-                        all_emails.update(emails)
-                        break  # Stop after finding emails at the first URL
-                    else:
-                        root_url = get_root_url(url)
-                        root_emails = extract_emails(root_url)
-                        if root_emails == "timeout":
-                            df.at[index, 'error'] = "timeout"
-                            break
-                        if root_emails:
-                            all_emails.update(root_emails)
-                            break
-                        else:
-                            errors.append(f"No emails found")
-
-                df.at[index, 'email'] = DEFAULT_URL_SEPARATOR.join(all_emails) if all_emails else ''
-                if not all_emails:
-                    df.at[index, 'error'] = DEFAULT_URL_SEPARATOR.join(errors) if errors else "No emails found"
-                else:
-                    df.at[index, 'error'] = "no"
-
-                # Save the record to the resolve file if both website and email are found
-                if df.at[index, 'website'].strip() and df.at[index, 'email'].strip():
-                    df_resolved = pd.concat([df_resolved, df.iloc[[index]]]).drop_duplicates()
-
-                # Save to CSV after each update
-                df.to_csv(csv_file, sep=DEFAULT_FIELD_SEPARATOR, index=False)
-                df_resolved.to_csv(resolved_file, sep=DEFAULT_FIELD_SEPARATOR, index=False)
-                print(f"Updated record {index + 1}/{total_records}")
-                time.sleep(1)  # Be polite and avoid being blocked
+    if not concurrent:
+        return enrich_csv_file(csv_file)
 
-        print(f"CSV files updated: {csv_file} and {resolved_file}")
+    search_concurrency = get_user_input("Enter the number of concurrent searches", DEFAULT_SEARCH_CONCURRENCY)
+    fetch_concurrency = get_user_input("Enter the number of concurrent page fetches", DEFAULT_FETCH_CONCURRENCY)
+    if not str(search_concurrency).isdigit() or not str(fetch_concurrency).isdigit() \
+            or int(search_concurrency) < 1 or int(fetch_concurrency) < 1:
+        print("Invalid concurrency limit.")
+        return False
+    return enrich_csv_file(csv_file, concurrent=True, search_concurrency=int(search_concurrency),
+                           fetch_concurrency=int(fetch_concurrency))
+
+def fold_checkpoint_journal():
+    """Fold the checkpoint journal of a chosen CSV file back into the CSV."""
+    csv_files = [f for f in list_files('.csv') if os.path.exists(journal.journal_path(f))]
+    if not csv_files:
+        print("No CSV files with a checkpoint journal found in the current directory.")
+        return False
+
+    print("Select a CSV file to fold:")
+    for idx, file in enumerate(csv_files, 1):
+        print(f"{idx}: {file}")
+    print("Q: Exit")
+
+    file_choice = input("Enter the number of the file to use or Q to exit: ").strip()
+    if file_choice.lower() == 'q':
+        print("Exiting.")
+        return
+    if not file_choice.isdigit() or int(file_choice) < 1 or int(file_choice) > len(csv_files):
+        print("Invalid choice.")
+        return False
+
+    return fold_journal(csv_files[int(file_choice) - 1])
+
+def populate_shards():
+    """Populate all shards of a chosen CSV file in parallel and merge their resolved files."""
+    bases = list_shard_bases()
+    if not bases:
+        print("No sharded CSV files found in the current directory.")
+        return False
+
+    print("Select the sharded CSV file to use:")
+    for idx, base in enumerate(bases, 1):
+        print(f"{idx}: {base} ({len(find_shards(base))} shards)")
+    print("Q: Exit")
+
+    file_choice = input("Enter the number of the file to use or Q to exit: ").strip()
+    if file_choice.lower() == 'q':
+        print("Exiting.")
+        return
+    if not file_choice.isdigit() or int(file_choice) < 1 or int(file_choice) > len(bases):
+        print("Invalid choice.")
+        return False
+
+    workers = get_user_input("Enter the number of worker processes", os.cpu_count() or 1)
+    if not str(workers).isdigit() or int(workers) < 1:
+        print("Invalid number of worker processes.")
+        return False
+    return enrich_shards(bases[int(file_choice) - 1], workers=int(workers))
+
+# Module settings that the command line can change, see apply_settings()
+CLI_SETTINGS = (
+    "CACHE_DIR", "USE_SEARCH_CACHE", "USE_PAGE_CACHE", "USE_RENDER_POOL", "SEARCH_RATE", "DOMAIN_RATE",
+    "SEARCH_BACKENDS", "SEARCH_STRATEGY", "SEARCH_RESULTS", "WEBSITES_TO_FETCH", "USE_RESULTS_STORE",
+    "RESULTS_MAX_AGE",
+)
+
+def current_settings():
+    """Return the current values of the settings the command line can change."""
+    return {name: globals()[name] for name in CLI_SETTINGS}
+
+def apply_settings(settings):
+    """Change module settings by name."""
+    for name, value in settings.items():
+        if name not in CLI_SETTINGS:
+            raise ValueError(f"Unknown setting: {name}")
+        globals()[name] = value
+
+def expand_files(patterns, extensions):
+    """Expand file names and glob patterns into the matching files, in order and without duplicates."""
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        if not matches:
+            print(f"No files match {pattern}")
+        for file in matches:
+            if file.endswith(extensions) and "-resolved" not in file and file not in files:
+                files.append(file)
+    return files
+
+def run_queue(files, process):
+    """Process files back to back, carrying on after a failure; return True if all succeeded."""
+    failed = []
+    for number, file in enumerate(files, 1):
+        print(f"[{number}/{len(files)}] {file}")
+        if not process(file):
+            failed.append(file)
+    if failed:
+        print(f"Files with errors: {', '.join(failed)}")
+    return bool(files) and not failed
+
+def convert_table(source_file, target_file):
+    """Convert a data file between the pipe CSV and Parquet formats, as given by their extensions."""
+    if (is_parquet(source_file) or is_parquet(target_file)) and not parquet_available():
+        return False
+    try:
+        df = read_table(source_file)
+        write_table_atomically(df, target_file)
     except Exception as e:
-        print(f"An error occurred during website and email population: {e}")
+        print(f"Error converting {source_file}: {e}")
+        return False
+    print(f"File created: {target_file} ({len(df)} records, {os.path.getsize(target_file) / 1024 / 1024:.1f} MB)")
+    return True
+
+def cli_convert(args):
+    """Convert Excel files to CSV files, or to Parquet files with --format parquet."""
+    if args.format == "parquet" and args.max_records:
+        print("Parquet files cannot be split into shards, use --max-records 0")
+        return False
+
+    def convert(excel_file):
+        csv_file = f"{os.path.splitext(excel_file)[0]}.csv"
+        if not convert_excel_to_csv(excel_file, csv_file, args.vat_column, args.company_column, args.max_records):
+            return False
+        if args.format == "parquet":
+            if not convert_table(csv_file, f"{os.path.splitext(csv_file)[0]}{PARQUET_EXTENSION}"):
+                return False
+            os.remove(csv_file)
+        return True
+
+    files = expand_files(args.files, ('.xls', '.xlsx'))
+    return run_queue(files, convert)
+
+def cli_export(args):
+    """Convert data files and their resolved companions between pipe CSV and Parquet."""
+    extension = PARQUET_EXTENSION if args.to == "parquet" else ".csv"
+    files = [file for file in expand_files(args.files, ('.csv', PARQUET_EXTENSION))
+             if not file.endswith(extension)]
+
+    def export(data_file):
+        pairs = [(data_file, f"{os.path.splitext(data_file)[0]}{extension}")]
+        if os.path.exists(resolved_path(data_file)):
+            pairs.append((resolved_path(data_file), resolved_path(pairs[0][1])))
+        return all(convert_table(source, target) for source, target in pairs)
+
+    return run_queue(files, export)
+
+def cli_enrich(args):
+    """Populate the website and email columns of CSV files, or of the shards of base names with --workers."""
+    settings = {'USE_SEARCH_CACHE': not args.no_search_cache, 'USE_PAGE_CACHE': not args.no_page_cache,
+                'USE_RENDER_POOL': not args.no_render, 'USE_RESULTS_STORE': not args.no_results_store}
+    if args.max_age is not None:
+        settings['RESULTS_MAX_AGE'] = args.max_age * 24 * 3600
+    for name, value in (('CACHE_DIR', args.cache_dir), ('SEARCH_RATE', args.search_rate),
+                        ('DOMAIN_RATE', args.domain_rate), ('SEARCH_STRATEGY', args.search_strategy),
+                        ('SEARCH_RESULTS', args.search_results), ('WEBSITES_TO_FETCH', args.websites)):
+        if value is not None:
+            settings[name] = value
+    if args.search_backend:
+        settings['SEARCH_BACKENDS'] = tuple(args.search_backend)
+    apply_settings(settings)
+
+    options = {'concurrent': args.concurrent, 'search_concurrency': args.search_concurrency,
+               'fetch_concurrency': args.fetch_concurrency}
+    if args.workers:
+        bases = [os.path.splitext(name)[0] if name.endswith('.csv') else name for name in args.files]
+        return run_queue(bases, lambda base: enrich_shards(base, workers=args.workers, **options))
+    files = skip_sharded(expand_files(args.files, ('.csv', PARQUET_EXTENSION)))
+    return run_queue(files, lambda csv_file: enrich_csv_file(csv_file, chunk_size=args.chunk_size, **options))
+
+def cli_merge(args):
+    """Fold leftover journals of the shards of base names and merge their resolved files."""
+    def merge(base):
+        for shard_file in find_shards(base):
+            if os.path.exists(journal.journal_path(shard_file)):
+                fold_journal(shard_file)
+        return merge_shard_results(base)
+
+    bases = [os.path.splitext(name)[0] if name.endswith('.csv') else name for name in args.bases]
+    return run_queue(bases, merge)
+
+def print_csv_stats(csv_file):
+    """Print how far the enrichment of a CSV or Parquet file has got, loading only the columns it needs."""
+    records = websites = emails = 0
+    errors = {}
+    columns = ['website', 'email', 'error']
+    if is_parquet(csv_file):
+        if not parquet_available():
+            return False
+        chunks = [read_table(csv_file, columns=columns)]  # Only these columns are read from disk
+    else:
+        chunks = read_csv_chunks(csv_file, STREAM_CHUNK_SIZE, usecols=columns)
+    for chunk in chunks:
+        records += len(chunk)
+        websites += (chunk['website'].str.strip() != '').sum()
+        emails += (chunk['email'].str.strip() != '').sum()
+        for error, count in chunk['error'].str.strip().replace('', "pending").value_counts().items():
+            errors[error] = errors.get(error, 0) + count
+    print(f"{csv_file}: {records} records, {websites} with website, {emails} with email")
+    for error, count in sorted(errors.items(), key=lambda item: -item[1]):
+        print(f"  {error}: {count}")
+    resolved_file = resolved_path(csv_file)
+    if os.path.exists(resolved_file):
+        print(f"  resolved: {count_rows(resolved_file)} records in {resolved_file}")
+    if os.path.exists(journal.journal_path(csv_file)):
+        print(f"  journal: {sum(1 for _ in journal.read_entries(csv_file))} entries not yet folded")
+    return True
+
+def cli_stats(args):
+    """Print the enrichment progress of CSV files and the size of the caches."""
+    files = expand_files(args.files, ('.csv', PARQUET_EXTENSION))
+    ok = run_queue(files, print_csv_stats)
+    cache_dirs = [args.cache_dir] if args.cache_dir else sorted({os.path.dirname(os.path.abspath(f)) for f in files})
+    for cache_dir in cache_dirs:
+        search_cache_file = os.path.join(cache_dir, searchcache.SEARCH_CACHE_FILE_NAME)
+        if os.path.exists(search_cache_file):
+            cache = searchcache.SearchCache(search_cache_file)
+            print(f"Search cache {search_cache_file}: {len(cache)} searches")
+            cache.close()
+        page_cache_dir = os.path.join(cache_dir, pagecache.PAGE_CACHE_DIR_NAME)
+        if os.path.exists(page_cache_dir):
+            cache = pagecache.PageCache(page_cache_dir)
+            print(f"Page cache {page_cache_dir}: {len(cache)} pages, {cache.total_size() / 1024 / 1024:.1f} MB")
+            cache.close()
+        results_store_file = os.path.join(cache_dir, resultstore.RESULTS_STORE_FILE_NAME)
+        if os.path.exists(results_store_file):
+            store = resultstore.ResultStore(results_store_file)
+            print(f"Results store {results_store_file}: {len(store)} companies")
+            store.close()
+    return ok
+
+def positive_int(value):
+    """Parse a positive integer command line argument."""
+    if not value.isdigit() or int(value) < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value!r}")
+    return int(value)
+
+def build_arg_parser():
+    """Build the command line parser for unattended runs."""
+    parser = argparse.ArgumentParser(prog="biz2mail", description="Find the websites and emails of companies. "
+                                     "Without a command the interactive menu is shown.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert = commands.add_parser("convert", help="convert Excel files to CSV files")
+    convert.add_argument("files", nargs="+", help="Excel files or glob patterns")
+    convert.add_argument("--vat-column", default=DEFAULT_COLUMN_VAT)
+    convert.add_argument("--company-column", default=DEFAULT_COLUMN_COMPANY)
+    convert.add_argument("--max-records", type=int, default=MAX_RECORDS,
+                         help="records per shard, 0 for a single file (default: %(default)s)")
+    convert.add_argument("--format", choices=("csv", "parquet"), default="csv",
+                         help="format of the files to enrich; parquet needs pyarrow (default: %(default)s)")
+    convert.set_defaults(handler=cli_convert)
+
+    enrich = commands.add_parser("enrich", help="populate the website and email columns of CSV files")
+    enrich.add_argument("files", nargs="+",
+                        help="CSV or Parquet files or glob patterns; shard base names with --workers")
+    enrich.add_argument("--concurrent", action="store_true", help="run searches and fetches concurrently")
+    enrich.add_argument("--search-concurrency", type=positive_int, default=DEFAULT_SEARCH_CONCURRENCY)
+    enrich.add_argument("--fetch-concurrency", type=positive_int, default=DEFAULT_FETCH_CONCURRENCY)
+    enrich.add_argument("--chunk-size", type=positive_int, help="stream the files in chunks of this many records")
+    enrich.add_argument("--workers", type=positive_int, help="enrich the shards of each base name in parallel")
+    enrich.add_argument("--cache-dir", help="directory of the search and page caches (default: next to each file)")
+    enrich.add_argument("--no-search-cache", action="store_true")
+    enrich.add_argument("--no-page-cache", action="store_true")
+    enrich.add_argument("--no-render", action="store_true", help="never render pages with a headless browser")
+    enrich.add_argument("--no-results-store", action="store_true", help="ignore the results of earlier runs")
+    enrich.add_argument("--max-age", type=positive_int, help="days before a company with emails is enriched again "
+                        f"(default: {RESULTS_MAX_AGE // (24 * 3600)})")
+    enrich.add_argument("--search-rate", type=float, help=f"searches per second (default: {SEARCH_RATE})")
+    enrich.add_argument("--domain-rate", type=float, help=f"page fetches per second per domain (default: {DOMAIN_RATE})")
+    enrich.add_argument("--search-results", type=positive_int,
+                        help=f"search results ranked per company (default: {SEARCH_RESULTS})")
+    enrich.add_argument("--websites", type=positive_int,
+                        help=f"best ranked websites crawled per company (default: {WEBSITES_TO_FETCH})")
+    enrich.add_argument("--search-backend", action="append", choices=("duckduckgo", "bing", "google"),
+                        help="search backend, repeat in order of preference (default: duckduckgo)")
+    enrich.add_argument("--search-strategy", choices=searchbackends.STRATEGIES)
+    enrich.set_defaults(handler=cli_enrich)
+
+    merge = commands.add_parser("merge", help="merge the resolved files of the shards of base names")
+    merge.add_argument("bases", nargs="+", help="base names of the sharded CSV files")
+    merge.set_defaults(handler=cli_merge)
+
+    stats = commands.add_parser("stats", help="show the progress of CSV files and the size of the caches")
+    stats.add_argument("files", nargs="+", help="CSV or Parquet files or glob patterns")
+    stats.add_argument("--cache-dir", help="directory of the caches (default: next to each file)")
+    stats.set_defaults(handler=cli_stats)
+
+    export = commands.add_parser("export", help="convert files and their resolved files between CSV and Parquet")
+    export.add_argument("files", nargs="+", help="CSV or Parquet files or glob patterns")
+    export.add_argument("--to", choices=("csv", "parquet"), required=True)
+    export.set_defaults(handler=cli_export)
+    return parser
+
+def run_cli(argv):
+    """Run a command line command and return the process exit code."""
+    args = build_arg_parser().parse_args(argv)
+    return 0 if args.handler(args) else 1
 
 def main():
     """Main function to control the workflow."""
@@ -235,17 +1472,28 @@ def main():
     print("Choose a step to run:")
     print("1: Generate CSV from Excel")
     print("2: Populate website and email data in CSV")
+    print("3: Populate website and email data in CSV (concurrent)")
+    print("4: Fold checkpoint journal into CSV")
+    print("5: Populate sharded CSV files in parallel")
     print("Q: Exit")
-    choice = input("Enter your choice (1/2/Q): ").strip()
+    choice = input("Enter your choice (1/2/3/4/5/Q): ").strip()
     
     if choice == '1':
         step_1_generate_csv()
     elif choice == '2':
         populate_website_email()
+    elif choice == '3':
+        populate_website_email(concurrent=True)
+    elif choice == '4':
+        fold_checkpoint_journal()
+    elif choice == '5':
+        populate_shards()
     elif choice.lower() == 'q':
         print("Exiting the script.")
     else:
         print("Invalid choice. Exiting.")
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:]))
     main()
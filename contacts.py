@@ -0,0 +1,114 @@
+import re
+
+# All patterns work on raw bytes so a page never needs to be decoded as a whole; every match is ASCII.
+EMAIL_LOCAL_CHARS = frozenset(b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._%+-")
+EMAIL_DOMAIN_REGEX = re.compile(rb"[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+EMAIL_DOMAIN_CHARS = b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789.-"
+MAX_EMAIL_CARRY = 1024  # Bytes kept between chunks for an email split across them; longer local parts get cut
+# \+? - optionally matches a leading "+"
+# \(?\d{1,3}\)? - optionally matches area code in parentheses
+# [\d\s\-\.\(\)]{7,15} - matches the remaining part of the number, allowing common delimiters
+PHONE_PATTERN = r"\+?\(?\d{1,3}\)?[\d\s\-\.\(\)]{7,15}"
+# The lookahead lets the regex engine skip bytes that cannot start a number, which halves the scan time
+PHONE_REGEX = re.compile(rb"(?=[+(\d])" + PHONE_PATTERN.encode('ascii'))
+PHONE_REGEX_TEXT = re.compile(r"(?=[+(\d])" + PHONE_PATTERN)
+
+# Cleaning a phone number keeps only digits, brackets and the plus sign
+PHONE_KEEP = b"0123456789()+"
+PHONE_DELETE = bytes(byte for byte in range(256) if byte not in PHONE_KEEP)
+PHONE_STRIP_TEXT = re.compile(r"[^\d\(\)\+]")
+
+def clean_phone(match):
+    """Strip the delimiters from a phone number match."""
+    return match.translate(None, PHONE_DELETE).decode('ascii')
+
+def iter_emails(data):
+    """Yield (start, end) spans of the emails in a page, jumping from one "@" to the next.
+
+    Finds the same emails as re.findall(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\\.[a-zA-Z]{2,}")
+    while only looking at the bytes around each "@".
+    """
+    previous_end = 0
+    at = data.find(b"@")
+    while at != -1:
+        start = at
+        while start > previous_end and data[start - 1] in EMAIL_LOCAL_CHARS:
+            start -= 1
+        domain = EMAIL_DOMAIN_REGEX.match(data, at + 1) if start < at else None
+        if domain:
+            yield start, domain.end()
+            previous_end = domain.end()
+            at = data.find(b"@", previous_end)
+        else:
+            at = data.find(b"@", at + 1)
+
+def has_prefix(data, start, prefix):
+    """Check case-insensitively whether the bytes before start are the given lowercase prefix."""
+    return start >= len(prefix) and data[start - len(prefix):start].lower() == prefix
+
+def extract_contacts(data, phones=True):
+    """Extract the emails, phone numbers and mailto:/tel: links of a page in one go.
+
+    Works on bytes (a str is encoded first). Emails are returned as a set that includes the
+    mailto: addresses; phone numbers keep their order of appearance. Pass phones=False to
+    skip the phone scan when only emails are needed.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8', 'surrogateescape')
+    contacts = {'emails': set(), 'phones': [], 'mailto': set(), 'tel': set()}
+    for start, end in iter_emails(data):
+        address = data[start:end].decode('ascii')
+        contacts['emails'].add(address)
+        if has_prefix(data, start, b"mailto:"):
+            contacts['mailto'].add(address)
+    if phones:
+        for match in PHONE_REGEX.finditer(data):
+            number = clean_phone(match.group())
+            contacts['phones'].append(number)
+            if has_prefix(data, match.start(), b"tel:"):
+                contacts['tel'].add(number)
+    return contacts
+
+class EmailScanner:
+    """Incremental email scan of a body that arrives in chunks.
+
+    Finds the same emails as extract_contacts(body, phones=False) on the whole body while only
+    keeping the part of the previous chunks an unfinished email may still start in.
+    """
+
+    def __init__(self):
+        self.emails = set()
+        self.pending = b""
+
+    def feed(self, chunk):
+        """Scan the next chunk and return the emails it completed."""
+        data = self.pending + chunk
+        # A match running into the end of the data may still grow with the next chunk
+        open_end = len(data.rstrip(EMAIL_DOMAIN_CHARS))
+        found = set()
+        scanned = 0
+        for start, end in iter_emails(data):
+            if end >= open_end:
+                break
+            found.add(data[start:end].decode('ascii'))
+            scanned = end
+        self.pending = data[max(scanned, len(data) - MAX_EMAIL_CARRY):]
+        return self.add(found)
+
+    def close(self):
+        """Scan what is left once the body is complete and return the emails it completed."""
+        found = {self.pending[start:end].decode('ascii') for start, end in iter_emails(self.pending)}
+        self.pending = b""
+        return self.add(found)
+
+    def add(self, found):
+        """Record the emails found and return the ones not seen before."""
+        new_emails = found - self.emails
+        self.emails.update(new_emails)
+        return new_emails
+
+def extract_phone_numbers(text):
+    """Return the phone numbers in a text joined with ";", keeping only digits, brackets and "+"."""
+    if isinstance(text, bytes):
+        return ";".join(clean_phone(match) for match in PHONE_REGEX.findall(text))
+    return ";".join(PHONE_STRIP_TEXT.sub('', match) for match in PHONE_REGEX_TEXT.findall(text))
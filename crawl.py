@@ -0,0 +1,127 @@
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urldefrag, urljoin, urlparse
+
+from ratelimit import domain_of
+
+DEFAULT_PAGE_BUDGET = 4  # Pages fetched per site, including the start page
+DEFAULT_CRAWL_CONCURRENCY = 3  # Pages of one site fetched at the same time
+
+HREF_REGEX = re.compile(rb"""href\s*=\s*["']([^"'#<>\s]+)""", re.IGNORECASE)
+SKIPPED_EXTENSIONS = (
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".css", ".js", ".zip", ".xml", ".mp4",
+)
+# Path keywords of the pages most likely to list contacts, with their weight
+LINK_KEYWORDS = (
+    (10, ("contatti", "contattaci", "contatto", "contact", "kontakt", "dove-siamo")),
+    (6, ("impressum", "imprint", "note-legali", "legal", "dati-societari")),
+    (4, ("chi-siamo", "chisiamo", "about", "azienda", "company")),
+    (3, ("privacy", "cookie")),
+)
+# Addresses that show up in page code but are never a company contact
+JUNK_EMAIL_DOMAINS = ("example.com", "example.org", "sentry.io", "wixpress.com", "domain.com", "email.com")
+JUNK_EMAIL_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp")
+
+def root_url(url):
+    """Get the root URL of the site of a URL."""
+    parsed_url = urlparse(url)
+    return f"{parsed_url.scheme}://{parsed_url.netloc}/"
+
+def extract_links(content, base_url):
+    """Return the absolute URLs of the links in a page that stay on the same site."""
+    if not content:
+        return []
+    host = domain_of(base_url)
+    links = []
+    for match in HREF_REGEX.finditer(content):
+        link = urldefrag(urljoin(base_url, match.group(1).decode('ascii', 'ignore')))[0]
+        parsed_link = urlparse(link)
+        if parsed_link.scheme not in ('http', 'https') or domain_of(link) != host:
+            continue
+        if parsed_link.path.lower().endswith(SKIPPED_EXTENSIONS):
+            continue
+        links.append(link)
+    return links
+
+def score_link(url):
+    """Score how likely a link is to lead to a page with contacts; 0 means not worth fetching."""
+    parsed_url = urlparse(url)
+    target = f"{parsed_url.path}?{parsed_url.query}".lower()
+    return max((weight for weight, keywords in LINK_KEYWORDS if any(k in target for k in keywords)), default=0)
+
+def rank_links(links):
+    """Return the distinct candidate links, best first; shorter URLs win ties."""
+    scored = {link: score_link(link) for link in links}
+    candidates = [link for link, score in scored.items() if score > 0]
+    return sorted(candidates, key=lambda link: (-scored[link], len(link)))
+
+def is_qualifying_email(email):
+    """Check whether an email looks like a real contact rather than an asset name or placeholder."""
+    email = email.lower()
+    domain = email.rsplit("@", 1)[-1]
+    return not email.endswith(JUNK_EMAIL_SUFFIXES) and domain not in JUNK_EMAIL_DOMAINS
+
+def page_key(url):
+    """Normalize a URL so the same page is not fetched twice."""
+    parsed_url = urlparse(url)
+    return (domain_of(url), parsed_url.path.rstrip("/") or "/", parsed_url.query)
+
+def crawl_site(start_url, fetch_page, page_budget=DEFAULT_PAGE_BUDGET, max_workers=DEFAULT_CRAWL_CONCURRENCY):
+    """Look for emails on a site, starting from start_url and fetching at most page_budget pages.
+
+    fetch_page(url) must return a dict with 'emails', 'content' and 'error' keys. After the
+    start page, the site root and the best ranked contact, imprint and privacy links are fetched
+    concurrently, and the crawl stops as soon as a qualifying email has been found.
+    Returns the emails found, the page the first of them was found on, the number of pages
+    fetched and whether the crawl timed out: the start page did, or no email was found and
+    any other page did, so the site is worth retrying.
+    """
+    result = {'emails': set(), 'source': None, 'pages': 1, 'timeout': False}
+    start_page = fetch_page(start_url)
+    if start_page['error'] == "timeout":
+        result['timeout'] = True
+        return result
+    result['emails'].update(start_page['emails'])
+    if start_page['emails']:
+        result['source'] = start_url
+
+    page_timed_out = False
+    seen = {page_key(start_url)}
+    frontier = [root_url(start_url)] + rank_links(extract_links(start_page['content'], start_url))
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while frontier and result['pages'] < page_budget:
+            if any(is_qualifying_email(email) for email in result['emails']):
+                break
+            batch = []
+            for url in frontier:
+                if page_key(url) not in seen and len(batch) < page_budget - result['pages']:
+                    seen.add(page_key(url))
+                    batch.append(url)
+            if not batch:
+                break
+            result['pages'] += len(batch)
+
+            pending = {executor.submit(fetch_page, url): url for url in batch}
+            next_links = []
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = pending.pop(future)
+                    page = future.result()
+                    page_timed_out = page_timed_out or page['error'] == "timeout"
+                    result['emails'].update(page['emails'])
+                    if page['emails'] and result['source'] is None:
+                        result['source'] = url
+                    next_links.extend(extract_links(page['content'], url))
+                if any(is_qualifying_email(email) for email in result['emails']):
+                    # Do not start the pages still queued; the ones already running finish in the background
+                    for future in pending:
+                        if future.cancel():
+                            result['pages'] -= 1
+                    break
+            frontier = rank_links(next_links)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    result['timeout'] = page_timed_out and not result['emails']
+    return result
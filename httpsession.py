@@ -0,0 +1,82 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+DEFAULT_POOL_CONNECTIONS = 64  # Number of per-host pools kept alive
+DEFAULT_POOL_MAXSIZE = 8  # Keep-alive connections kept per host
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF_FACTOR = 0.5  # Seconds, doubled after each retry
+RETRY_STATUS_CODES = (502, 504)  # 429 and 503 are throttling, left to the rate limiter
+
+def counting_pool_class(base_class, adapter):
+    """Create a connection pool class that reports every new connection to the adapter."""
+    class CountingConnectionPool(base_class):
+        def _new_conn(self):
+            adapter.count_connection()
+            return super()._new_conn()
+    return CountingConnectionPool
+
+class PooledAdapter(HTTPAdapter):
+    """HTTP adapter with per-host keep-alive pools that counts requests and new connections."""
+
+    def __init__(self, **kwargs):
+        self.stats_lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': counting_pool_class(HTTPConnectionPool, self),
+            'https': counting_pool_class(HTTPSConnectionPool, self),
+        }
+
+    def count_connection(self):
+        with self.stats_lock:
+            self.connections += 1
+
+    def send(self, request, **kwargs):
+        with self.stats_lock:
+            self.requests += 1
+        return super().send(request, **kwargs)
+
+def create_session(pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                   retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF_FACTOR):
+    """Create a session whose connections are pooled per host and kept alive between requests.
+
+    Connection errors and 502/504 responses are retried with exponential backoff.
+    Read timeouts are not retried so a slow site still fails fast. 429 and 503 responses are
+    returned as they are: the rate limiter backs off from the host, instead of a retry that
+    sleeps out Retry-After in the worker and bypasses the domain bucket.
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=retries,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        backoff_factor=backoff_factor,
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    session = requests.Session()
+    for prefix in ('http://', 'https://'):
+        session.mount(prefix, PooledAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                            max_retries=retry))
+    return session
+
+def connection_stats(session):
+    """Return the number of requests sent, connections opened and connections reused by a session."""
+    adapters = {id(adapter): adapter for adapter in session.adapters.values() if isinstance(adapter, PooledAdapter)}
+    requests_sent = sum(adapter.requests for adapter in adapters.values())
+    connections = sum(adapter.connections for adapter in adapters.values())
+    return {
+        'requests': requests_sent,
+        'connections': connections,
+        'reused': max(requests_sent - connections, 0),
+    }
@@ -0,0 +1,66 @@
+import json
+import os
+
+JOURNAL_SUFFIX = ".journal"
+
+def journal_path(csv_file):
+    """Get the path of the checkpoint journal kept next to a CSV or Parquet file.
+
+    The whole file name is kept, so aziende.csv and aziende.parquet never share a journal.
+    """
+    return f"{csv_file}{JOURNAL_SUFFIX}"
+
+def open_journal(csv_file):
+    """Open the checkpoint journal of a CSV file for appending."""
+    path = journal_path(csv_file)
+    journal_file = open(path, 'a', encoding='utf-8')
+    # Terminate a line left half written by a crash so new entries start on a fresh line
+    if journal_file.tell() > 0:
+        with open(path, 'rb') as existing:
+            existing.seek(-1, os.SEEK_END)
+            if existing.read(1) != b"\n":
+                journal_file.write("\n")
+    return journal_file
+
+def write_entries(journal_file, entries):
+    """Append a batch of (index, fields) completed records to the journal and flush them to disk once."""
+    journal_file.write("".join(json.dumps({'index': int(index), 'fields': fields}, ensure_ascii=False) + "\n"
+                               for index, fields in entries))
+    journal_file.flush()
+
+def truncate_journal(journal_file):
+    """Empty an open journal once its entries have been written to the output."""
+    journal_file.seek(0)
+    journal_file.truncate()
+
+def read_entries(csv_file):
+    """Yield the (index, fields) entries recorded in the journal of a CSV file."""
+    path = journal_path(csv_file)
+    if not os.path.exists(path):
+        return
+    with open(path, encoding='utf-8') as journal_file:
+        for line in journal_file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A crash can leave the last line half written; everything before it is still valid
+                print(f"Ignoring incomplete journal entry in {path}")
+                continue
+            yield entry['index'], entry['fields']
+
+def replay_journal(df, csv_file):
+    """Apply the journal entries of a CSV file to its DataFrame and return the replayed indices."""
+    replayed = []
+    for index, fields in read_entries(csv_file):
+        if index not in df.index:
+            continue
+        for column, value in fields.items():
+            df.at[index, column] = value
+        replayed.append(index)
+    return replayed
+
+def remove_journal(csv_file):
+    """Delete the journal of a CSV file once it has been folded back into the CSV."""
+    path = journal_path(csv_file)
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,173 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in milliseconds of the latency histogram buckets; the last bucket is unbounded
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+DEFAULT_PROGRESS_INTERVAL = 10  # Seconds between progress lines
+
+def format_duration(seconds):
+    """Format a duration in seconds as 1h02m03s, 2m03s or 3s."""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02}m{seconds:02}s"
+    if minutes:
+        return f"{minutes}m{seconds:02}s"
+    return f"{seconds}s"
+
+class Histogram:
+    """Latency histogram with fixed buckets, cheap enough to update on every call."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        milliseconds = seconds * 1000
+        bucket = next((i for i, bound in enumerate(HISTOGRAM_BOUNDS_MS) if milliseconds <= bound),
+                      len(HISTOGRAM_BOUNDS_MS))
+        self.buckets[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction):
+        """Return the upper bound in seconds of the bucket holding the given fraction of the observations."""
+        if not self.count:
+            return 0.0
+        threshold = fraction * self.count
+        cumulative = 0
+        for bucket, count in enumerate(self.buckets):
+            cumulative += count
+            if cumulative >= threshold:
+                break
+        if bucket == len(HISTOGRAM_BOUNDS_MS):
+            return self.max
+        return min(HISTOGRAM_BOUNDS_MS[bucket] / 1000, self.max)
+
+    def summary(self):
+        """Return the count, total, mean and percentiles of the histogram, in seconds."""
+        return {
+            'count': self.count,
+            'total': round(self.total, 3),
+            'mean': round(self.total / self.count, 4) if self.count else 0.0,
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99),
+            'max': round(self.max, 4),
+            'buckets_ms': dict(zip([*map(str, HISTOGRAM_BOUNDS_MS), "inf"], self.buckets)),
+        }
+
+class Metrics:
+    """Per-stage latencies, counters and record throughput of a run, logged as JSON lines.
+
+    Stages are timed with timer(); record_done() counts finished records and prints a progress
+    line with an ETA every progress_interval seconds. Without a log_file nothing is written.
+    """
+
+    def __init__(self, log_file=None, progress_interval=DEFAULT_PROGRESS_INTERVAL):
+        self.log_file = open(log_file, 'a', encoding='utf-8') if log_file else None
+        self.progress_interval = progress_interval
+        self.stages = {}
+        self.counters = {}
+        self.expected = 0
+        self.done = 0
+        self.started = time.monotonic()
+        self.last_progress = self.started
+        self.lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        """Record the latency of one call of a stage."""
+        with self.lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        """Time the enclosed block as one call of a stage."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.monotonic() - started)
+
+    def count(self, name, amount=1):
+        """Add to a named counter, such as an error type."""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def expect(self, records):
+        """Add records to the number the run is expected to enrich."""
+        with self.lock:
+            self.expected += records
+
+    def rate(self):
+        """Return the records enriched per second so far."""
+        elapsed = time.monotonic() - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def record_done(self):
+        """Count a finished record and print the progress line when it is due."""
+        with self.lock:
+            self.done += 1
+            now = time.monotonic()
+            due = now - self.last_progress >= self.progress_interval
+            if due:
+                self.last_progress = now
+        if due:
+            self.print_progress()
+
+    def print_progress(self):
+        """Print and log the records done, the throughput and the estimated time left."""
+        rate = self.rate()
+        remaining = max(self.expected - self.done, 0)
+        eta = format_duration(remaining / rate) if rate else "unknown"
+        percent = f" ({self.done / self.expected:.0%})" if self.expected else ""
+        print(f"Progress: {self.done}/{self.expected} records{percent}, {rate:.2f} records/s, ETA {eta}")
+        self.log("progress", done=self.done, expected=self.expected, rate=round(rate, 3))
+
+    def log(self, event, **fields):
+        """Append an event to the JSON-lines log."""
+        if self.log_file is None:
+            return
+        line = json.dumps({'time': round(time.time(), 3), 'event': event, **fields}, default=str)
+        with self.lock:
+            self.log_file.write(line + "\n")
+            self.log_file.flush()
+
+    def summary(self):
+        """Return the throughput, counters and stage histograms of the run."""
+        with self.lock:
+            return {
+                'records': self.done,
+                'seconds': round(time.monotonic() - self.started, 3),
+                'records_per_second': round(self.rate(), 3),
+                'counters': dict(self.counters),
+                'stages': {stage: histogram.summary() for stage, histogram in self.stages.items()},
+            }
+
+    def print_summary(self):
+        """Print the throughput, the latency of each stage and the counters."""
+        summary = self.summary()
+        print(f"Enriched {summary['records']} records in {format_duration(summary['seconds'])} "
+              f"({summary['records_per_second']:.2f} records/s)")
+        for stage, stats in sorted(summary['stages'].items()):
+            print(f"  {stage}: {stats['count']} calls, {stats['total']:.1f}s total, "
+                  f"p50 {stats['p50'] * 1000:.0f}ms, p90 {stats['p90'] * 1000:.0f}ms, max {stats['max'] * 1000:.0f}ms")
+        for name, count in sorted(summary['counters'].items()):
+            print(f"  {name}: {count}")
+
+    def close(self, **fields):
+        """Log the summary of the run, with any extra fields, and close the log."""
+        self.log("summary", **self.summary(), **fields)
+        if self.log_file is not None:
+            with self.lock:
+                self.log_file.close()
+                self.log_file = None
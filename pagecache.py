@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from searchcache import SQLITE_TIMEOUT
+
+PAGE_CACHE_DIR_NAME = "biz2mail-pages"
+DEFAULT_PAGE_CACHE_MAX_BYTES = 200 * 1024 * 1024  # Cap on the compressed bodies kept on disk
+
+class PageCache:
+    """Content-addressed cache of fetched pages with their validators and extracted emails.
+
+    Bodies are stored zlib-compressed under the SHA-256 of their content, so pages
+    with identical content share one file. The least recently used pages are evicted
+    once the compressed bodies exceed max_bytes.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_PAGE_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.bodies_dir = os.path.join(cache_dir, "bodies")
+        self.max_bytes = max_bytes
+        self.revalidated = 0
+        self.stored = 0
+        self.evicted = 0
+        self.lock = threading.Lock()
+        os.makedirs(self.bodies_dir, exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"),
+                                          check_same_thread=False, timeout=SQLITE_TIMEOUT)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, body_hash TEXT NOT NULL, "
+            "etag TEXT, last_modified TEXT, emails TEXT NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS bodies (body_hash TEXT PRIMARY KEY, size INTEGER NOT NULL)"
+        )
+        self.connection.commit()
+
+    def body_path(self, body_hash):
+        """Get the path of the compressed body with the given hash."""
+        return os.path.join(self.bodies_dir, f"{body_hash}.z")
+
+    def lookup(self, url):
+        """Return the cached entry of a URL as a dict, or None if the URL is not cached."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT body_hash, etag, last_modified, emails FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'body_hash': row[0], 'etag': row[1], 'last_modified': row[2], 'emails': json.loads(row[3])}
+
+    def conditional_headers(self, entry):
+        """Build the conditional GET headers that revalidate a cached entry."""
+        headers = {}
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def touch(self, url):
+        """Mark a cached URL as reused after a 304 Not Modified response."""
+        with self.lock:
+            self.connection.execute("UPDATE pages SET last_access = ? WHERE url = ?", (time.time(), url))
+            self.connection.commit()
+            self.revalidated += 1
+
+    def store(self, url, body, etag, last_modified, emails):
+        """Store a fetched body with its validators and the emails extracted from it.
+
+        The previous body of the URL is deleted when no other page shares it.
+        """
+        body_hash = hashlib.sha256(body).hexdigest()
+        with self.lock:
+            previous = self.connection.execute("SELECT body_hash FROM pages WHERE url = ?", (url,)).fetchone()
+            if not os.path.exists(self.body_path(body_hash)):
+                compressed = zlib.compress(body)
+                with open(self.body_path(body_hash), 'wb') as body_file:
+                    body_file.write(compressed)
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO bodies (body_hash, size) VALUES (?, ?)", (body_hash, len(compressed))
+                )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO pages (url, body_hash, etag, last_modified, emails, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, body_hash, etag, last_modified, json.dumps(sorted(emails)), time.time()),
+            )
+            if previous is not None and previous[0] != body_hash:
+                self.drop_unused_body(previous[0])
+            self.stored += 1
+            self.evict()
+            self.connection.commit()
+
+    def read_body(self, url):
+        """Return the decompressed cached body of a URL, or None if it is not cached."""
+        entry = self.lookup(url)
+        if entry is None or not os.path.exists(self.body_path(entry['body_hash'])):
+            return None
+        with open(self.body_path(entry['body_hash']), 'rb') as body_file:
+            return zlib.decompress(body_file.read())
+
+    def total_size(self):
+        """Return the size in bytes of the compressed bodies on disk."""
+        return self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM bodies").fetchone()[0]
+
+    def evict(self):
+        """Drop the least recently used pages until the bodies fit in max_bytes. Call with the lock held."""
+        total = self.total_size()
+        while total > self.max_bytes:
+            row = self.connection.execute("SELECT url, body_hash FROM pages ORDER BY last_access LIMIT 1").fetchone()
+            if row is None:
+                break
+            url, body_hash = row
+            self.connection.execute("DELETE FROM pages WHERE url = ?", (url,))
+            self.evicted += 1
+            total -= self.drop_unused_body(body_hash)
+
+    def drop_unused_body(self, body_hash):
+        """Delete a body no page refers to any more and return the bytes freed. Call with the lock held."""
+        still_used = self.connection.execute(
+            "SELECT 1 FROM pages WHERE body_hash = ? LIMIT 1", (body_hash,)
+        ).fetchone()
+        if still_used is not None:
+            return 0
+        size = self.connection.execute("SELECT size FROM bodies WHERE body_hash = ?", (body_hash,)).fetchone()
+        self.connection.execute("DELETE FROM bodies WHERE body_hash = ?", (body_hash,))
+        if os.path.exists(self.body_path(body_hash)):
+            os.remove(self.body_path(body_hash))
+        return size[0] if size else 0
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def close(self):
+        """Close the underlying index database."""
+        with self.lock:
+            self.connection.close()
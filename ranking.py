@@ -0,0 +1,73 @@
+import re
+from difflib import SequenceMatcher
+from urllib.parse import urlparse
+
+from ratelimit import domain_of
+
+DEFAULT_SEARCH_RESULTS = 5  # Results requested from the search backend
+DEFAULT_WEBSITES_TO_FETCH = 2  # Best ranked websites kept for the email lookup
+# Registries, directories and social networks that list companies but are never their website
+DENYLIST_DOMAINS = (
+    "ufficiocamerale.it", "registroimprese.it", "registroaziende.it", "reteimprese.it", "paginegialle.it",
+    "paginebianche.it", "informazione-aziende.it", "atoka.io", "companyreports.it", "reportaziende.it",
+    "fatturatoitalia.it", "misterimprese.it", "kompass.com", "europages.it", "europages.com", "infobel.com",
+    "cylex-italia.it", "trovaimprese.it", "aziende.virgilio.it", "dnb.com", "opencorporates.com",
+    "facebook.com", "instagram.com", "linkedin.com", "twitter.com", "x.com", "youtube.com", "tiktok.com",
+    "wikipedia.org", "amazon.it", "tripadvisor.it", "google.com",
+)
+# Bonus of the top level domains, Italian companies mostly use .it
+TLD_BONUS = {"it": 0.3, "eu": 0.1, "com": 0.1, "net": 0.05}
+# Legal forms and filler words that never appear in a company domain
+COMPANY_STOPWORDS = frozenset((
+    "srl", "srls", "spa", "snc", "sas", "sapa", "scarl", "scrl", "sc", "ss", "coop", "cooperativa",
+    "societa", "società", "soc", "di", "del", "della", "dei", "e", "ed", "c", "f", "lli", "fratelli",
+    "in", "liquidazione", "unipersonale", "semplificata", "responsabilita", "limitata", "the",
+))
+
+def company_tokens(company_name):
+    """Split a company name into the lowercase words that may appear in its domain."""
+    name = re.sub(r"s\.\s*r\.\s*l\.?|s\.\s*p\.\s*a\.?|s\.\s*n\.\s*c\.?|s\.\s*a\.\s*s\.?", " ", company_name.lower())
+    words = re.findall(r"[^\W_]+", name)
+    return [word for word in words if word not in COMPANY_STOPWORDS]
+
+def domain_label(url):
+    """Return the registrable label of the domain of a URL: "alfaserramenti" for www.alfaserramenti.it."""
+    labels = domain_of(url).split(".")
+    return labels[-2] if len(labels) >= 2 else labels[0]
+
+def is_denylisted(url):
+    """Check whether a URL belongs to a registry, directory or social network."""
+    domain = domain_of(url)
+    return any(domain == denied or domain.endswith(f".{denied}") for denied in DENYLIST_DOMAINS)
+
+def name_similarity(company_name, url):
+    """Score from 0 to 1 how well the domain of a URL matches a company name."""
+    tokens = company_tokens(company_name)
+    label = domain_label(url).replace("-", "")
+    if not tokens or not label:
+        return 0.0
+    significant = [token for token in tokens if len(token) >= 3] or tokens
+    contained = sum(len(token) for token in significant if token in label) / sum(len(token) for token in significant)
+    return max(contained, SequenceMatcher(None, "".join(tokens), label).ratio())
+
+def score_url(url, company_name, position=0):
+    """Score a search result as the website of a company; None for denylisted results."""
+    if is_denylisted(url):
+        return None
+    parsed_url = urlparse(url)
+    tld = domain_of(url).rsplit(".", 1)[-1]
+    depth = len([part for part in parsed_url.path.split("/") if part])
+    return (name_similarity(company_name, url) + TLD_BONUS.get(tld, 0.0)
+            - 0.05 * min(depth, 4)  # Home pages over deep pages
+            - 0.02 * position)  # Keep the search order between equal results
+
+def rank_urls(urls, company_name, limit=DEFAULT_WEBSITES_TO_FETCH):
+    """Return the best ranked search results for a company, one per domain and at most limit of them."""
+    best = {}
+    for position, url in enumerate(urls):
+        score = score_url(url, company_name, position)
+        domain = domain_of(url)
+        if score is not None and (domain not in best or score > best[domain][0]):
+            best[domain] = (score, position, url)
+    ranked = sorted(best.values(), key=lambda candidate: (-candidate[0], candidate[1]))
+    return [url for score, position, url in ranked[:limit]]
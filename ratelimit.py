@@ -0,0 +1,154 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+DEFAULT_SEARCH_RATE = 1.0  # Searches per second
+DEFAULT_SEARCH_BURST = 1
+DEFAULT_DOMAIN_RATE = 1.0  # Requests per second to a single domain
+DEFAULT_DOMAIN_BURST = 2  # Lets the page and root fetch of a site go out back to back
+DEFAULT_BACKOFF = 30  # Seconds to pause a throttled bucket without a Retry-After header
+MAX_BACKOFF = 600
+MIN_RATE_FACTOR = 1 / 16  # Lowest share of the base rate a throttled bucket slows down to
+THROTTLE_STATUS_CODES = (429, 503)
+
+def parse_retry_after(value):
+    """Parse a Retry-After header, in seconds or as an HTTP date, into a delay in seconds."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    """Thread-safe token bucket that slows down when throttled and recovers on success."""
+
+    def __init__(self, rate, capacity):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Wait until a token is available and take it; return the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def throttle(self, delay):
+        """Pause the bucket for the given delay and halve its rate."""
+        with self.lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + delay)
+            self.rate = max(self.rate / 2, self.base_rate * MIN_RATE_FACTOR)
+            self.tokens = 0
+
+    def is_blocked(self):
+        """Check whether the bucket is paused after being throttled."""
+        with self.lock:
+            return time.monotonic() < self.blocked_until
+
+    def recover(self):
+        """Move the rate of a throttled bucket back towards its base rate."""
+        with self.lock:
+            if self.rate < self.base_rate:
+                self.rate = min(self.base_rate, self.rate * 1.25)
+
+class RateLimiter:
+    """Per-domain token buckets for page fetches plus one bucket per search backend."""
+
+    def __init__(self, search_rate=DEFAULT_SEARCH_RATE, domain_rate=DEFAULT_DOMAIN_RATE,
+                 search_burst=DEFAULT_SEARCH_BURST, domain_burst=DEFAULT_DOMAIN_BURST):
+        self.search_rate = search_rate
+        self.search_burst = search_burst
+        self.search_bucket = TokenBucket(search_rate, search_burst)
+        self.search_buckets = {None: self.search_bucket}
+        self.domain_rate = domain_rate
+        self.domain_burst = domain_burst
+        self.domain_buckets = {}
+        self.backoffs = {}
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def domain_bucket(self, domain):
+        with self.lock:
+            bucket = self.domain_buckets.get(domain)
+            if bucket is None:
+                bucket = self.domain_buckets[domain] = TokenBucket(self.domain_rate, self.domain_burst)
+            return bucket
+
+    def backend_bucket(self, backend):
+        with self.lock:
+            bucket = self.search_buckets.get(backend)
+            if bucket is None:
+                bucket = self.search_buckets[backend] = TokenBucket(self.search_rate, self.search_burst)
+            return bucket
+
+    def next_backoff(self, key, retry_after):
+        """Return the delay to apply to a throttled bucket, doubling it on repeated throttling."""
+        with self.lock:
+            self.throttled += 1
+            if retry_after is not None:
+                self.backoffs[key] = min(retry_after, MAX_BACKOFF)
+            else:
+                previous = self.backoffs.get(key)
+                self.backoffs[key] = min(previous * 2, MAX_BACKOFF) if previous else DEFAULT_BACKOFF
+            return self.backoffs[key]
+
+    def acquire_search(self, backend=None):
+        """Wait for the bucket of a search backend."""
+        return self.backend_bucket(backend).acquire()
+
+    def search_blocked(self, backend=None):
+        """Check whether a search backend is paused after rate limiting us."""
+        return self.backend_bucket(backend).is_blocked()
+
+    def acquire_domain(self, url):
+        """Wait for the bucket of the domain of a URL."""
+        return self.domain_bucket(domain_of(url)).acquire()
+
+    def search_throttled(self, retry_after=None, backend=None):
+        """Slow a search backend down after it rate limited us."""
+        self.backend_bucket(backend).throttle(self.next_backoff(("search", backend), retry_after))
+
+    def search_succeeded(self, backend=None):
+        """Let the bucket of a search backend recover after a successful search."""
+        with self.lock:
+            self.backoffs.pop(("search", backend), None)
+        self.backend_bucket(backend).recover()
+
+    def report_response(self, url, status_code, retry_after_header=None):
+        """Adapt the bucket of a domain to the status code of its last response."""
+        domain = domain_of(url)
+        bucket = self.domain_bucket(domain)
+        if status_code in THROTTLE_STATUS_CODES:
+            bucket.throttle(self.next_backoff(domain, parse_retry_after(retry_after_header)))
+        elif status_code < 400:
+            with self.lock:
+                self.backoffs.pop(domain, None)
+            bucket.recover()
+
+def domain_of(url):
+    """Get the lowercase host of a URL without a leading www."""
+    host = (urlparse(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
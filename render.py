@@ -0,0 +1,130 @@
+import queue
+import re
+import threading
+import time
+
+DEFAULT_RENDER_POOL_SIZE = 2  # Headless browsers kept open at most
+DEFAULT_RENDER_TIMEOUT = 15  # Seconds a browser may spend loading a page
+MIN_VISIBLE_TEXT = 200  # Pages with less visible text than this may be rendered by JavaScript
+
+# Markers of single page apps whose content only exists after the scripts have run
+SPA_MARKERS = (
+    rb'<div id="root"></div>', rb'<div id="app"></div>', rb'<app-root', rb'ng-app', rb'data-reactroot',
+    rb'window.__NUXT__', rb'id="___gatsby"', rb'enable javascript', rb'javascript is required',
+    rb'javascript to run this app',
+)
+SCRIPT_OR_STYLE_REGEX = re.compile(rb"<(script|style|noscript)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+TAG_REGEX = re.compile(rb"<[^>]*>")
+
+class RenderUnavailable(Exception):
+    """No headless browser can be started."""
+
+def visible_text_length(content):
+    """Return the number of non-blank bytes of a page outside its tags, scripts and styles."""
+    text = TAG_REGEX.sub(b" ", SCRIPT_OR_STYLE_REGEX.sub(b" ", content))
+    return len(b"".join(text.split()))
+
+def looks_js_rendered(content):
+    """Check whether a static page looks like it is filled in by JavaScript."""
+    if not content or not content.strip():
+        return True
+    lowered = content.lower()
+    if any(marker.lower() in lowered for marker in SPA_MARKERS):
+        return True
+    return b"<script" in lowered and visible_text_length(content) < MIN_VISIBLE_TEXT
+
+def create_chrome_driver(page_timeout=DEFAULT_RENDER_TIMEOUT):
+    """Start a headless Chrome through Selenium."""
+    try:
+        from selenium import webdriver
+        from selenium.common.exceptions import WebDriverException
+    except ImportError as err:
+        raise RenderUnavailable("selenium is not installed") from err
+    options = webdriver.ChromeOptions()
+    for argument in ("--headless=new", "--disable-gpu", "--no-sandbox", "--blink-settings=imagesEnabled=false"):
+        options.add_argument(argument)
+    try:
+        driver = webdriver.Chrome(options=options)
+    except WebDriverException as err:
+        raise RenderUnavailable(f"Chrome could not be started: {err.msg}") from err
+    driver.set_page_load_timeout(page_timeout)
+    return driver
+
+class RenderPool:
+    """Bounded pool of reusable headless browsers for pages that need JavaScript.
+
+    Browsers are started on demand up to max_workers and reused for later pages; callers wait
+    for a free browser instead of starting more. If no browser can be started the pool disables
+    itself and render() returns None.
+    """
+
+    def __init__(self, max_workers=DEFAULT_RENDER_POOL_SIZE, driver_factory=create_chrome_driver):
+        self.max_workers = max_workers
+        self.driver_factory = driver_factory
+        self.idle = queue.Queue()
+        self.drivers = []
+        self.disabled = False
+        self.rendered = 0
+        self.failed = 0
+        self.seconds = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take an idle browser, starting a new one while under max_workers; None if disabled."""
+        with self.lock:
+            if self.disabled:
+                return None
+            start_new = self.idle.empty() and len(self.drivers) < self.max_workers
+            if start_new:
+                self.drivers.append(None)  # Reserve the slot while the browser starts
+        while not start_new:
+            try:
+                return self.idle.get(timeout=1)
+            except queue.Empty:
+                if self.disabled:  # The browser we were waiting for never started
+                    return None
+        try:
+            driver = self.driver_factory()
+        except RenderUnavailable as err:
+            print(f"JavaScript rendering disabled: {err}")
+            with self.lock:
+                self.drivers.remove(None)
+                self.disabled = True
+            return None
+        with self.lock:
+            self.drivers[self.drivers.index(None)] = driver
+        return driver
+
+    def render(self, url):
+        """Load a page in a browser and return the rendered HTML as bytes, or None if it failed."""
+        driver = self.acquire()
+        if driver is None:
+            return None
+        started = time.monotonic()
+        try:
+            driver.get(url)
+            content = driver.page_source.encode('utf-8')
+        except Exception as err:
+            print(f"An error occurred while rendering the URL {url}: {err}")
+            with self.lock:
+                self.failed += 1
+            return None
+        else:
+            with self.lock:
+                self.rendered += 1
+            return content
+        finally:
+            with self.lock:
+                self.seconds += time.monotonic() - started
+            self.idle.put(driver)
+
+    def close(self):
+        """Quit all the browsers."""
+        with self.lock:
+            drivers = [driver for driver in self.drivers if driver is not None]
+            self.drivers = []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
@@ -0,0 +1,83 @@
+import sqlite3
+import threading
+import time
+
+from searchcache import SQLITE_TIMEOUT
+from vatcode import is_valid_vat, normalize_vat
+
+RESULTS_STORE_FILE_NAME = "biz2mail-results.sqlite"
+DEFAULT_MAX_AGE = 90 * 24 * 3600  # Seconds a company with emails keeps its stored result
+DEFAULT_FAILURE_MAX_AGE = 30 * 24 * 3600  # Seconds a "No website found" or "No emails found" result stays valid
+SEARCH_FAILED = "search failed"  # Error of a record whose search itself failed, unlike "No website found"
+RETRIABLE_ERRORS = ("timeout", SEARCH_FAILED)  # Transient failures, never stored and always enriched again
+
+def store_key(vat_code):
+    """Return the key of a company in the store, or None if its VAT code is not valid."""
+    vat = normalize_vat(vat_code)
+    return vat if is_valid_vat(vat) else None
+
+class ResultStore:
+    """Persistent SQLite store of enrichment results by VAT code, shared by every input file.
+
+    A company is enriched again only when it has no stored result, its result is older than
+    max_age (failure_max_age for failures), or it failed in a retriable way.
+    """
+
+    def __init__(self, path, max_age=DEFAULT_MAX_AGE, failure_max_age=DEFAULT_FAILURE_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self.failure_max_age = failure_max_age
+        self.reused = 0
+        self.stale = 0
+        self.stored = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=SQLITE_TIMEOUT)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results (vat TEXT PRIMARY KEY, company TEXT NOT NULL, "
+            "website TEXT NOT NULL, emails TEXT NOT NULL, source_url TEXT, status TEXT NOT NULL, "
+            "fetched_at REAL NOT NULL)"
+        )
+        self.connection.commit()
+
+    def get(self, vat_code):
+        """Return the stored website, email and error fields of a company, or None if it must be enriched."""
+        key = store_key(vat_code)
+        if key is None:
+            return None
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT website, emails, status, fetched_at FROM results WHERE vat = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            website, emails, status, fetched_at = row
+            max_age = self.max_age if status == "no" else self.failure_max_age
+            if status in RETRIABLE_ERRORS or time.time() - fetched_at >= max_age:
+                self.stale += 1
+                return None
+            self.reused += 1
+            return {'website': website, 'email': emails, 'error': status}
+
+    def put(self, vat_code, company, fields, source_url=None):
+        """Store the result of a company; invalid VAT codes and transient failures are not stored."""
+        key = store_key(vat_code)
+        if key is None or fields.get('error') in RETRIABLE_ERRORS:
+            return
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO results (vat, company, website, emails, source_url, status, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, company, fields.get('website', ''), fields.get('email', ''), source_url,
+                 fields.get('error', ''), time.time()),
+            )
+            self.connection.commit()
+            self.stored += 1
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        """Close the underlying database."""
+        with self.lock:
+            self.connection.close()
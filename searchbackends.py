@@ -0,0 +1,228 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from duckduckgo_search import DDGS
+from duckduckgo_search.exceptions import RatelimitException
+
+from ratelimit import parse_retry_after
+
+# Search strategies, see SearchRouter
+FIRST_SUCCESS = "first-success"  # Try the backends in order until one finds a website
+RACE = "race"  # Query the backends at the same time and take the fastest website found
+FALLBACK = "fallback"  # Use the first backend and move to the next only on errors or rate limiting
+STRATEGIES = (FIRST_SUCCESS, RACE, FALLBACK)
+
+DEFAULT_MAX_RESULTS = 1
+SEARCH_TIMEOUT = 10  # Seconds to wait for a search API response
+BING_SEARCH_URL = "https://api.bing.microsoft.com/v7.0/search"
+GOOGLE_SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
+
+class SearchError(Exception):
+    """A search backend failed to answer."""
+
+class SearchRateLimited(SearchError):
+    """A search backend rate limited us."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def check_api_response(response):
+    """Raise the search error matching an unsuccessful API response."""
+    if response.status_code == 429:
+        raise SearchRateLimited(f"HTTP {response.status_code}", parse_retry_after(response.headers.get('Retry-After')))
+    if response.status_code != 200:
+        raise SearchError(f"HTTP {response.status_code}")
+
+class DuckDuckGoBackend:
+    """Search through the DuckDuckGo HTML results, no API key needed."""
+
+    name = "duckduckgo"
+
+    def search(self, search_term, max_results=DEFAULT_MAX_RESULTS):
+        """Return the URLs found for a term."""
+        try:
+            results = DDGS().text(search_term, max_results=max_results)
+        except RatelimitException as err:
+            raise SearchRateLimited(str(err)) from err
+        except Exception as err:
+            raise SearchError(str(err)) from err
+        return [result['href'] for result in results if 'href' in result]
+
+class BingBackend:
+    """Search through the Bing Web Search API."""
+
+    name = "bing"
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+
+    def search(self, search_term, max_results=DEFAULT_MAX_RESULTS):
+        """Return the URLs found for a term."""
+        try:
+            response = requests.get(BING_SEARCH_URL, headers={'Ocp-Apim-Subscription-Key': self.api_key},
+                                    params={'q': search_term, 'count': max_results}, timeout=SEARCH_TIMEOUT)
+        except requests.RequestException as err:
+            raise SearchError(str(err)) from err
+        check_api_response(response)
+        results = response.json().get('webPages', {}).get('value', [])
+        return [result['url'] for result in results[:max_results] if 'url' in result]
+
+class GoogleBackend:
+    """Search through the Google Custom Search JSON API."""
+
+    name = "google"
+
+    def __init__(self, api_key, cse_id):
+        self.api_key = api_key
+        self.cse_id = cse_id
+
+    def search(self, search_term, max_results=DEFAULT_MAX_RESULTS):
+        """Return the URLs found for a term."""
+        try:
+            response = requests.get(GOOGLE_SEARCH_URL, params={
+                'key': self.api_key, 'cx': self.cse_id, 'q': search_term, 'num': min(max_results, 10),
+            }, timeout=SEARCH_TIMEOUT)
+        except requests.RequestException as err:
+            raise SearchError(str(err)) from err
+        check_api_response(response)
+        results = response.json().get('items', [])
+        return [result['link'] for result in results[:max_results] if 'link' in result]
+
+class MockBackend:
+    """Local backend for tests and benchmarks that answers from a dict of search results.
+
+    results maps a company name, matched at the start of the search term, to its URLs.
+    delay simulates the response time and error, when set, is raised on every search.
+    """
+
+    def __init__(self, results=None, name="mock", delay=0.0, error=None):
+        self.results = results or {}
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.searches = []
+        self.lock = threading.Lock()
+
+    def search(self, search_term, max_results=DEFAULT_MAX_RESULTS):
+        """Return the URLs found for a term."""
+        with self.lock:
+            self.searches.append(search_term)
+        if self.delay:
+            time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        for company, urls in self.results.items():
+            if search_term.startswith(company):
+                return list(urls)[:max_results]
+        return []
+
+def create_backend(name):
+    """Create a backend by name, reading its API keys from the environment; None if they are missing."""
+    if name == DuckDuckGoBackend.name:
+        return DuckDuckGoBackend()
+    if name == BingBackend.name:
+        api_key = os.getenv('BING_API_KEY')
+        return BingBackend(api_key) if api_key else None
+    if name == GoogleBackend.name:
+        api_key, cse_id = os.getenv('GOOGLE_API_KEY'), os.getenv('CSE_ID')
+        return GoogleBackend(api_key, cse_id) if api_key and cse_id else None
+    raise ValueError(f"Unknown search backend: {name}")
+
+def create_backends(names):
+    """Create the configured backends, skipping the ones without API keys."""
+    backends = []
+    for name in names:
+        backend = create_backend(name)
+        if backend is None:
+            print(f"Search backend {name} skipped: API key not set")
+        else:
+            backends.append(backend)
+    return backends
+
+class SearchRouter:
+    """Send searches to one or more backends following a strategy.
+
+    Every backend has its own bucket in the rate limiter, so a backend that rate limited us is
+    paused on its own: while it is paused the other backends are tried first. search() returns
+    the URLs found, an empty list when the backends found nothing, or None when they all failed.
+    """
+
+    def __init__(self, backends, rate_limiter, strategy=FALLBACK, max_results=DEFAULT_MAX_RESULTS):
+        if not backends:
+            raise ValueError("At least one search backend is needed")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown search strategy: {strategy}")
+        self.backends = list(backends)
+        self.rate_limiter = rate_limiter
+        self.strategy = strategy
+        self.max_results = max_results
+        self.answered = {backend.name: 0 for backend in self.backends}
+        self.failed = {backend.name: 0 for backend in self.backends}
+        self.lock = threading.Lock()
+
+    def ordered_backends(self):
+        """Return the backends in their configured order, the paused ones last."""
+        paused = [backend for backend in self.backends if self.rate_limiter.search_blocked(backend.name)]
+        return [backend for backend in self.backends if backend not in paused] + paused
+
+    def query(self, backend, search_term):
+        """Query one backend within its rate limit; return its URLs or None if it failed."""
+        self.rate_limiter.acquire_search(backend.name)
+        try:
+            urls = backend.search(search_term, max_results=self.max_results)
+        except SearchRateLimited as err:
+            print(f"Search rate limited by {backend.name}, slowing down: {err}")
+            self.rate_limiter.search_throttled(err.retry_after, backend=backend.name)
+        except SearchError as err:
+            print(f"An error occurred searching with {backend.name}: {err}")
+        else:
+            self.rate_limiter.search_succeeded(backend.name)
+            with self.lock:
+                self.answered[backend.name] += 1
+            return urls
+        with self.lock:
+            self.failed[backend.name] += 1
+        return None
+
+    def search(self, search_term):
+        """Search a term following the strategy."""
+        if self.strategy == RACE:
+            return self.race(search_term)
+        result = None
+        for backend in self.ordered_backends():
+            urls = self.query(backend, search_term)
+            if urls is None:
+                continue
+            if urls or self.strategy == FALLBACK:
+                return urls
+            result = urls  # Nothing found here, another backend may still find it
+        return result
+
+    def race(self, search_term):
+        """Query the backends that are not paused at the same time and return the first website found.
+
+        Every race has its own threads, so a slow backend still finishing a lost race never
+        delays the concurrent searches.
+        """
+        backends = self.ordered_backends()
+        available = [backend for backend in backends if not self.rate_limiter.search_blocked(backend.name)]
+        racing = available or backends
+        executor = ThreadPoolExecutor(max_workers=len(racing))
+        try:
+            pending = {executor.submit(self.query, backend, search_term) for backend in racing}
+            result = None
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    urls = future.result()
+                    if urls:
+                        return urls  # The slower backends finish in the background
+                    if urls is not None:
+                        result = urls
+            return result
+        finally:
+            executor.shutdown(wait=False)
@@ -0,0 +1,75 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+
+from vatcode import normalize_vat
+
+SEARCH_CACHE_FILE_NAME = "biz2mail-search.sqlite"
+DEFAULT_SEARCH_CACHE_TTL = 30 * 24 * 3600  # Seconds a found website stays valid
+DEFAULT_NEGATIVE_CACHE_TTL = 7 * 24 * 3600  # Seconds a "No website found" result stays valid
+SQLITE_TIMEOUT = 30  # Seconds to wait for a lock held by a parallel shard worker, shared by every SQLite store
+
+def normalize_search_key(company_name, vat_code):
+    """Normalize a company name and VAT code into a cache key."""
+    company = re.sub(r"[^\w\s&]", "", company_name.lower())
+    company = " ".join(company.split())
+    return f"{company}|{normalize_vat(vat_code)}"
+
+class SearchCache:
+    """Persistent SQLite cache of search results, including negative results."""
+
+    def __init__(self, path, ttl=DEFAULT_SEARCH_CACHE_TTL, negative_ttl=DEFAULT_NEGATIVE_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=SQLITE_TIMEOUT)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS search_results "
+            "(search_key TEXT PRIMARY KEY, urls TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self.connection.commit()
+
+    def get(self, company_name, vat_code):
+        """Return the cached URLs for a company, an empty list for a cached miss, or None if not cached."""
+        key = normalize_search_key(company_name, vat_code)
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT urls, stored_at FROM search_results WHERE search_key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                urls = json.loads(row[0])
+                ttl = self.ttl if urls else self.negative_ttl
+                if time.time() - row[1] < ttl:
+                    self.hits += 1
+                    return urls
+            self.misses += 1
+            return None
+
+    def put(self, company_name, vat_code, urls):
+        """Store the URLs found for a company; an empty list records that no website was found."""
+        key = normalize_search_key(company_name, vat_code)
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO search_results (search_key, urls, stored_at) VALUES (?, ?, ?)",
+                (key, json.dumps(list(urls)), time.time()),
+            )
+            self.connection.commit()
+
+    def hit_rate(self):
+        """Return the share of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM search_results").fetchone()[0]
+
+    def close(self):
+        """Close the underlying database."""
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,68 @@
+import threading
+from concurrent.futures import Future
+from urllib.parse import urlparse
+
+from ratelimit import domain_of
+
+# Hosts that publish pages of many different companies, so their results are kept per page
+SHARED_HOST_DOMAINS = (
+    "facebook.com", "instagram.com", "linkedin.com", "twitter.com", "x.com", "youtube.com",
+    "paginegialle.it", "paginebianche.it", "ufficiocamerale.it", "reteimprese.it", "registroimprese.it",
+    "informazione-aziende.it", "atoka.io", "companyreports.it", "google.com", "sites.google.com",
+)
+
+def site_key(url):
+    """Return the key under which the crawl result of a URL is shared: its domain, or the page on shared hosts."""
+    domain = domain_of(url)
+    if domain in SHARED_HOST_DOMAINS or domain.endswith(tuple(f".{host}" for host in SHARED_HOST_DOMAINS)):
+        parsed_url = urlparse(url)
+        return f"{domain}{parsed_url.path.rstrip('/')}?{parsed_url.query}"
+    return domain
+
+class SiteIndex:
+    """Run-scoped index of crawl results by site, so every site is crawled at most once per run.
+
+    Rows that ask for a site while it is being crawled wait for that crawl instead of starting
+    their own.
+    """
+
+    def __init__(self):
+        self.results = {}
+        self.crawled = 0
+        self.shared = 0
+        self.lock = threading.Lock()
+
+    def get_or_crawl(self, url, crawl):
+        """Return the result of crawl(url), shared with every other URL of the same site."""
+        key = site_key(url)
+        with self.lock:
+            future = self.results.get(key)
+            owner = future is None
+            if owner:
+                future = self.results[key] = Future()
+                self.crawled += 1
+            else:
+                self.shared += 1
+        if not owner:
+            return future.result()
+
+        try:
+            result = crawl(url)
+        except BaseException as err:
+            with self.lock:
+                del self.results[key]  # Let a later row try again
+            future.set_exception(err)
+            raise
+        future.set_result(result)
+        return result
+
+    def forget(self, url):
+        """Drop the finished result of the site of a URL so the next request crawls it again."""
+        key = site_key(url)
+        with self.lock:
+            future = self.results.get(key)
+            if future is not None and future.done():  # Never drop a crawl other records are waiting for
+                del self.results[key]
+
+    def __len__(self):
+        return len(self.results)
@@ -0,0 +1,28 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench"))
+
+import bench_enrich  # noqa: E402
+from fakeweb import generate_sites, partita_iva  # noqa: E402
+from vatcode import is_valid_partita_iva  # noqa: E402
+
+class TestFakeWeb(unittest.TestCase):
+    def test_sites_have_valid_vat_codes(self):
+        sites = generate_sites(50)
+        self.assertTrue(all(is_valid_partita_iva(site.vat_code) for site in sites))
+        self.assertTrue(is_valid_partita_iva(partita_iva(0)))
+        self.assertEqual(len({site.domain for site in sites}), 50)
+
+class TestBenchEnrich(unittest.TestCase):
+    def test_offline_run_finds_the_emails(self):
+        result = bench_enrich.run_benchmark(companies=30, latency=0.001, search_latency=0.001, page_size=2048,
+                                            hang=0.5, error_rate=0.1, timeout_rate=0.0)
+        self.assertTrue(result['ok'])
+        self.assertEqual(result['emails_found'], result['emails_expected'])
+        self.assertGreater(result['records_per_second'], 0)
+        self.assertIn("root_fetch", result['stages'])
+
+if __name__ == "__main__":
+    unittest.main()
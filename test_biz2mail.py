@@ -0,0 +1,648 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+import biz2mail
+import journal
+import ratelimit
+
+SITES = {
+    "Alfa Srl": ["https://alfa.example/"],
+    "Beta Spa": ["https://beta.example/chi-siamo"],
+    "Gamma Snc": [],
+}
+PAGES = {
+    "https://alfa.example/": ["info@alfa.example"],
+    "https://beta.example/chi-siamo": [],
+    "https://beta.example/": ["contatti@beta.example"],
+}
+
+def fake_search(search_term):
+    for company, urls in SITES.items():
+        if search_term.startswith(company):
+            return urls
+    return []
+
+def fake_fetch_page(url):
+    return {'emails': PAGES.get(url, []), 'content': None, 'error': None}
+
+class TestEnrichCsvFile(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.csv_file = os.path.join(self.tmpdir.name, "aziende.csv")
+        pd.DataFrame({
+            biz2mail.DEFAULT_COLUMN_VAT: ["01", "02", "03"],
+            biz2mail.DEFAULT_COLUMN_COMPANY: list(SITES),
+            "website": ["", "", ""],
+            "email": ["", "", ""],
+            "error": ["", "", ""],
+        }).to_csv(self.csv_file, sep=biz2mail.DEFAULT_FIELD_SEPARATOR, index=False)
+        patches = [
+            mock.patch.object(biz2mail, "web_search", side_effect=fake_search),
+            mock.patch.object(biz2mail, "fetch_page", side_effect=fake_fetch_page),
+            mock.patch.object(biz2mail, "rate_limiter", ratelimit.RateLimiter(search_rate=1000, domain_rate=1000)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def read(self, path):
+        return pd.read_csv(path, sep=biz2mail.DEFAULT_FIELD_SEPARATOR, dtype=str).fillna('')
+
+    def assert_enriched(self):
+        df = self.read(self.csv_file)
+        self.assertEqual(list(df['website']), ["https://alfa.example/", "https://beta.example/chi-siamo", ""])
+        self.assertEqual(list(df['email']), ["info@alfa.example", "contatti@beta.example", ""])
+        self.assertEqual(list(df['error']), ["no", "no", "No website found"])
+        resolved = self.read(self.csv_file.replace(".csv", "-resolved.csv"))
+        self.assertEqual(sorted(resolved[biz2mail.DEFAULT_COLUMN_VAT]), ["01", "02"])
+
+    def test_sequential(self):
+        biz2mail.enrich_csv_file(self.csv_file)
+        self.assert_enriched()
+
+    def test_concurrent_matches_sequential(self):
+        biz2mail.enrich_csv_file(self.csv_file, concurrent=True, search_concurrency=2, fetch_concurrency=2)
+        self.assert_enriched()
+
+    def test_fetch_concurrency_bounds_page_fetches(self):
+        lock = threading.Lock()
+        in_flight = [0, 0]  # Current and peak
+
+        def slow_site(url):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight[0] -= 1
+            links = b'<a href="/contatti">c</a> <a href="/chi-siamo">s</a> <a href="/privacy">p</a>'
+            return {'emails': [], 'content': links, 'error': None}
+
+        with mock.patch.object(biz2mail, "fetch_page", side_effect=slow_site) as fetch_page:
+            biz2mail.enrich_csv_file(self.csv_file, concurrent=True, search_concurrency=2, fetch_concurrency=2)
+        self.assertGreater(fetch_page.call_count, 2)
+        self.assertLessEqual(in_flight[1], 2)
+
+    def test_no_journal_left_after_run(self):
+        biz2mail.enrich_csv_file(self.csv_file)
+        self.assertFalse(os.path.exists(journal.journal_path(self.csv_file)))
+
+    def test_resume_replays_journal(self):
+        with journal.open_journal(self.csv_file) as journal_file:
+            journal.write_entries(journal_file, [(0, {'website': "https://alfa.example/",
+                                                     'email': "info@alfa.example", 'error': "no"})])
+            journal_file.write('{"index": 1, "fiel')  # Entry cut short by a crash
+        biz2mail.enrich_csv_file(self.csv_file)
+        self.assert_enriched()
+        searched = [call.args[0] for call in biz2mail.web_search.call_args_list]
+        self.assertFalse(any(term.startswith("Alfa Srl") for term in searched))
+
+    def test_fold_journal(self):
+        with journal.open_journal(self.csv_file) as journal_file:
+            journal.write_entries(journal_file, [(2, {'error': "No website found"})])
+        self.assertTrue(biz2mail.fold_journal(self.csv_file))
+        self.assertEqual(list(self.read(self.csv_file)['error']), ["", "", "No website found"])
+        self.assertFalse(os.path.exists(journal.journal_path(self.csv_file)))
+
+    def test_resolved_upserted_by_vat(self):
+        pd.DataFrame({
+            biz2mail.DEFAULT_COLUMN_VAT: ["01", "09"],
+            biz2mail.DEFAULT_COLUMN_COMPANY: ["Alfa Srl", "Zeta Srl"],
+            "website": ["https://old.example/", "https://zeta.example/"],
+            "email": ["old@old.example", "info@zeta.example"],
+            "error": ["no", "no"],
+        }).to_csv(biz2mail.resolved_path(self.csv_file), sep=biz2mail.DEFAULT_FIELD_SEPARATOR, index=False)
+        biz2mail.enrich_csv_file(self.csv_file)
+        resolved = self.read(biz2mail.resolved_path(self.csv_file))
+        self.assertEqual(list(resolved[biz2mail.DEFAULT_COLUMN_VAT]), ["01", "09", "02"])
+        self.assertEqual(resolved.at[0, 'email'], "info@alfa.example")
+
+    def test_second_run_served_from_search_cache(self):
+        biz2mail.enrich_csv_file(self.csv_file)
+        pd.read_csv(self.csv_file, sep=biz2mail.DEFAULT_FIELD_SEPARATOR, dtype=str).assign(
+            website="", email="", error="").to_csv(self.csv_file, sep=biz2mail.DEFAULT_FIELD_SEPARATOR, index=False)
+        biz2mail.web_search.reset_mock()
+        biz2mail.enrich_csv_file(self.csv_file)
+        biz2mail.web_search.assert_not_called()
+        self.assert_enriched()
+
+    def test_site_crawled_once_per_run(self):
+        df = self.read(self.csv_file)
+        df.loc[2, 'website'] = "https://alfa.example/"  # A branch of Alfa Srl
+        df.to_csv(self.csv_file, sep=biz2mail.DEFAULT_FIELD_SEPARATOR, index=False)
+        biz2mail.enrich_csv_file(self.csv_file, concurrent=True, search_concurrency=2, fetch_concurrency=3)
+        df = self.read(self.csv_file)
+        self.assertEqual(df.at[2, 'email'], "info@alfa.example")
+        fetched = [call.args[0] for call in biz2mail.fetch_page.call_args_list]
+        self.assertEqual(fetched.count("https://alfa.example/"), 1)
+
+    def test_duplicate_vat_codes_enriched_once(self):
+        df = self.read(self.csv_file)
+        df[biz2mail.DEFAULT_COLUMN_VAT] = ["IT 00743110157", "01234567897", "00743110157"]
+        df[biz2mail.DEFAULT_COLUMN_COMPANY] = ["Alfa Srl", "Beta Spa", "Alfa Srl"]
+        for concurrent in (False, True):
+            with self.subTest(concurrent=concurrent):
+                df.to_csv(self.csv_file, sep=biz2mail.DEFAULT_FIELD_SEPARATOR, index=False)
+                biz2mail.web_search.reset_mock()
+                with mock.patch.object(biz2mail, "USE_SEARCH_CACHE", False), \
+                        mock.patch.object(biz2mail, "USE_RESULTS_STORE", False):
+                    biz2mail.enrich_csv_file(self.csv_file, concurrent=concurrent)
+                self.assertEqual(biz2mail.web_search.call_count, 2)
+                self.assertEqual(list(self.read(self.csv_file)['email']),
+                                 ["info@alfa.example", "contatti@beta.example", "info@alfa.example"])
+
+    def test_search_results_ranked_before_fetching(self):
+        results = ["https://www.ufficiocamerale.it/alfa", "https://www.facebook.com/alfasrl",
+                   "https://tutto.example/elenco", "https://alfa.example/"]
+        with mock.patch.dict(SITES, {"Alfa Srl": results}), mock.patch.object(biz2mail, "WEBSITES_TO_FETCH", 1):
+            biz2mail.enrich_csv_file(self.csv_file)
+        self.assert_enriched()
+        fetched = [call.args[0] for call in biz2mail.fetch_page.call_args_list]
+        self.assertFalse(any("ufficiocamerale" in url or "facebook" in url or "tutto" in url for url in fetched))
+
+    def test_new_file_enriches_only_the_delta(self):
+        df = self.read(self.csv_file)
+        df[biz2mail.DEFAULT_COLUMN_VAT] = ["00743110157", "01234567897", "12345678903"]
+        df.to_csv(self.csv_file, sep=biz2mail.DEFAULT_FIELD_SEPARATOR, index=False)
+        biz2mail.enrich_csv_file(self.csv_file)
+
+        # Next month's list: the same companies plus a new one, in a new file
+        next_file = os.path.join(self.tmpdir.name, "aziende-nuove.csv")
+        df = df.assign(website="", email="", error="")
+        df.loc[3] = ["00000100008", "Delta Srl", "", "", ""]
+        df.to_csv(next_file, sep=biz2mail.DEFAULT_FIELD_SEPARATOR, index=False)
+        biz2mail.web_search.reset_mock()
+        biz2mail.fetch_page.reset_mock()
+        with mock.patch.object(biz2mail, "USE_SEARCH_CACHE", False):
+            biz2mail.enrich_csv_file(next_file)
+        self.assertEqual([call.args[0] for call in biz2mail.web_search.call_args_list],
+                         ['Delta Srl 00000100008 -"www.ufficiocamerale.it"'])
+        df = self.read(next_file)
+        self.assertEqual(list(df['email']), ["info@alfa.example", "contatti@beta.example", "", ""])
+        self.assertEqual(list(df['error']), ["no", "no", "No website found", "No website found"])
+
+        # Past the maximum age every company is enriched again
+        df.assign(website="", email="", error="").to_csv(next_file, sep=biz2mail.DEFAULT_FIELD_SEPARATOR, index=False)
+        biz2mail.web_search.reset_mock()
+        with mock.patch.object(biz2mail, "USE_SEARCH_CACHE", False), \
+                mock.patch.object(biz2mail, "RESULTS_MAX_AGE", 0), mock.patch.object(biz2mail, "RESULTS_FAILURE_MAX_AGE", 0):
+            biz2mail.enrich_csv_file(next_file)
+        self.assertEqual(biz2mail.web_search.call_count, 4)
+
+    def test_failed_search_is_not_a_missing_website(self):
+        df = self.read(self.csv_file)
+        df[biz2mail.DEFAULT_COLUMN_VAT] = ["00743110157", "01234567897", "12345678903"]
+        df.to_csv(self.csv_file, sep=biz2mail.DEFAULT_FIELD_SEPARATOR, index=False)
+        with mock.patch.object(biz2mail, "web_search", return_value=None):
+            biz2mail.enrich_csv_file(self.csv_file)
+        self.assertEqual(list(self.read(self.csv_file)['error']), ["search failed"] * 3)
+        # The next run searches again instead of reusing the failure
+        biz2mail.enrich_csv_file(self.csv_file)
+        self.assertEqual(list(self.read(self.csv_file)['error']), ["no", "no", "No website found"])
+        self.assertEqual(biz2mail.web_search.call_count, 3)
+
+    def assert_timed_out_site_retried(self, concurrent, chunk_size=None):
+        attempts = []
+        searches_at_retry = []
+
+        def slow_beta(url):
+            attempts.append(url)
+            if url == "https://beta.example/chi-siamo" and attempts.count(url) == 2:
+                searches_at_retry.append(biz2mail.web_search.call_count)
+            if url == "https://beta.example/chi-siamo" and attempts.count(url) == 1:
+                return {'emails': [], 'content': None, 'error': "timeout"}
+            return fake_fetch_page(url)
+
+        with mock.patch.object(biz2mail, "fetch_page", side_effect=slow_beta), \
+                mock.patch.object(biz2mail, "TIMEOUT_RETRY_DELAY", 0):
+            biz2mail.enrich_csv_file(self.csv_file, concurrent=concurrent, chunk_size=chunk_size)
+        self.assert_enriched()
+        self.assertEqual(attempts.count("https://beta.example/chi-siamo"), 2)
+        self.assertEqual(attempts[-1], "https://beta.example/")  # Retried after the other records
+        return searches_at_retry[0]
+
+    def test_timed_out_site_retried(self):
+        self.assert_timed_out_site_retried(concurrent=False)
+
+    def test_timed_out_site_retried_concurrent(self):
+        self.assert_timed_out_site_retried(concurrent=True)
+
+    def test_timed_out_site_retried_after_the_last_chunk(self):
+        with mock.patch.object(biz2mail.time, "sleep") as sleep:
+            searches_at_retry = self.assert_timed_out_site_retried(concurrent=False, chunk_size=1)
+        self.assertEqual(sleep.call_count, 1)
+        self.assertEqual(searches_at_retry, 3)  # The last chunk was searched before the retry
+        self.assertFalse(os.path.exists(journal.journal_path(self.csv_file)))
+
+    def test_timeout_kept_after_the_last_retry(self):
+        self.assert_timeout_kept_after_the_last_retry(chunk_size=None)
+
+    def test_timeout_kept_after_the_last_retry_streaming(self):
+        self.assert_timeout_kept_after_the_last_retry(chunk_size=2)
+
+    def assert_timeout_kept_after_the_last_retry(self, chunk_size):
+        hang = mock.Mock(return_value={'emails': [], 'content': None, 'error': "timeout"})
+        with mock.patch.object(biz2mail, "fetch_page", hang), mock.patch.object(biz2mail, "TIMEOUT_RETRY_DELAY", 0):
+            biz2mail.enrich_csv_file(self.csv_file, chunk_size=chunk_size)
+        df = self.read(self.csv_file)
+        self.assertEqual(list(df['error']), ["timeout", "timeout", "No website found"])
+        self.assertEqual(list(df['website']), ["https://alfa.example/", "https://beta.example/chi-siamo", ""])
+        self.assertEqual(hang.call_count, 2 * (biz2mail.TIMEOUT_RETRIES + 1))
+        # A later run tries them again
+        biz2mail.enrich_csv_file(self.csv_file)
+        self.assertEqual(list(self.read(self.csv_file)['error']), ["no", "no", "No website found"])
+
+    def test_root_timeout_is_a_timeout(self):
+        def failing_beta(url):
+            if url == "https://beta.example/chi-siamo":
+                return {'emails': [], 'content': None, 'error': "failed"}
+            if url == "https://beta.example/":
+                return {'emails': [], 'content': None, 'error': "timeout"}
+            return fake_fetch_page(url)
+
+        with mock.patch.object(biz2mail, "fetch_page", side_effect=failing_beta), \
+                mock.patch.object(biz2mail, "TIMEOUT_RETRY_DELAY", 0):
+            biz2mail.enrich_csv_file(self.csv_file)
+        self.assertEqual(list(self.read(self.csv_file)['error']), ["no", "timeout", "No website found"])
+
+    def test_interrupted_run_keeps_completed_records(self):
+        def interrupt_at_beta(url):
+            if "beta" in url:
+                raise KeyboardInterrupt
+            return fake_fetch_page(url)
+
+        with mock.patch.object(biz2mail, "fetch_page", side_effect=interrupt_at_beta):
+            with self.assertRaises(KeyboardInterrupt):
+                biz2mail.enrich_csv_file(self.csv_file)
+        entries = list(journal.read_entries(self.csv_file))
+        self.assertEqual([index for index, fields in entries], [0])
+        biz2mail.enrich_csv_file(self.csv_file)
+        self.assert_enriched()
+
+    def test_snapshots_written_during_the_run(self):
+        with mock.patch.object(biz2mail, "SNAPSHOT_INTERVAL", 0), \
+                mock.patch.object(biz2mail, "save_outputs", wraps=biz2mail.save_outputs) as save_outputs:
+            biz2mail.enrich_csv_file(self.csv_file)
+        self.assertGreater(save_outputs.call_count, 1)
+        self.assert_enriched()
+        self.assertFalse(any(name.endswith(".tmp") for name in os.listdir(self.tmpdir.name)))
+
+    def test_metrics_log(self):
+        biz2mail.enrich_csv_file(self.csv_file)
+        with open(os.path.join(self.tmpdir.name, biz2mail.LOG_FILE_NAME), encoding='utf-8') as log:
+            events = [json.loads(line) for line in log]
+        self.assertEqual(events[0]['event'], "start")
+        summary = events[-1]
+        self.assertEqual(summary['event'], "summary")
+        self.assertEqual(summary['records'], 3)
+        self.assertEqual(summary['counters'], {"resolved": 2, "error: No website found": 1})
+        self.assertEqual(summary['stages']['search']['count'], 3)
+        self.assertGreaterEqual(summary['stages']['persist']['count'], 1)  # One call per batch written
+        self.assertIn("search_cache", [event['event'] for event in events])
+
+    def test_streaming_matches_in_memory(self):
+        biz2mail.enrich_csv_file(self.csv_file, chunk_size=2)
+        self.assert_enriched()
+        self.assertFalse(os.path.exists(self.csv_file + ".partial"))
+
+    def test_streaming_concurrent(self):
+        biz2mail.enrich_csv_file(self.csv_file, concurrent=True, chunk_size=2)
+        self.assert_enriched()
+
+    def test_streaming_resumes_after_partial_output(self):
+        df = self.read(self.csv_file)
+        df.loc[[0], ['website', 'email', 'error']] = ["https://alfa.example/", "info@alfa.example", "no"]
+        df.iloc[[0]].to_csv(self.csv_file + ".partial", sep=biz2mail.DEFAULT_FIELD_SEPARATOR, index=False)
+        with journal.open_journal(self.csv_file) as journal_file:
+            journal.write_entries(journal_file, [(1, {'website': "https://beta.example/chi-siamo",
+                                                     'email': "contatti@beta.example", 'error': "no"})])
+        biz2mail.enrich_csv_file(self.csv_file, chunk_size=2)
+        df = self.read(self.csv_file)
+        self.assertEqual(list(df['error']), ["no", "no", "No website found"])
+        searched = [call.args[0] for call in biz2mail.web_search.call_args_list]
+        self.assertEqual(len(searched), 1)
+        self.assertTrue(searched[0].startswith("Gamma Snc"))
+
+class StreamedResponse:
+    def __init__(self, chunks, content_type="text/html; charset=utf-8"):
+        self.status_code = 200
+        self.headers = {'Content-Type': content_type}
+        self.chunks = chunks
+        self.read = 0
+        self.closed = False
+
+    def iter_content(self, chunk_size=1):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+class TestFetchPage(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(biz2mail, "rate_limiter", ratelimit.RateLimiter(domain_rate=1000))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fetch(self, response):
+        with mock.patch.object(biz2mail.get_http_session(), "get", return_value=response) as get:
+            page = biz2mail.fetch_page("https://alfa.example/")
+        self.assertTrue(get.call_args.kwargs['stream'])
+        self.assertTrue(response.closed)
+        return page
+
+    def test_stops_reading_at_the_first_email(self):
+        response = StreamedResponse([b"<p>Scrivete a info@alfa", b".example</p>", b"<p>altro</p>", b"<p>fine</p>"])
+        page = self.fetch(response)
+        self.assertEqual(page['emails'], ["info@alfa.example"])
+        self.assertEqual(response.read, 2)  # The email is only complete once the next chunk shows where it ends
+
+    def test_reads_whole_page_without_early_stop(self):
+        response = StreamedResponse([b"<p>info@alfa.example</p>", b"<p>vendite@alfa.example</p>"])
+        with mock.patch.object(biz2mail, "EARLY_STOP_EMAILS", 0):
+            page = self.fetch(response)
+        self.assertEqual(sorted(page['emails']), ["info@alfa.example", "vendite@alfa.example"])
+        self.assertEqual(page['content'], b"<p>info@alfa.example</p><p>vendite@alfa.example</p>")
+
+    def test_size_cap(self):
+        response = StreamedResponse([b"x" * 100] * 10 + [b"info@alfa.example"])
+        with mock.patch.object(biz2mail, "MAX_PAGE_BYTES", 300):
+            page = self.fetch(response)
+        self.assertEqual(page['emails'], [])
+        self.assertEqual(len(page['content']), 300)
+        self.assertEqual(response.read, 3)
+
+    def test_binary_content_skipped(self):
+        response = StreamedResponse([b"%PDF-1.7 info@alfa.example"], content_type="application/pdf")
+        page = self.fetch(response)
+        self.assertEqual(page, {'emails': [], 'content': None, 'error': "skipped"})
+        self.assertEqual(response.read, 0)
+        with mock.patch.object(biz2mail, "FETCH_CONTENT_TYPES", biz2mail.FETCH_CONTENT_TYPES + ("application/pdf",)):
+            self.assertEqual(self.fetch(StreamedResponse([b"info@alfa.example "], "application/pdf"))['emails'],
+                             ["info@alfa.example"])
+
+class TestShards(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.csv_file = os.path.join(self.tmpdir.name, "aziende.csv")
+
+    def write(self, path, vat_codes, emails=None):
+        pd.DataFrame({
+            biz2mail.DEFAULT_COLUMN_VAT: vat_codes,
+            biz2mail.DEFAULT_COLUMN_COMPANY: [f"Azienda {vat}" for vat in vat_codes],
+            "website": [f"https://{vat}.example/" for vat in vat_codes] if emails else "",
+            "email": emails or "",
+            "error": "no" if emails else "",
+        }).to_csv(path, sep=biz2mail.DEFAULT_FIELD_SEPARATOR, index=False)
+
+    def test_shard_csv(self):
+        self.write(self.csv_file, [f"{i:02}" for i in range(5)])
+        self.assertTrue(biz2mail.shard_csv(self.csv_file, 2))
+        self.assertTrue(os.path.exists(self.csv_file))
+        shards = biz2mail.find_shards(os.path.join(self.tmpdir.name, "aziende"))
+        self.assertEqual([os.path.basename(f) for f in shards],
+                         ["aziende-001.csv", "aziende-002.csv", "aziende-003.csv"])
+        df = pd.read_csv(shards[2], sep=biz2mail.DEFAULT_FIELD_SEPARATOR, dtype=str)
+        self.assertEqual(list(df[biz2mail.DEFAULT_COLUMN_VAT]), ["04"])
+
+    def test_small_file_not_sharded(self):
+        self.write(self.csv_file, ["01", "02"])
+        self.assertTrue(biz2mail.shard_csv(self.csv_file, 2))
+        self.assertTrue(os.path.exists(self.csv_file))
+        self.assertEqual(biz2mail.find_shards(os.path.join(self.tmpdir.name, "aziende")), [])
+
+    def test_merge_shard_results_in_shard_order(self):
+        base_name = os.path.join(self.tmpdir.name, "aziende")
+        for shard_number, vat_codes in [(2, ["03", "01"]), (1, ["01", "02"])]:
+            shard_file = biz2mail.shard_path(self.csv_file, shard_number)
+            self.write(shard_file, vat_codes)
+            self.write(biz2mail.resolved_path(shard_file), vat_codes,
+                       emails=[f"shard{shard_number}@{vat}.example" for vat in vat_codes])
+        self.assertTrue(biz2mail.merge_shard_results(base_name))
+        merged = pd.read_csv(f"{base_name}-resolved.csv", sep=biz2mail.DEFAULT_FIELD_SEPARATOR, dtype=str)
+        self.assertEqual(list(merged[biz2mail.DEFAULT_COLUMN_VAT]), ["01", "02", "03"])
+        self.assertEqual(merged.at[0, 'email'], "shard1@01.example")
+
+    def test_base_file_with_shards_not_enriched(self):
+        self.write(self.csv_file, [f"{i:02}" for i in range(3)])
+        other_file = os.path.join(self.tmpdir.name, "altre.csv")
+        self.write(other_file, ["01"])
+        biz2mail.shard_csv(self.csv_file, 2)
+        files = biz2mail.skip_sharded(sorted([self.csv_file, other_file] + biz2mail.find_shards(
+            os.path.join(self.tmpdir.name, "aziende"))))
+        self.assertEqual([os.path.basename(f) for f in files], ["altre.csv", "aziende-001.csv", "aziende-002.csv"])
+
+    def test_merge_keeps_the_resolved_records_of_the_base_file(self):
+        base_name = os.path.join(self.tmpdir.name, "aziende")
+        self.write(f"{base_name}-resolved.csv", ["01", "07"], emails=["base@01.example", "base@07.example"])
+        shard_file = biz2mail.shard_path(self.csv_file, 1)
+        self.write(shard_file, ["01", "02"])
+        self.write(biz2mail.resolved_path(shard_file), ["01", "02"], emails=["shard@01.example", "shard@02.example"])
+        self.assertTrue(biz2mail.merge_shard_results(base_name))
+        merged = pd.read_csv(f"{base_name}-resolved.csv", sep=biz2mail.DEFAULT_FIELD_SEPARATOR, dtype=str)
+        self.assertEqual(list(merged[biz2mail.DEFAULT_COLUMN_VAT]), ["01", "07", "02"])
+        self.assertEqual(list(merged['email']), ["shard@01.example", "base@07.example", "shard@02.example"])
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        patches = [
+            mock.patch.multiple(biz2mail, **biz2mail.current_settings()),  # Restore the settings the CLI changes
+            mock.patch.object(biz2mail, "web_search", side_effect=fake_search),
+            mock.patch.object(biz2mail, "fetch_page", side_effect=fake_fetch_page),
+            mock.patch.object(biz2mail, "rate_limiter", ratelimit.RateLimiter(search_rate=1000, domain_rate=1000)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def write(self, name, companies, first_vat=0):
+        path = os.path.join(self.tmpdir.name, name)
+        pd.DataFrame({
+            biz2mail.DEFAULT_COLUMN_VAT: [f"{i:02}" for i in range(first_vat, first_vat + len(companies))],
+            biz2mail.DEFAULT_COLUMN_COMPANY: companies,
+            "website": "", "email": "", "error": "",
+        }).to_csv(path, sep=biz2mail.DEFAULT_FIELD_SEPARATOR, index=False)
+        return path
+
+    def test_enrich_processes_a_queue_of_files(self):
+        first = self.write("lombardia.csv", ["Alfa Srl", "Gamma Snc"])
+        second = self.write("lazio.csv", ["Beta Spa"])
+        cache_dir = os.path.join(self.tmpdir.name, "cache")
+        os.mkdir(cache_dir)
+        exit_code = biz2mail.run_cli(["enrich", os.path.join(self.tmpdir.name, "*.csv"), "--concurrent",
+                                      "--cache-dir", cache_dir, "--no-render", "--search-rate", "50"])
+        self.assertEqual(exit_code, 0)
+        df = pd.read_csv(first, sep=biz2mail.DEFAULT_FIELD_SEPARATOR, dtype=str).fillna('')
+        self.assertEqual(list(df['email']), ["info@alfa.example", ""])
+        df = pd.read_csv(second, sep=biz2mail.DEFAULT_FIELD_SEPARATOR, dtype=str).fillna('')
+        self.assertEqual(list(df['email']), ["contatti@beta.example"])
+        self.assertTrue(os.path.exists(os.path.join(cache_dir, "biz2mail-search.sqlite")))
+        self.assertEqual(biz2mail.SEARCH_RATE, 50)
+
+    @unittest.skipUnless(pyarrow, "pyarrow is not installed")
+    def test_parquet_working_format(self):
+        csv_file = self.write("aziende.csv", ["Alfa Srl", "Beta Spa", "Gamma Snc"])
+        parquet_file = os.path.join(self.tmpdir.name, "aziende.parquet")
+        self.assertEqual(biz2mail.run_cli(["export", csv_file, "--to", "parquet"]), 0)
+        os.remove(csv_file)
+        self.assertEqual(biz2mail.run_cli(["enrich", parquet_file, "--no-render"]), 0)
+        self.assertEqual(list(biz2mail.read_table(parquet_file, columns=['email'])['email']),
+                         ["info@alfa.example", "contatti@beta.example", ""])
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir.name, "aziende-resolved.parquet")))
+        self.assertEqual(biz2mail.run_cli(["stats", parquet_file]), 0)
+        self.assertEqual(biz2mail.run_cli(["export", parquet_file, "--to", "csv"]), 0)
+        df = pd.read_csv(csv_file, sep=biz2mail.DEFAULT_FIELD_SEPARATOR, dtype=str).fillna('')
+        self.assertEqual(list(df['error']), ["no", "no", "No website found"])
+        self.assertEqual(biz2mail.count_rows(biz2mail.resolved_path(csv_file)), 2)
+
+    @unittest.skipIf(pyarrow, "pyarrow is installed")
+    def test_parquet_without_pyarrow_fails_cleanly(self):
+        csv_file = self.write("aziende.csv", ["Alfa Srl"])
+        self.assertEqual(biz2mail.run_cli(["export", csv_file, "--to", "parquet"]), 1)
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir.name, "aziende.parquet")))
+        parquet_file = os.path.join(self.tmpdir.name, "vecchio.parquet")
+        with open(parquet_file, 'wb') as data_file:
+            data_file.write(b"PAR1")
+        self.assertEqual(biz2mail.run_cli(["enrich", parquet_file]), 1)
+
+    @unittest.skipUnless(pyarrow, "pyarrow is not installed")
+    def test_parquet_nulls_read_as_empty(self):
+        parquet_file = os.path.join(self.tmpdir.name, "aziende.parquet")
+        pd.DataFrame({biz2mail.DEFAULT_COLUMN_VAT: ["01", None],
+                      "email": [None, "info@alfa.example"]}).to_parquet(parquet_file)
+        df = biz2mail.read_table(parquet_file)
+        self.assertEqual(df.values.tolist(), [["01", ""], ["", "info@alfa.example"]])
+
+    @unittest.skipUnless(pyarrow and openpyxl, "pyarrow or openpyxl is not installed")
+    def test_convert_to_parquet_without_max_records(self):
+        excel_file = os.path.join(self.tmpdir.name, "aziende.xlsx")
+        workbook = openpyxl.Workbook()
+        workbook.active.append([biz2mail.DEFAULT_COLUMN_VAT, biz2mail.DEFAULT_COLUMN_COMPANY])
+        workbook.active.append(["01", "Alfa Srl"])
+        workbook.save(excel_file)
+        self.assertEqual(biz2mail.run_cli(["convert", excel_file, "--format", "parquet"]), 0)
+        self.assertEqual(biz2mail.count_rows(os.path.join(self.tmpdir.name, "aziende.parquet")), 1)
+
+    def test_csv_and_parquet_keep_separate_journals(self):
+        self.assertNotEqual(journal.journal_path("dati/aziende.csv"), journal.journal_path("dati/aziende.parquet"))
+
+    def test_resolved_file_keeps_the_format(self):
+        self.assertEqual(biz2mail.resolved_path("dati/aziende.csv"), "dati/aziende-resolved.csv")
+        self.assertEqual(biz2mail.resolved_path("dati/aziende.parquet"), "dati/aziende-resolved.parquet")
+
+    def test_enrich_without_matching_files_fails(self):
+        self.assertEqual(biz2mail.run_cli(["enrich", os.path.join(self.tmpdir.name, "*.csv")]), 1)
+
+    def test_stats(self):
+        csv_file = self.write("aziende.csv", ["Alfa Srl", "Gamma Snc"])
+        biz2mail.run_cli(["enrich", csv_file])
+        with mock.patch("builtins.print") as printed:
+            self.assertEqual(biz2mail.run_cli(["stats", csv_file]), 0)
+        output = "\n".join(str(call.args[0]) for call in printed.call_args_list)
+        self.assertIn("2 records, 1 with website, 1 with email", output)
+        self.assertIn("No website found: 1", output)
+        self.assertIn("Search cache", output)
+
+    def test_merge(self):
+        base_name = os.path.join(self.tmpdir.name, "aziende")
+        for shard_number, companies in [(1, ["Alfa Srl"]), (2, ["Beta Spa"])]:
+            shard_file = self.write(f"aziende-{shard_number:03}.csv", companies, first_vat=shard_number)
+            with journal.open_journal(shard_file) as journal_file:
+                journal.write_entries(journal_file, [(0, {'website': "https://x.example/",
+                                                         'email': f"info@{shard_number}.example", 'error': "no"})])
+        self.assertEqual(biz2mail.run_cli(["merge", base_name]), 0)
+        merged = pd.read_csv(f"{base_name}-resolved.csv", sep=biz2mail.DEFAULT_FIELD_SEPARATOR, dtype=str)
+        self.assertEqual(list(merged['email']), ["info@1.example", "info@2.example"])
+
+@unittest.skipUnless(openpyxl, "openpyxl is not installed")
+class TestConvertExcelToCsv(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_streams_only_selected_columns(self):
+        excel_file = os.path.join(self.tmpdir.name, "aziende.xlsx")
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(["Provincia", biz2mail.DEFAULT_COLUMN_COMPANY, "Addetti", biz2mail.DEFAULT_COLUMN_VAT])
+        sheet.append(["MI", "Alfa | Srl", 12, 1234567890])
+        sheet.append(["RM", "Beta Spa", None, "IT0987654321"])
+        sheet.append([None, None, None, None])
+        workbook.save(excel_file)
+
+        csv_file = os.path.join(self.tmpdir.name, "aziende.csv")
+        self.assertTrue(biz2mail.convert_excel_to_csv(excel_file, csv_file, biz2mail.DEFAULT_COLUMN_VAT,
+                                                      biz2mail.DEFAULT_COLUMN_COMPANY))
+        df = pd.read_csv(csv_file, sep=biz2mail.DEFAULT_FIELD_SEPARATOR, dtype=str).fillna('')
+        self.assertEqual(list(df.columns), [biz2mail.DEFAULT_COLUMN_VAT, biz2mail.DEFAULT_COLUMN_COMPANY,
+                                            'website', 'email', 'error'])
+        self.assertEqual(df.values.tolist(), [["1234567890", "Alfa | Srl", "", "", ""],
+                                              ["IT0987654321", "Beta Spa", "", "", ""]])
+
+    def test_numeric_partita_iva_stays_valid(self):
+        excel_file = os.path.join(self.tmpdir.name, "aziende.xlsx")
+        workbook = openpyxl.Workbook()
+        workbook.active.append([biz2mail.DEFAULT_COLUMN_VAT, biz2mail.DEFAULT_COLUMN_COMPANY])
+        workbook.active.append([743110157, "Alfa Srl"])  # 00743110157 stored as a number
+        workbook.active.append(["00743110157", "Alfa S.r.l."])
+        workbook.save(excel_file)
+        csv_file = os.path.join(self.tmpdir.name, "aziende.csv")
+        self.assertTrue(biz2mail.convert_excel_to_csv(excel_file, csv_file, biz2mail.DEFAULT_COLUMN_VAT,
+                                                      biz2mail.DEFAULT_COLUMN_COMPANY))
+        df = pd.read_csv(csv_file, sep=biz2mail.DEFAULT_FIELD_SEPARATOR, dtype=str).fillna('')
+        self.assertEqual(list(df[biz2mail.DEFAULT_COLUMN_VAT]), ["743110157", "00743110157"])
+        with mock.patch.object(biz2mail, "USE_VAT_INDEX", True):
+            records = biz2mail.index_records(df)
+        self.assertEqual([indices for index, row, indices in records], [[0, 1]])  # Deduplicated as one company
+
+    def test_writes_the_columns_enrichment_reads(self):
+        excel_file = os.path.join(self.tmpdir.name, "aziende.xlsx")
+        workbook = openpyxl.Workbook()
+        workbook.active.append(["Partita IVA", "Ragione Sociale"])
+        workbook.active.append(["01", "Alfa Srl"])
+        workbook.save(excel_file)
+        with mock.patch.multiple(biz2mail, **biz2mail.current_settings()), \
+                mock.patch.object(biz2mail, "web_search", side_effect=fake_search), \
+                mock.patch.object(biz2mail, "fetch_page", side_effect=fake_fetch_page):
+            self.assertEqual(biz2mail.run_cli(["convert", excel_file, "--vat-column", "Partita IVA",
+                                               "--company-column", "Ragione Sociale", "--max-records", "0"]), 0)
+            csv_file = os.path.join(self.tmpdir.name, "aziende.csv")
+            self.assertEqual(biz2mail.run_cli(["enrich", csv_file, "--no-render"]), 0)
+        df = pd.read_csv(csv_file, sep=biz2mail.DEFAULT_FIELD_SEPARATOR, dtype=str).fillna('')
+        self.assertEqual(list(df.columns)[:2], [biz2mail.DEFAULT_COLUMN_VAT, biz2mail.DEFAULT_COLUMN_COMPANY])
+        self.assertEqual(list(df['email']), ["info@alfa.example"])
+
+    def test_missing_column(self):
+        excel_file = os.path.join(self.tmpdir.name, "aziende.xlsx")
+        workbook = openpyxl.Workbook()
+        workbook.active.append(["Partita IVA", biz2mail.DEFAULT_COLUMN_COMPANY])
+        workbook.save(excel_file)
+        self.assertFalse(biz2mail.convert_excel_to_csv(excel_file, os.path.join(self.tmpdir.name, "out.csv"),
+                                                       biz2mail.DEFAULT_COLUMN_VAT, biz2mail.DEFAULT_COLUMN_COMPANY))
+
+if __name__ == '__main__':
+    unittest.main()
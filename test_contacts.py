@@ -0,0 +1,68 @@
+import os
+import re
+import unittest
+
+from contacts import EmailScanner, extract_contacts, extract_phone_numbers
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench", "corpus")
+LEGACY_EMAIL_PATTERN = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
+
+PAGE = (
+    '<p>Scrivici a <a href="mailto:Info@Alfa.it?subject=Preventivo">info@alfa.it</a>'
+    ' o chiama <a href="TEL:+39 02-1234-5678">+39 02 1234 5678</a>.</p>'
+    '<footer>Amministrazione: amministrazione@alfa.it - Fax (02) 8765.4321 - Città di Milano</footer>'
+).encode('utf-8')
+
+class TestExtractContacts(unittest.TestCase):
+    def test_single_pass_finds_every_kind(self):
+        contacts = extract_contacts(PAGE)
+        self.assertEqual(contacts['emails'], {"Info@Alfa.it", "info@alfa.it", "amministrazione@alfa.it"})
+        self.assertEqual(contacts['mailto'], {"Info@Alfa.it"})
+        self.assertEqual(contacts['tel'], {"+390212345678"})
+        self.assertEqual(contacts['phones'], ["+390212345678", "+390212345678", "(02)87654321"])
+
+    def test_text_input(self):
+        self.assertEqual(extract_contacts("info@alfa.it")['emails'], {"info@alfa.it"})
+
+    def test_non_utf8_bytes(self):
+        contacts = extract_contacts(b"\xff\xfe contatti: info@alfa.it \xe0")
+        self.assertEqual(contacts['emails'], {"info@alfa.it"})
+
+    def test_emails_match_legacy_regex(self):
+        samples = [
+            b"a@b@c.it", b"@x.it info@@y.it", b"x.y+z@sub.dom-ain.co.uk.", b"name@host", b"a@b.c d@e.fg",
+            b"mailto:a@b.it,c@d.it;e@f.gh@i.jk", b"--@--.aa", b"%@1.2.ab@cd.ef",
+        ]
+        for name in sorted(os.listdir(CORPUS_DIR)):
+            with open(os.path.join(CORPUS_DIR, name), 'rb') as page_file:
+                samples.append(page_file.read())
+        for sample in samples:
+            legacy = set(re.findall(LEGACY_EMAIL_PATTERN, sample.decode('utf-8', 'replace')))
+            self.assertEqual(extract_contacts(sample, phones=False)['emails'], legacy, sample[:40])
+
+    def test_scanner_matches_whole_body_across_chunk_boundaries(self):
+        samples = [PAGE, b"x@a.it-foo.com y", b"a@b.itc@d.it", b"info@alfa.it"]
+        for name in sorted(os.listdir(CORPUS_DIR)):
+            with open(os.path.join(CORPUS_DIR, name), 'rb') as page_file:
+                samples.append(page_file.read())
+        for sample in samples:
+            expected = extract_contacts(sample, phones=False)['emails']
+            for chunk_size in ((1, 2, 3, 5) if len(sample) < 500 else ()) + (97, 4096):
+                scanner = EmailScanner()
+                for start in range(0, len(sample), chunk_size):
+                    scanner.feed(sample[start:start + chunk_size])
+                scanner.close()
+                self.assertEqual(scanner.emails, expected, (sample[:40], chunk_size))
+
+    def test_scanner_reports_an_email_once_it_is_complete(self):
+        scanner = EmailScanner()
+        self.assertEqual(scanner.feed(b"<p>info@alfa"), set())
+        self.assertEqual(scanner.feed(b".it</p> altro@"), {"info@alfa.it"})
+        self.assertEqual(scanner.close(), set())
+
+    def test_phone_numbers_from_bytes_match_text(self):
+        text = "Here are two numbers: +1 (555) 123-4567, 0039 02 1234 5678."
+        self.assertEqual(extract_phone_numbers(text.encode()), extract_phone_numbers(text))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import threading
+import unittest
+
+import crawl
+
+SITE = {
+    "https://www.alfa.example/prodotti/": (
+        b'<a href="/">Home</a> <a href="/chi-siamo">Chi siamo</a> <a href="/contatti#form">Contatti</a>'
+        b' <a href="/catalogo.pdf">Catalogo</a> <a href="https://social.example/alfa">Social</a>'
+    ),
+    "https://www.alfa.example/": b'<a href="/privacy">Privacy</a> <img src="logo@2x.png">',
+    "https://www.alfa.example/contatti": b'Scrivici a <a href="mailto:info@alfa.example">info@alfa.example</a>',
+    "https://www.alfa.example/chi-siamo": b'<a href="/note-legali">Note legali</a>',
+    "https://www.alfa.example/privacy": b'Titolare: privacy@alfa.example',
+    "https://www.alfa.example/note-legali": b'PEC: alfa@pec.example',
+}
+
+class FakeSite:
+    """Serve the pages of SITE and record the URLs fetched."""
+
+    def __init__(self, pages, timeouts=()):
+        self.pages = pages
+        self.timeouts = timeouts
+        self.fetched = []
+        self.lock = threading.Lock()
+
+    def fetch_page(self, url):
+        with self.lock:
+            self.fetched.append(url)
+        if url in self.timeouts:
+            return {'emails': [], 'content': None, 'error': "timeout"}
+        content = self.pages.get(url)
+        if content is None:
+            return {'emails': [], 'content': None, 'error': "failed"}
+        emails = []
+        for word in content.split():
+            word = word.strip(b'<>"').split(b'>')[-1].split(b'<')[0]
+            if b"@" in word and b"." in word.split(b"@")[-1]:
+                emails.append(word.decode('ascii'))
+        return {'emails': emails, 'content': content, 'error': None}
+
+class TestLinks(unittest.TestCase):
+    def test_extract_links_keeps_same_site_pages(self):
+        links = crawl.extract_links(SITE["https://www.alfa.example/prodotti/"], "https://www.alfa.example/prodotti/")
+        self.assertEqual(links, [
+            "https://www.alfa.example/",
+            "https://www.alfa.example/chi-siamo",
+            "https://www.alfa.example/contatti",
+        ])
+
+    def test_rank_links_puts_contact_pages_first(self):
+        ranked = crawl.rank_links([
+            "https://alfa.example/privacy",
+            "https://alfa.example/prodotti",
+            "https://alfa.example/it/contatti-e-sedi",
+            "https://alfa.example/contatti",
+            "https://alfa.example/impressum",
+            "https://alfa.example/contatti",
+        ])
+        self.assertEqual(ranked, [
+            "https://alfa.example/contatti",
+            "https://alfa.example/it/contatti-e-sedi",
+            "https://alfa.example/impressum",
+            "https://alfa.example/privacy",
+        ])
+
+    def test_junk_emails_do_not_qualify(self):
+        self.assertTrue(crawl.is_qualifying_email("info@alfa.example"))
+        self.assertFalse(crawl.is_qualifying_email("logo@2x.png"))
+        self.assertFalse(crawl.is_qualifying_email("user@example.com"))
+
+class TestCrawlSite(unittest.TestCase):
+    def test_stops_at_the_first_page_with_emails(self):
+        site = FakeSite(SITE)
+        result = crawl.crawl_site("https://www.alfa.example/contatti", site.fetch_page)
+        self.assertEqual(result['emails'], {"info@alfa.example"})
+        self.assertEqual(result['source'], "https://www.alfa.example/contatti")
+        self.assertEqual(site.fetched, ["https://www.alfa.example/contatti"])
+
+    def test_follows_the_contact_page(self):
+        site = FakeSite(SITE)
+        result = crawl.crawl_site("https://www.alfa.example/prodotti/", site.fetch_page, page_budget=3)
+        self.assertIn("info@alfa.example", result['emails'])
+        self.assertIn("https://www.alfa.example/contatti", site.fetched)
+        self.assertLessEqual(len(site.fetched), 3)
+
+    def test_respects_the_page_budget(self):
+        pages = {url: content for url, content in SITE.items() if b"@" not in content}
+        site = FakeSite(pages)
+        result = crawl.crawl_site("https://www.alfa.example/prodotti/", site.fetch_page, page_budget=4)
+        self.assertEqual(result['emails'], set())
+        self.assertIsNone(result['source'])
+        self.assertEqual(len(site.fetched), 4)
+        self.assertEqual(len(set(site.fetched)), 4)
+        self.assertEqual(result['pages'], 4)
+
+    def test_start_page_timeout(self):
+        site = FakeSite(SITE, timeouts={"https://www.alfa.example/prodotti/"})
+        result = crawl.crawl_site("https://www.alfa.example/prodotti/", site.fetch_page)
+        self.assertTrue(result['timeout'])
+        self.assertEqual(site.fetched, ["https://www.alfa.example/prodotti/"])
+
+    def test_root_page_timeout_without_emails(self):
+        start_url = "https://www.beta.example/prodotti/"
+        site = FakeSite({}, timeouts={"https://www.beta.example/"})
+        result = crawl.crawl_site(start_url, site.fetch_page)
+        self.assertEqual(result['emails'], set())
+        self.assertTrue(result['timeout'])
+        self.assertEqual(site.fetched, [start_url, "https://www.beta.example/"])
+
+    def test_other_page_timeout_ignored_once_emails_are_found(self):
+        site = FakeSite(SITE, timeouts={"https://www.alfa.example/"})
+        result = crawl.crawl_site("https://www.alfa.example/prodotti/", site.fetch_page)
+        self.assertIn("info@alfa.example", result['emails'])
+        self.assertFalse(result['timeout'])
+
+if __name__ == "__main__":
+    unittest.main()
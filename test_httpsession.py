@@ -0,0 +1,73 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpsession
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep connections alive
+    failures_left = 0
+    failure_status = 502
+    requests = 0
+
+    def do_GET(self):
+        Handler.requests += 1
+        if Handler.failures_left:
+            Handler.failures_left -= 1
+            status, body = Handler.failure_status, b"busy"
+        else:
+            status, body = 200, b"<p>info@alfa.example</p>"
+        self.send_response(status)
+        if status == 503:
+            self.send_header("Retry-After", "3")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestHttpSession(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_connections_reused(self):
+        session = httpsession.create_session()
+        for path in ("", "contatti", ""):
+            self.assertEqual(session.get(self.url + path, timeout=4).status_code, 200)
+        self.assertEqual(httpsession.connection_stats(session), {'requests': 3, 'connections': 1, 'reused': 2})
+
+    def test_unavailable_retried(self):
+        Handler.failures_left = 1
+        session = httpsession.create_session(backoff_factor=0)
+        self.assertEqual(session.get(self.url, timeout=4).status_code, 200)
+
+    def test_retries_exhausted_returns_last_response(self):
+        Handler.failures_left = 3
+        session = httpsession.create_session(retries=1, backoff_factor=0)
+        self.assertEqual(session.get(self.url, timeout=4).status_code, 502)
+        Handler.failures_left = 0
+
+    def test_throttling_left_to_the_rate_limiter(self):
+        Handler.failures_left = 1
+        Handler.failure_status = 503
+        Handler.requests = 0
+        try:
+            response = httpsession.create_session(backoff_factor=0).get(self.url, timeout=4)
+        finally:
+            Handler.failures_left = 0
+            Handler.failure_status = 502
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], "3")
+        self.assertEqual(Handler.requests, 1)
+
+if __name__ == '__main__':
+    unittest.main()
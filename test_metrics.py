@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from metrics import Histogram, Metrics, format_duration
+
+class TestHistogram(unittest.TestCase):
+    def test_percentiles(self):
+        histogram = Histogram()
+        for milliseconds in [3] * 90 + [150] * 9 + [4000]:
+            histogram.observe(milliseconds / 1000)
+        self.assertEqual(histogram.percentile(0.5), 0.005)
+        self.assertEqual(histogram.percentile(0.9), 0.005)
+        self.assertEqual(histogram.percentile(0.99), 0.2)
+        self.assertEqual(histogram.percentile(1.0), 4.0)
+        summary = histogram.summary()
+        self.assertEqual(summary['count'], 100)
+        self.assertEqual(summary['buckets_ms']['5'], 90)
+
+    def test_empty(self):
+        self.assertEqual(Histogram().percentile(0.5), 0.0)
+
+class TestMetrics(unittest.TestCase):
+    def test_format_duration(self):
+        self.assertEqual(format_duration(5), "5s")
+        self.assertEqual(format_duration(125), "2m05s")
+        self.assertEqual(format_duration(3725), "1h02m05s")
+
+    def test_progress_line_with_eta(self):
+        run = Metrics(progress_interval=0)
+        run.expect(4)
+        with mock.patch("builtins.print") as printed:
+            run.record_done()
+        line = printed.call_args.args[0]
+        self.assertIn("Progress: 1/4 records (25%)", line)
+        self.assertIn("ETA", line)
+
+    def test_json_lines_log(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_file = os.path.join(tmpdir, "biz2mail.log")
+            run = Metrics(log_file)
+            with run.timer("search"):
+                pass
+            run.count("error: timeout")
+            run.close(csv_file="aziende.csv")
+            with open(log_file, encoding='utf-8') as log:
+                events = [json.loads(line) for line in log]
+        self.assertEqual(events[-1]['event'], "summary")
+        self.assertEqual(events[-1]['stages']['search']['count'], 1)
+        self.assertEqual(events[-1]['counters'], {"error: timeout": 1})
+        self.assertEqual(events[-1]['csv_file'], "aziende.csv")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+import zlib
+from unittest import mock
+
+import biz2mail
+from pagecache import PageCache
+
+class FakeResponse:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.text = content.decode()
+        self.headers = headers or {}
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+class TestPageCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = PageCache(self.tmpdir.name)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmpdir.cleanup()
+
+    def test_store_and_lookup(self):
+        self.cache.store("https://alfa.example/", b"<p>info@alfa.example</p>", '"v1"', None, ["info@alfa.example"])
+        entry = self.cache.lookup("https://alfa.example/")
+        self.assertEqual(entry['emails'], ["info@alfa.example"])
+        self.assertEqual(self.cache.conditional_headers(entry), {'If-None-Match': '"v1"'})
+        self.assertEqual(self.cache.read_body("https://alfa.example/"), b"<p>info@alfa.example</p>")
+
+    def test_identical_bodies_share_one_file(self):
+        self.cache.store("https://alfa.example/", b"same", '"v1"', None, [])
+        self.cache.store("https://alfa.example/index.html", b"same", '"v1"', None, [])
+        self.assertEqual(len(os.listdir(self.cache.bodies_dir)), 1)
+
+    def test_least_recently_used_evicted(self):
+        body_size = len(zlib.compress(os.urandom(1000)))
+        self.cache.max_bytes = body_size * 2 + 100
+        with mock.patch("pagecache.time.time", side_effect=[1, 2, 3, 4]):
+            self.cache.store("https://a.example/", os.urandom(1000), '"a"', None, [])
+            self.cache.store("https://b.example/", os.urandom(1000), '"b"', None, [])
+            self.cache.touch("https://a.example/")
+            self.cache.store("https://c.example/", os.urandom(1000), '"c"', None, [])
+        self.assertIsNone(self.cache.lookup("https://b.example/"))
+        self.assertIsNotNone(self.cache.lookup("https://a.example/"))
+        self.assertEqual(len(os.listdir(self.cache.bodies_dir)), 2)
+
+    def test_changed_body_replaces_the_old_one(self):
+        self.cache.max_bytes = 1024 * 1024
+        for version in range(50):
+            self.cache.store("https://alfa.example/", os.urandom(40 * 1024), f'"v{version}"', None, [])
+        self.cache.store("https://alfa.example/chi-siamo", b"shared", None, None, [])
+        self.cache.store("https://alfa.example/contatti", b"shared", None, None, [])
+        self.cache.store("https://alfa.example/contatti", b"changed", None, None, [])
+        self.assertEqual(len(self.cache), 3)
+        self.assertEqual(self.cache.evicted, 0)
+        self.assertEqual(len(os.listdir(self.cache.bodies_dir)), 3)
+        self.assertEqual(self.cache.read_body("https://alfa.example/chi-siamo"), b"shared")
+        self.assertLess(self.cache.total_size(), 50 * 1024)
+
+class TestExtractEmailsRevalidation(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(biz2mail, "page_cache", PageCache(self.tmpdir.name))
+        self.cache = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmpdir.cleanup()
+
+    def test_not_modified_reuses_cached_emails(self):
+        page = FakeResponse(200, b"<a>info@alfa.example</a>", {'ETag': '"v1"'})
+        with mock.patch.object(biz2mail.get_http_session(), "get", return_value=page) as get:
+            self.assertEqual(biz2mail.extract_emails("https://alfa.example/"), ["info@alfa.example"])
+            self.assertEqual(get.call_args.kwargs['headers'], {})
+        with mock.patch.object(biz2mail.get_http_session(), "get", return_value=FakeResponse(304)) as get:
+            self.assertEqual(biz2mail.extract_emails("https://alfa.example/"), ["info@alfa.example"])
+            self.assertEqual(get.call_args.kwargs['headers'], {'If-None-Match': '"v1"'})
+        self.assertEqual(self.cache.revalidated, 1)
+
+if __name__ == '__main__':
+    unittest.main()
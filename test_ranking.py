@@ -0,0 +1,37 @@
+import unittest
+
+from ranking import company_tokens, is_denylisted, name_similarity, rank_urls
+
+class TestNameSimilarity(unittest.TestCase):
+    def test_legal_forms_dropped(self):
+        self.assertEqual(company_tokens("Rossi Serramenti S.r.l."), ["rossi", "serramenti"])
+        self.assertEqual(company_tokens("F.lli Bianchi & C. Snc"), ["bianchi"])
+
+    def test_domain_matching_the_name_scores_higher(self):
+        self.assertEqual(name_similarity("Rossi Serramenti Srl", "https://www.rossiserramenti.it/"), 1.0)
+        self.assertGreater(name_similarity("Rossi Serramenti Srl", "https://www.rossi-infissi.it/"),
+                           name_similarity("Rossi Serramenti Srl", "https://www.edilnord.it/"))
+
+class TestRankUrls(unittest.TestCase):
+    def test_denylisted_domains_dropped(self):
+        self.assertTrue(is_denylisted("https://www.ufficiocamerale.it/123/rossi"))
+        self.assertTrue(is_denylisted("https://it.linkedin.com/company/rossi"))
+        self.assertFalse(is_denylisted("https://www.rossi.it/"))
+        self.assertEqual(rank_urls(["https://www.paginegialle.it/rossi", "https://www.facebook.com/rossi"], "Rossi Srl"), [])
+
+    def test_best_candidates_first(self):
+        urls = ["https://www.paginegialle.it/rossi", "https://www.edilnord.com/fornitori/rossi",
+                "https://www.rossiserramenti.com/", "https://www.rossiserramenti.it/contatti"]
+        self.assertEqual(rank_urls(urls, "Rossi Serramenti Srl", limit=2),
+                         ["https://www.rossiserramenti.it/contatti", "https://www.rossiserramenti.com/"])
+
+    def test_one_result_per_domain(self):
+        urls = ["https://www.rossi.it/prodotti/porte", "https://www.rossi.it/", "https://www.bianchi.it/"]
+        self.assertEqual(rank_urls(urls, "Rossi Srl", limit=5), ["https://www.rossi.it/", "https://www.bianchi.it/"])
+
+    def test_search_order_breaks_ties(self):
+        urls = ["https://www.alfa.it/", "https://www.beta.it/"]
+        self.assertEqual(rank_urls(urls, "Gamma Srl", limit=2), urls)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import time
+import unittest
+from email.utils import formatdate
+
+import ratelimit
+from ratelimit import RateLimiter, TokenBucket, domain_of, parse_retry_after
+
+class TestRateLimit(unittest.TestCase):
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("120"), 120.0)
+        self.assertAlmostEqual(parse_retry_after(formatdate(time.time() + 60, usegmt=True)), 60, delta=2)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+
+    def test_domain_of(self):
+        self.assertEqual(domain_of("https://WWW.Alfa.example:8080/contatti"), "alfa.example")
+
+    def test_bucket_paces_after_burst(self):
+        bucket = TokenBucket(rate=50, capacity=2)
+        start = time.monotonic()
+        for _ in range(4):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.035)
+
+    def test_throttle_slows_bucket_until_recovered(self):
+        bucket = TokenBucket(rate=8, capacity=1)
+        bucket.throttle(0)
+        self.assertEqual(bucket.rate, 4)
+        for _ in range(5):
+            bucket.recover()
+        self.assertEqual(bucket.rate, 8)
+
+    def test_retry_after_blocks_only_that_domain(self):
+        limiter = RateLimiter(domain_rate=1000, domain_burst=10)
+        limiter.report_response("https://busy.example/", 429, "0.2")
+        start = time.monotonic()
+        limiter.acquire_domain("https://idle.example/")
+        self.assertLess(time.monotonic() - start, 0.05)
+        limiter.acquire_domain("https://busy.example/")
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+
+    def test_backoff_doubles_without_retry_after(self):
+        limiter = RateLimiter()
+        self.assertEqual(limiter.next_backoff("a.example", None), ratelimit.DEFAULT_BACKOFF)
+        self.assertEqual(limiter.next_backoff("a.example", None), ratelimit.DEFAULT_BACKOFF * 2)
+        limiter.report_response("https://a.example/", 200)
+        self.assertEqual(limiter.next_backoff("a.example", None), ratelimit.DEFAULT_BACKOFF)
+
+if __name__ == '__main__':
+    unittest.main()
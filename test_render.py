@@ -0,0 +1,133 @@
+import functools
+import http.server
+import os
+import threading
+import unittest
+from unittest import mock
+from urllib.parse import urlparse
+
+import biz2mail
+import ratelimit
+import render
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "render")
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'rb') as fixture:
+        return fixture.read()
+
+class FixtureDriver:
+    """Stand-in for a Selenium driver that serves the .rendered.html version of a fixture when there is one."""
+
+    started = 0
+
+    def __init__(self):
+        FixtureDriver.started += 1
+        self.page_source = ""
+
+    def get(self, url):
+        name = os.path.basename(urlparse(url).path)
+        rendered = name.replace(".html", ".rendered.html")
+        if os.path.exists(os.path.join(FIXTURES_DIR, rendered)):
+            name = rendered
+        self.page_source = read_fixture(name).decode('utf-8')
+
+    def quit(self):
+        pass
+
+class FixtureServer:
+    """Serve the fixtures over HTTP on a local port."""
+
+    def __enter__(self):
+        handler = functools.partial(QuietHandler, directory=FIXTURES_DIR)
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+class TestLooksJsRendered(unittest.TestCase):
+    def test_fixtures(self):
+        self.assertFalse(render.looks_js_rendered(read_fixture("static.html")))
+        self.assertTrue(render.looks_js_rendered(read_fixture("spa.html")))
+        self.assertTrue(render.looks_js_rendered(read_fixture("empty.html")))
+        self.assertTrue(render.looks_js_rendered(b""))
+
+class TestRenderPool(unittest.TestCase):
+    def setUp(self):
+        FixtureDriver.started = 0
+
+    def test_pool_is_bounded_and_reused(self):
+        pool = render.RenderPool(max_workers=2, driver_factory=FixtureDriver)
+        self.addCleanup(pool.close)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(pool.render("http://local/spa.html")))
+                   for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 6)
+        self.assertTrue(all(b"contatti@beta.example" in content for content in results))
+        self.assertLessEqual(FixtureDriver.started, 2)
+        self.assertEqual(pool.rendered, 6)
+
+    def test_pool_disables_itself_without_a_browser(self):
+        def unavailable():
+            raise render.RenderUnavailable("selenium is not installed")
+
+        pool = render.RenderPool(driver_factory=unavailable)
+        self.assertIsNone(pool.render("http://local/spa.html"))
+        self.assertTrue(pool.disabled)
+
+class TestFetchPageEscalation(unittest.TestCase):
+    def setUp(self):
+        FixtureDriver.started = 0
+        patches = [
+            mock.patch.object(biz2mail, "rate_limiter", ratelimit.RateLimiter(domain_rate=1000, domain_burst=10)),
+            mock.patch.object(biz2mail, "render_pool", render.RenderPool(driver_factory=FixtureDriver)),
+            mock.patch.object(biz2mail, "page_cache", None),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        server = FixtureServer()
+        self.base_url = server.__enter__()
+        self.addCleanup(server.__exit__, None, None, None)
+
+    def test_static_page_needs_no_browser(self):
+        page = biz2mail.fetch_page(f"{self.base_url}/static.html")
+        self.assertEqual(page['emails'], ["info@alfa.example"])
+        self.assertEqual(FixtureDriver.started, 0)
+
+    def test_js_page_is_rendered(self):
+        page = biz2mail.fetch_page(f"{self.base_url}/spa.html")
+        self.assertEqual(page['emails'], ["contatti@beta.example"])
+        self.assertEqual(biz2mail.render_pool.rendered, 1)
+
+    def test_rendering_switched_off(self):
+        with mock.patch.object(biz2mail, "USE_RENDER_POOL", False):
+            page = biz2mail.fetch_page(f"{self.base_url}/spa.html")
+        self.assertEqual(page['emails'], [])
+        self.assertEqual(FixtureDriver.started, 0)
+
+class TestChrome(unittest.TestCase):
+    def test_renders_spa_fixture(self):
+        try:
+            driver = render.create_chrome_driver()
+        except render.RenderUnavailable as err:
+            self.skipTest(str(err))
+        pool = render.RenderPool(max_workers=1, driver_factory=lambda: driver)
+        self.addCleanup(pool.close)
+        with FixtureServer() as base_url:
+            content = pool.render(f"{base_url}/spa.html")
+        self.assertIn(b"contatti@beta.example", content)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from resultstore import ResultStore
+
+class TestResultStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = ResultStore(os.path.join(self.tmpdir.name, "results.sqlite"), max_age=100, failure_max_age=10)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def test_result_reused_by_vat_code(self):
+        fields = {'website': "https://alfa.example/", 'email': "info@alfa.example", 'error': "no"}
+        self.store.put("00743110157", "Alfa Srl", fields, "https://alfa.example/contatti")
+        self.assertEqual(self.store.get("IT 00743110157"), fields)
+        self.assertEqual(len(self.store), 1)
+
+    def test_invalid_vat_codes_not_stored(self):
+        self.store.put("12345", "Beta Spa", {'website': '', 'email': '', 'error': "No website found"})
+        self.assertIsNone(self.store.get("12345"))
+        self.assertEqual(len(self.store), 0)
+
+    def test_stale_and_retriable_results_enriched_again(self):
+        self.store.put("00743110157", "Alfa Srl", {'website': "https://alfa.example/", 'email': "a@alfa.example",
+                                                   'error': "no"})
+        self.store.put("01234567897", "Beta Spa", {'website': '', 'email': '', 'error': "No website found"})
+        self.store.put("12345678903", "Gamma Snc", {'website': "https://gamma.example/", 'email': '', 'error': "timeout"})
+        self.store.put("00000100008", "Delta Srl", {'website': '', 'email': '', 'error': "search failed"})
+        self.assertIsNone(self.store.get("12345678903"))
+        self.assertIsNone(self.store.get("00000100008"))
+        self.assertEqual(len(self.store), 2)  # Transient failures are not stored
+        later = time.time() + 50
+        with mock.patch("resultstore.time.time", return_value=later):
+            self.assertIsNotNone(self.store.get("00743110157"))
+            self.assertIsNone(self.store.get("01234567897"))  # Failures expire sooner
+        with mock.patch("resultstore.time.time", return_value=later + 100):
+            self.assertIsNone(self.store.get("00743110157"))
+        self.assertEqual((self.store.reused, self.store.stale), (1, 2))
+
+if __name__ == "__main__":
+    unittest.main()
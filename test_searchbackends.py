@@ -0,0 +1,70 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import ratelimit
+from searchbackends import (FALLBACK, FIRST_SUCCESS, RACE, MockBackend, SearchError, SearchRateLimited,
+                            SearchRouter)
+
+RESULTS = {"Alfa Srl": ["https://alfa.example/"]}
+
+def limiter():
+    return ratelimit.RateLimiter(search_rate=1000, search_burst=10)
+
+class TestSearchRouter(unittest.TestCase):
+    def test_fallback_moves_on_only_after_errors(self):
+        broken = MockBackend(RESULTS, name="broken", error=SearchError("down"))
+        empty = MockBackend({}, name="empty")
+        found = MockBackend(RESULTS, name="found")
+        router = SearchRouter([broken, empty, found], limiter(), strategy=FALLBACK)
+        self.assertEqual(router.search("Alfa Srl 01"), [])
+        self.assertEqual(found.searches, [])
+        self.assertEqual(router.failed["broken"], 1)
+
+    def test_first_success_moves_on_after_empty_results(self):
+        empty = MockBackend({}, name="empty")
+        found = MockBackend(RESULTS, name="found")
+        router = SearchRouter([empty, found], limiter(), strategy=FIRST_SUCCESS)
+        self.assertEqual(router.search("Alfa Srl 01"), ["https://alfa.example/"])
+        self.assertEqual(router.search("Beta Spa 02"), [])
+
+    def test_all_backends_failing_returns_none(self):
+        router = SearchRouter([MockBackend(name="a", error=SearchError("down")),
+                               MockBackend(name="b", error=SearchError("down"))], limiter())
+        self.assertIsNone(router.search("Alfa Srl 01"))
+
+    def test_race_takes_the_fastest_answer(self):
+        slow = MockBackend(RESULTS, name="slow", delay=0.5)
+        fast = MockBackend(RESULTS, name="fast", delay=0.01)
+        router = SearchRouter([slow, fast], limiter(), strategy=RACE)
+        started = time.monotonic()
+        self.assertEqual(router.search("Alfa Srl 01"), ["https://alfa.example/"])
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual(router.answered["fast"], 1)
+
+    def test_concurrent_races_do_not_wait_for_the_losers(self):
+        slow = MockBackend(RESULTS, name="slow", delay=1.0)
+        fast = MockBackend(RESULTS, name="fast", delay=0.01)
+        router = SearchRouter([slow, fast], limiter(), strategy=RACE)
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=4) as searches:
+            results = list(searches.map(router.search, ["Alfa Srl 01"] * 4))
+        self.assertEqual(results, [["https://alfa.example/"]] * 4)
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    def test_rate_limited_backend_is_tried_last(self):
+        throttled = MockBackend(RESULTS, name="throttled", error=SearchRateLimited("429", retry_after=60))
+        other = MockBackend(RESULTS, name="other")
+        router = SearchRouter([throttled, other], limiter(), strategy=FALLBACK)
+        self.assertEqual(router.search("Alfa Srl 01"), ["https://alfa.example/"])
+        self.assertTrue(router.rate_limiter.search_blocked("throttled"))
+        self.assertEqual(router.search("Alfa Srl 01"), ["https://alfa.example/"])
+        self.assertEqual(len(throttled.searches), 1)
+        self.assertEqual(len(other.searches), 2)
+
+    def test_rejects_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            SearchRouter([MockBackend()], limiter(), strategy="fastest")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from searchcache import SearchCache, normalize_search_key
+
+class TestSearchCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = SearchCache(os.path.join(self.tmpdir.name, "search.sqlite"), ttl=100, negative_ttl=10)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmpdir.cleanup()
+
+    def test_normalize_search_key(self):
+        self.assertEqual(normalize_search_key("  Alfa  S.R.L. ", "it 01234567890"),
+                         normalize_search_key("alfa srl", "01234567890"))
+
+    def test_miss_then_hit(self):
+        self.assertIsNone(self.cache.get("Alfa Srl", "01"))
+        self.cache.put("Alfa Srl", "01", ["https://alfa.example/"])
+        self.assertEqual(self.cache.get("ALFA S.r.l.", "01"), ["https://alfa.example/"])
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertEqual(self.cache.hit_rate(), 0.5)
+
+    def test_negative_result_expires_sooner(self):
+        with mock.patch("searchcache.time.time", return_value=1000):
+            self.cache.put("Alfa Srl", "01", ["https://alfa.example/"])
+            self.cache.put("Beta Spa", "02", [])
+        with mock.patch("searchcache.time.time", return_value=1050):
+            self.assertEqual(self.cache.get("Alfa Srl", "01"), ["https://alfa.example/"])
+            self.assertIsNone(self.cache.get("Beta Spa", "02"))
+        with mock.patch("searchcache.time.time", return_value=1200):
+            self.assertIsNone(self.cache.get("Alfa Srl", "01"))
+
+    def test_persists_across_instances(self):
+        self.cache.put("Beta Spa", "02", [])
+        reopened = SearchCache(self.cache.path)
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.get("Beta Spa", "02"), [])
+
+if __name__ == '__main__':
+    unittest.main()
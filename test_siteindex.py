@@ -0,0 +1,47 @@
+import threading
+import time
+import unittest
+
+from siteindex import SiteIndex, site_key
+
+class TestSiteKey(unittest.TestCase):
+    def test_pages_of_a_site_share_a_key(self):
+        self.assertEqual(site_key("https://www.alfa.example/contatti"), site_key("http://alfa.example/"))
+
+    def test_shared_hosts_keep_pages_apart(self):
+        self.assertNotEqual(site_key("https://www.facebook.com/alfasrl"), site_key("https://www.facebook.com/betaspa"))
+        self.assertEqual(site_key("https://www.facebook.com/alfasrl/"), site_key("https://facebook.com/alfasrl"))
+
+class TestSiteIndex(unittest.TestCase):
+    def test_concurrent_requests_are_coalesced(self):
+        index = SiteIndex()
+        calls = []
+
+        def crawl(url):
+            calls.append(url)
+            time.sleep(0.05)
+            return {'emails': {"info@alfa.example"}, 'timeout': False}
+
+        results = []
+        threads = [threading.Thread(target=lambda url=url: results.append(index.get_or_crawl(url, crawl)))
+                   for url in ("https://alfa.example/", "https://www.alfa.example/chi-siamo", "https://alfa.example/")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 3)
+        self.assertEqual((index.crawled, index.shared), (1, 2))
+
+    def test_failed_crawl_is_retried(self):
+        index = SiteIndex()
+
+        def failing(url):
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            index.get_or_crawl("https://alfa.example/", failing)
+        self.assertEqual(index.get_or_crawl("https://alfa.example/", lambda url: "ok"), "ok")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+from timeouts import AdaptiveTimeout, percentile
+
+class TestAdaptiveTimeout(unittest.TestCase):
+    def test_percentile(self):
+        self.assertEqual(percentile([5, 1, 3, 2, 4], 0.5), 3)
+        self.assertEqual(percentile(list(range(1, 101)), 0.95), 95)
+
+    def test_default_until_latencies_are_known(self):
+        timeouts = AdaptiveTimeout(default=4.0, minimum=0.5)
+        self.assertEqual(timeouts.timeout_for("https://alfa.example/"), 4.0)
+        for _ in range(3):
+            timeouts.observe("https://alfa.example/", 0.3)
+        self.assertAlmostEqual(timeouts.timeout_for("https://www.alfa.example/contatti"), 0.9)
+        # Hosts without history use the latencies of all hosts
+        self.assertAlmostEqual(timeouts.timeout_for("https://beta.example/"), 0.9)
+
+    def test_bounds(self):
+        timeouts = AdaptiveTimeout(minimum=2.0, maximum=20.0)
+        for _ in range(3):
+            timeouts.observe("https://fast.example/", 0.01)
+            timeouts.observe("https://slow.example/", 15)
+        self.assertEqual(timeouts.timeout_for("https://fast.example/"), 2.0)
+        self.assertEqual(timeouts.timeout_for("https://slow.example/"), 20.0)
+
+    def test_timeouts_double_and_recover(self):
+        timeouts = AdaptiveTimeout(default=4.0, maximum=20.0)
+        timeouts.timed_out("https://alfa.example/")
+        self.assertEqual(timeouts.timeout_for("https://alfa.example/"), 8.0)
+        timeouts.timed_out("https://alfa.example/")
+        timeouts.timed_out("https://alfa.example/")
+        self.assertEqual(timeouts.timeout_for("https://alfa.example/"), 20.0)
+        self.assertEqual(timeouts.timeout_for("https://beta.example/"), 4.0)
+
+if __name__ == "__main__":
+    unittest.main()
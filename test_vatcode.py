@@ -0,0 +1,33 @@
+import unittest
+
+from vatcode import is_valid_codice_fiscale, is_valid_partita_iva, is_valid_vat, normalize_vat
+
+class TestVatCode(unittest.TestCase):
+    def test_normalize_vat(self):
+        self.assertEqual(normalize_vat(" it 007.431.101-57 "), "00743110157")
+        self.assertEqual(normalize_vat("rssmra85t10a562s"), "RSSMRA85T10A562S")
+
+    def test_normalize_vat_restores_leading_zeros(self):
+        self.assertEqual(normalize_vat("743110157"), "00743110157")
+        self.assertEqual(normalize_vat("IT743110157"), "00743110157")
+        self.assertEqual(normalize_vat("1234567"), "1234567")  # Too short to be a partita IVA
+        self.assertTrue(is_valid_vat(normalize_vat(743110157)))
+
+    def test_partita_iva_checksum(self):
+        self.assertTrue(is_valid_partita_iva("00743110157"))
+        self.assertTrue(is_valid_partita_iva("01234567897"))
+        self.assertFalse(is_valid_partita_iva("01234567890"))
+        self.assertFalse(is_valid_partita_iva("0123456789"))
+
+    def test_codice_fiscale_checksum(self):
+        self.assertTrue(is_valid_codice_fiscale("RSSMRA85T10A562S"))
+        self.assertFalse(is_valid_codice_fiscale("RSSMRA85T10A562T"))
+        self.assertFalse(is_valid_codice_fiscale("RSSMRA85T10A56"))
+
+    def test_is_valid_vat(self):
+        self.assertTrue(is_valid_vat("00743110157"))
+        self.assertTrue(is_valid_vat("RSSMRA85T10A562S"))
+        self.assertFalse(is_valid_vat(""))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import threading
+import unittest
+
+from writer import BackgroundWriter
+
+class TestBackgroundWriter(unittest.TestCase):
+    def test_items_written_in_order_and_drained_on_close(self):
+        written = []
+        with BackgroundWriter(written.extend, batch_size=3) as background:
+            for item in range(10):
+                background.put(item)
+        self.assertEqual(written, list(range(10)))
+        self.assertFalse(background.thread.is_alive())
+
+    def test_items_batched_while_the_writer_is_busy(self):
+        release = threading.Event()
+        batches = []
+
+        def write_batch(items):
+            release.wait()
+            batches.append(items)
+
+        with BackgroundWriter(write_batch, batch_size=100) as background:
+            background.put(0)
+            for item in range(1, 6):
+                background.put(item)
+            release.set()
+        self.assertEqual(sum(batches, []), list(range(6)))
+        self.assertLess(len(batches), 6)
+
+    def test_snapshot(self):
+        snapshots = []
+        background = BackgroundWriter(lambda items: None, snapshot=lambda: snapshots.append(1), snapshot_interval=0)
+        background.put(1)
+        background.close()
+        self.assertGreaterEqual(len(snapshots), 1)
+        self.assertEqual(background.snapshots, len(snapshots))
+
+    def test_error_raised_in_the_producer(self):
+        def write_batch(items):
+            raise OSError("disk full")
+
+        background = BackgroundWriter(write_batch)
+        background.put(1)
+        with self.assertRaises(OSError):
+            background.close()
+        with self.assertRaises(OSError):
+            background.put(2)
+
+    def test_interrupted_run_keeps_queued_items(self):
+        written = []
+        with self.assertRaises(KeyboardInterrupt):
+            with BackgroundWriter(written.extend) as background:
+                background.put("done")
+                raise KeyboardInterrupt
+        self.assertEqual(written, ["done"])
+
+if __name__ == "__main__":
+    unittest.main()
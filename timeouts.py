@@ -0,0 +1,70 @@
+import math
+import threading
+from collections import deque
+
+from ratelimit import domain_of
+
+DEFAULT_TIMEOUT = 4.0  # Seconds to wait for a host with no latency history
+MIN_TIMEOUT = 2.0
+MAX_TIMEOUT = 20.0
+LATENCY_MULTIPLIER = 3.0  # Timeout as a multiple of the 95th percentile latency
+LATENCY_WINDOW = 50  # Latest responses of a host the percentile is taken over
+MIN_SAMPLES = 3  # Responses needed before the percentile replaces the default
+MAX_DOUBLINGS = 4  # Consecutive timeouts of a host that still lengthen its timeout
+
+def percentile(samples, fraction):
+    """Return the nearest-rank percentile of a list of numbers."""
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+class AdaptiveTimeout:
+    """Per-host fetch timeouts derived from the latencies observed so far.
+
+    A host gets LATENCY_MULTIPLIER times its 95th percentile latency, falling back to the latencies
+    of all hosts and then to the default while there are too few samples. Every timeout of a host
+    doubles its next timeout, up to maximum; every response brings it back down one step.
+    """
+
+    def __init__(self, default=DEFAULT_TIMEOUT, minimum=MIN_TIMEOUT, maximum=MAX_TIMEOUT,
+                 multiplier=LATENCY_MULTIPLIER, window=LATENCY_WINDOW):
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.multiplier = multiplier
+        self.window = window
+        self.host_latencies = {}
+        self.latencies = deque(maxlen=window * 10)
+        self.host_timeouts = {}
+        self.lock = threading.Lock()
+
+    def timeout_for(self, url):
+        """Return the seconds to wait for a response from the host of a URL."""
+        host = domain_of(url)
+        with self.lock:
+            samples = self.host_latencies.get(host, ())
+            if len(samples) < MIN_SAMPLES:
+                samples = self.latencies
+            if len(samples) >= MIN_SAMPLES:
+                timeout = percentile(samples, 0.95) * self.multiplier
+            else:
+                timeout = self.default
+            timeout = min(max(timeout, self.minimum), self.maximum)
+            return min(timeout * 2 ** self.host_timeouts.get(host, 0), self.maximum)
+
+    def observe(self, url, seconds):
+        """Record the latency of a response from the host of a URL."""
+        host = domain_of(url)
+        with self.lock:
+            samples = self.host_latencies.get(host)
+            if samples is None:
+                samples = self.host_latencies[host] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self.latencies.append(seconds)
+            if self.host_timeouts.get(host):
+                self.host_timeouts[host] -= 1
+
+    def timed_out(self, url):
+        """Record that the host of a URL did not answer in time."""
+        host = domain_of(url)
+        with self.lock:
+            self.host_timeouts[host] = min(self.host_timeouts.get(host, 0) + 1, MAX_DOUBLINGS)
@@ -0,0 +1,50 @@
+import re
+
+# Companies use an 11-digit code (partita IVA, also their codice fiscale); people a 16-character codice fiscale
+PARTITA_IVA_REGEX = re.compile(r"\d{11}")
+# Numeric Excel cells drop the leading zeros of a partita IVA; shorter codes are padded back to 11 digits
+MIN_UNPADDED_PARTITA_IVA_LENGTH = 8
+CODICE_FISCALE_REGEX = re.compile(r"[A-Z]{6}[0-9LMNPQRSTUV]{2}[A-Z][0-9LMNPQRSTUV]{2}[A-Z][0-9LMNPQRSTUV]{3}[A-Z]")
+# Values of the characters in odd positions (1st, 3rd, ...) for the codice fiscale check character
+CODICE_FISCALE_ODD_VALUES = dict(zip(
+    "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ",
+    (1, 0, 5, 7, 9, 13, 15, 17, 19, 21,
+     1, 0, 5, 7, 9, 13, 15, 17, 19, 21, 2, 4, 18, 20, 11, 3, 6, 8, 12, 14, 16, 10, 22, 25, 24, 23),
+))
+
+def normalize_vat(vat_code):
+    """Normalize a VAT code: uppercase, no spaces or separators, no IT country prefix, leading zeros restored."""
+    vat = re.sub(r"[\s.\-/]", "", str(vat_code).upper())
+    if vat.startswith("IT") and vat[2:].isdigit():
+        vat = vat[2:]
+    if vat.isdigit() and MIN_UNPADDED_PARTITA_IVA_LENGTH <= len(vat) < 11:
+        vat = vat.zfill(11)
+    return vat
+
+def is_valid_partita_iva(vat):
+    """Check the format and check digit of a normalized 11-digit partita IVA."""
+    if not PARTITA_IVA_REGEX.fullmatch(vat):
+        return False
+    total = 0
+    for position, digit in enumerate(vat[:10]):
+        value = int(digit)
+        if position % 2:  # Digits in even positions (2nd, 4th, ...) are doubled
+            value = value * 2 - 9 if value > 4 else value * 2
+        total += value
+    return (10 - total % 10) % 10 == int(vat[10])
+
+def is_valid_codice_fiscale(vat):
+    """Check the format and check character of a normalized 16-character codice fiscale."""
+    if not CODICE_FISCALE_REGEX.fullmatch(vat):
+        return False
+    total = 0
+    for position, char in enumerate(vat[:15]):
+        if position % 2:
+            total += int(char) if char.isdigit() else ord(char) - ord("A")
+        else:
+            total += CODICE_FISCALE_ODD_VALUES[char]
+    return chr(ord("A") + total % 26) == vat[15]
+
+def is_valid_vat(vat):
+    """Check whether a normalized code is a valid partita IVA or codice fiscale."""
+    return is_valid_partita_iva(vat) or is_valid_codice_fiscale(vat)
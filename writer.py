@@ -0,0 +1,87 @@
+import queue
+import threading
+import time
+
+DEFAULT_QUEUE_SIZE = 1000  # Completed records waiting for the writer before producers block
+DEFAULT_BATCH_SIZE = 200  # Records written to disk together
+DEFAULT_SNAPSHOT_INTERVAL = 60  # Seconds between snapshots of the output files
+
+STOP = object()  # Queued by close() to stop the thread after the records before it
+
+class BackgroundWriter:
+    """Thread that persists completed records so disk latency stays off the enrichment path.
+
+    put() queues an item and only blocks while the bounded queue is full. The thread hands the
+    queued items to write_batch(items) in batches and calls snapshot() at most every
+    snapshot_interval seconds. close() writes whatever is still queued, also when the run is
+    interrupted, and re-raises an error of the thread in the caller.
+    """
+
+    def __init__(self, write_batch, snapshot=None, snapshot_interval=DEFAULT_SNAPSHOT_INTERVAL,
+                 queue_size=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_BATCH_SIZE):
+        self.write_batch = write_batch
+        self.snapshot = snapshot
+        self.snapshot_interval = snapshot_interval
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self.batches = 0
+        self.snapshots = 0
+        self.last_snapshot = time.monotonic()
+        self.thread = threading.Thread(target=self.run, name="writer", daemon=True)
+        self.thread.start()
+
+    def put(self, item):
+        """Queue an item for the writer."""
+        self.raise_error()
+        self.queue.put(item)
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is STOP
+            items = [item for item in batch if item is not STOP]
+            try:
+                if self.error is None:
+                    self.write(items)
+            except BaseException as err:
+                self.error = err  # Stop writing; the producer gets the error from its next call
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def write(self, items):
+        if items:
+            self.write_batch(items)
+            self.batches += 1
+        if self.snapshot is not None and time.monotonic() - self.last_snapshot >= self.snapshot_interval:
+            self.snapshot()
+            self.snapshots += 1
+            self.last_snapshot = time.monotonic()
+
+    def close(self):
+        """Write the items still queued and stop the thread."""
+        if self.thread.is_alive():
+            self.queue.put(STOP)
+            self.thread.join()
+        self.raise_error()
+
+    def raise_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        try:
+            self.close()
+        except Exception:
+            if exc_type is None:
+                raise  # An error of the run itself takes precedence